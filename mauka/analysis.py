@@ -3,7 +3,9 @@ This module provides analysis/util functions that may be called from multiple lo
 """
 
 import logging
-from typing import List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 
 # import matplotlib.pyplot as plt
 import numpy as np
@@ -68,6 +70,55 @@ def rms_to_percent_nominal(rms_voltage: float) -> float:
     return (rms_voltage / 120.0) * 100.0
 
 
+def vrms_windowed(waveform: np.ndarray,
+                  window_size: int = int(constants.SAMPLES_PER_CYCLE),
+                  step: Optional[int] = None) -> np.ndarray:
+    """
+    Calculates the Vrms of every window of a waveform without copying the waveform.
+
+    Full windows are read through a strided view of the waveform (a reshape when windows do not overlap) and the sum
+    of squares of each window is computed by a single einsum. If samples remain after the last full window, a final
+    partial window starting one step after the last full window is appended.
+    :param waveform: The waveform to find Vrms values for.
+    :param window_size: The number of samples in each window.
+    :param step: The number of samples between the starts of consecutive windows. Defaults to window_size. A step of
+    half of a cycle provides overlapping half-cycle updates.
+    :return: A float64 array of Vrms values, one per window.
+    """
+    # util/reporting/reports/__init__.py mirrors this kernel as vrms_waveform; keep the two in sync
+    waveform = np.asarray(waveform)
+    window_size = int(window_size)
+    step = window_size if step is None else int(step)
+    waveform_len = len(waveform)
+
+    if window_size <= 0 or step <= 0:
+        raise ValueError("window_size and step must be positive")
+
+    if waveform_len < window_size:
+        num_full = 0
+    else:
+        num_full = (waveform_len - window_size) // step + 1
+
+    full_end = (num_full - 1) * step + window_size if num_full > 0 else 0
+    has_tail = full_end < waveform_len
+    rms_voltages = np.empty(num_full + int(has_tail), dtype=np.float64)
+
+    if num_full > 0:
+        if step == window_size:
+            windows = waveform[:num_full * window_size].reshape(num_full, window_size)
+        else:
+            windows = np.lib.stride_tricks.sliding_window_view(waveform, window_size)[::step]
+        np.einsum("ij,ij->i", windows, windows, out=rms_voltages[:num_full], dtype=np.float64, casting="safe")
+        rms_voltages[:num_full] /= window_size
+
+    if has_tail:
+        # Squares of raw int16 samples overflow in the input dtype
+        tail = waveform[num_full * step:].astype(np.float64)
+        rms_voltages[num_full] = np.dot(tail, tail) / len(tail)
+
+    return np.sqrt(rms_voltages, out=rms_voltages)
+
+
 def segment(array: np.ndarray, delta: float) -> List[np.ndarray]:
     """
     Segments an array by splitting the array into stable segments and throwing away "changing" segments.
@@ -109,12 +160,204 @@ def segment(array: np.ndarray, delta: float) -> List[np.ndarray]:
     return list(map(np.array, stable_segments))
 
 
+class SegmentationEngine:
+    """
+    Splits arrays into segments with ruptures' PELT search while bounding the worst case cost of a single call.
+
+    The cost of PELT is bounded in three ways:
+        min_size and jump are passed to PELT, which only considers change points every jump elements.
+        When stable_delta is set, a first pass finds runs of at least min_stable elements whose range (max - min) is
+        below stable_delta. Each stable run becomes a segment and PELT only runs on the unstable spans between them.
+        When max_cycles is set, arrays longer than max_cycles are averaged in blocks down to at most max_cycles
+        elements before they are segmented, so segment boundaries fall on block boundaries. Averaging dilutes
+        disturbances shorter than a block, so this is opt-in (analysis.segmentation.maxCycles is 0 by default).
+
+    The default parameters reproduce a plain rpt.Pelt().fit(data).predict(pen=1). Every call is timed.
+    """
+
+    def __init__(self,
+                 penalty: float = 1.0,
+                 min_size: int = 2,
+                 jump: int = 5,
+                 stable_delta: Optional[float] = None,
+                 min_stable: int = 6,
+                 max_cycles: Optional[int] = None):
+        """
+        Initializes a SegmentationEngine.
+        :param penalty: The PELT penalty.
+        :param min_size: The minimum segment length considered by PELT.
+        :param jump: PELT only considers change points every jump elements.
+        :param stable_delta: Optional bound on the range of a stable region for the stable region first pass.
+        :param min_stable: The minimum number of elements in a stable region.
+        :param max_cycles: Optional maximum number of elements that are segmented.
+        """
+        self.penalty = penalty
+        self.min_size = min_size
+        self.jump = jump
+        self.stable_delta = stable_delta
+        self.min_stable = min_stable
+        self.max_cycles = max_cycles
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.capped_calls = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.last_timing: Dict[str, float] = {}
+
+    @staticmethod
+    def from_config(conf) -> 'SegmentationEngine':
+        """
+        Creates a SegmentationEngine from the analysis.segmentation.* keys of a Mauka configuration.
+        :param conf: The Mauka configuration.
+        :return: A SegmentationEngine.
+        """
+        stable_delta = float(conf.get("analysis.segmentation.stableDelta", 0.0))
+        max_cycles = int(conf.get("analysis.segmentation.maxCycles", 0))
+        return SegmentationEngine(float(conf.get("analysis.segmentation.penalty", 1.0)),
+                                  int(conf.get("analysis.segmentation.minSize", 2)),
+                                  int(conf.get("analysis.segmentation.jump", 5)),
+                                  stable_delta if stable_delta > 0 else None,
+                                  int(conf.get("analysis.segmentation.minStable", 6)),
+                                  max_cycles if max_cycles > 0 else None)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def pelt_ends(self, data: np.ndarray) -> List[int]:
+        """
+        Runs PELT over an array.
+        :param data: The array to segment.
+        :return: The exclusive end index of every segment.
+        """
+        if len(data) < 2 * self.min_size:
+            return [len(data)]
+        try:
+            return rpt.Pelt(min_size=self.min_size, jump=self.jump).fit(data).predict(pen=self.penalty)
+        except rpt.exceptions.BadSegmentationParameters:
+            return [len(data)]
+
+    def stable_runs(self, data: np.ndarray) -> List[List[int]]:
+        """
+        Finds runs of elements that stay within a band narrower than stable_delta, i.e. max - min < stable_delta over
+        the whole run. Bounding the range rather than consecutive differences keeps gradual ramps out of stable runs.
+        Runs separated by fewer than min_stable elements are merged when the merged run, including the elements between
+        them, stays within the same band, so a short sag or swell between two stable runs is never merged away.
+        :param data: The array to search.
+        :return: The start and exclusive end of every run of at least min_stable elements.
+        """
+        # Each run is [start, end, min, max]
+        runs: List[List] = []
+        for i, value in enumerate(np.asarray(data, dtype=np.float64).tolist()):
+            if runs and runs[-1][1] == i \
+                    and max(runs[-1][3], value) - min(runs[-1][2], value) < self.stable_delta:
+                runs[-1][1] = i + 1
+                runs[-1][2] = min(runs[-1][2], value)
+                runs[-1][3] = max(runs[-1][3], value)
+            else:
+                runs.append([i, i + 1, value, value])
+
+        merged: List[List] = []
+        for run in runs:
+            if run[1] - run[0] < self.min_stable:
+                continue
+            if merged and run[0] - merged[-1][1] < self.min_stable:
+                gap = data[merged[-1][1]:run[0]]
+                low = min(run[2], merged[-1][2], float(gap.min()) if len(gap) else run[2])
+                high = max(run[3], merged[-1][3], float(gap.max()) if len(gap) else run[3])
+                if high - low < self.stable_delta:
+                    merged[-1][1:] = [run[1], low, high]
+                    continue
+            merged.append(run)
+        return [run[:2] for run in merged]
+
+    def segment_ends_uncapped(self, data: np.ndarray) -> Tuple[List[int], int]:
+        """
+        Segments an array, running PELT only on the spans between stable runs when stable_delta is set.
+        :param data: The array to segment.
+        :return: The exclusive end index of every segment and the number of elements passed to PELT.
+        """
+        if self.stable_delta is None:
+            return self.pelt_ends(data), len(data)
+
+        ends: List[int] = []
+        pelt_elements = 0
+        span_start = 0
+        for run_start, run_end in self.stable_runs(data) + [[len(data), len(data)]]:
+            if run_start > span_start:
+                ends.extend(span_start + end for end in self.pelt_ends(data[span_start:run_start]))
+                pelt_elements += run_start - span_start
+            if run_end > run_start:
+                ends.append(run_end)
+            span_start = run_end
+        return ends, pelt_elements
+
+    def segment_ends(self, data: np.ndarray) -> np.ndarray:
+        """
+        Segments an array.
+        :param data: The array to segment.
+        :return: The exclusive end index of every segment. The last end is len(data).
+        """
+        start_s = time.perf_counter()
+        data = np.asarray(data)
+        num_elements = len(data)
+        block_size = 1
+        if self.max_cycles is not None and num_elements > self.max_cycles:
+            block_size = int(np.ceil(num_elements / self.max_cycles))
+            block_starts = np.arange(0, num_elements, block_size)
+            blocks = np.add.reduceat(data, block_starts) / np.diff(np.append(block_starts, num_elements))
+            ends, pelt_elements = self.segment_ends_uncapped(blocks)
+            ends = np.minimum(np.array(ends, dtype=np.int64) * block_size, num_elements)
+        else:
+            ends, pelt_elements = self.segment_ends_uncapped(data)
+            ends = np.array(ends, dtype=np.int64)
+
+        self.record({"elapsed_s": time.perf_counter() - start_s,
+                     "elements": num_elements,
+                     "pelt_elements": pelt_elements,
+                     "block_size": block_size})
+        return ends
+
+    def record(self, timing: Dict[str, float]):
+        """
+        Adds the timing of one call to the counters of this engine. This also records calls made by copies of this
+        engine in worker processes.
+        :param timing: The timing of the call, as in last_timing.
+        """
+        with self.lock:
+            self.calls += 1
+            self.capped_calls += int(timing["block_size"] > 1)
+            self.total_s += timing["elapsed_s"]
+            self.max_s = max(self.max_s, timing["elapsed_s"])
+            self.last_timing = timing
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the timing counters of this engine.
+        :return: The timing counters of this engine.
+        """
+        with self.lock:
+            return {"calls": self.calls,
+                    "capped_calls": self.capped_calls,
+                    "total_s": self.total_s,
+                    "max_s": self.max_s}
+
+
+DEFAULT_SEGMENTATION_ENGINE = SegmentationEngine()
+
+
 # pylint: disable=W0703
 # pylint: disable=C0103
-def segment_array(data: np.ndarray) -> List[np.ndarray]:
+def segment_array(data: np.ndarray, engine: Optional[SegmentationEngine] = None) -> List[np.ndarray]:
     """
     Split up data into segments.
     :param data:
+    :param engine: An optional segmentation engine, otherwise DEFAULT_SEGMENTATION_ENGINE is used.
     :return:
     """
 
@@ -124,9 +367,9 @@ def segment_array(data: np.ndarray) -> List[np.ndarray]:
     if len(data) == 1:
         return [np.array([1])]
 
+    engine = DEFAULT_SEGMENTATION_ENGINE if engine is None else engine
     try:
-        algo = rpt.Pelt().fit(data)
-        segment_idxs = algo.predict(pen=1)
+        segment_idxs = engine.segment_ends(data)
 
         segments: List[np.ndarray] = []
         start = 0
@@ -140,6 +383,19 @@ def segment_array(data: np.ndarray) -> List[np.ndarray]:
         return []
 
 
+def segment_summary(data: np.ndarray,
+                    engine: Optional[SegmentationEngine] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split up data into segments and summarize each segment.
+    :param data: The data to segment.
+    :param engine: An optional segmentation engine, otherwise DEFAULT_SEGMENTATION_ENGINE is used.
+    :return: A tuple of the length and the mean of every segment.
+    """
+    segments = segment_array(data, engine)
+    return (np.array([len(segment) for segment in segments], dtype=np.int64),
+            np.array([segment.mean() for segment in segments], dtype=np.float64))
+
+
 def fit_fn(x: np.ndarray, amplitude: float, frequency: float, phase: float, offset: float):
     """
     A function used to fit sine waves to power data.
@@ -208,9 +464,16 @@ PHASE_IDX = 2
 OFFSET_IDX = 3
 
 
-def frequency_per_cycle(data: np.ndarray) -> List[float]:
+FREQUENCY_METHOD_PHASE = "phase"
+"""Batched per-cycle frequency estimation from the phase advance between consecutive cycles"""
+
+FREQUENCY_METHOD_FIT = "fit"
+"""Per-cycle frequency estimation by fitting a sine wave to each cycle independently"""
+
+
+def frequency_per_cycle_fit(data: np.ndarray) -> List[float]:
     """
-    Calculates the fundamental frequency per cycle.
+    Calculates the fundamental frequency per cycle by fitting a sine wave to every cycle.
     :param data: Data to calculate frequency over.
     :return: A list of frequency calculations.
     """
@@ -244,3 +507,70 @@ def frequency_per_cycle(data: np.ndarray) -> List[float]:
         res.append(freq)
 
     return res
+
+
+def phase_per_cycle(cycles: np.ndarray, reference_frequency: float) -> np.ndarray:
+    """
+    Estimates the phase of every cycle (row) of a cycles x samples matrix in a single pass.
+
+    Each row is projected onto a sine, cosine, and offset basis at the reference frequency using a linear least
+    squares solution that is shared by all rows.
+    :param cycles: A matrix with one cycle of samples per row.
+    :param reference_frequency: The frequency of the projection basis in Hz.
+    :return: The phase of each cycle in radians relative to the first sample of the cycle.
+    """
+    x_values = np.arange(cycles.shape[1])
+    omega = constants.TWO_PI * reference_frequency / constants.SAMPLE_RATE_HZ
+    basis = np.column_stack((np.sin(omega * x_values),
+                             np.cos(omega * x_values),
+                             np.ones(len(x_values))))
+    coefficients = cycles @ np.linalg.pinv(basis).T
+    return np.arctan2(coefficients[:, 1], coefficients[:, 0])
+
+
+def frequency_per_cycle_phase(data: np.ndarray, passes: int = 2) -> List[float]:
+    """
+    Calculates the fundamental frequency per cycle from the phase advance between consecutive cycles.
+
+    The waveform is reshaped into a (cycles x SAMPLES_PER_CYCLE) matrix so that the phase of every cycle is found at
+    once. The first pass uses the nominal frequency as the reference. Further passes use the median of the previous
+    estimate as the reference which removes the spectral leakage bias when the grid is off nominal.
+    :param data: Data to calculate frequency over.
+    :param passes: Number of estimation passes.
+    :return: A list of frequency calculations.
+    """
+    num_windows = len(data) // SAMPLES_PER_CYCLE
+
+    # The phase advance needs at least two cycles, a single cycle is fit instead.
+    if num_windows < 2:
+        return frequency_per_cycle_fit(data)
+
+    cycles = np.reshape(np.asarray(data[:num_windows * SAMPLES_PER_CYCLE], dtype=np.float64),
+                        (num_windows, SAMPLES_PER_CYCLE))
+    cycle_rate_hz = constants.SAMPLE_RATE_HZ / SAMPLES_PER_CYCLE
+    window_idxs = np.arange(num_windows)
+
+    frequencies = np.full(num_windows, constants.CYCLES_PER_SECOND)
+    for _ in range(passes):
+        reference_frequency = float(np.median(frequencies))
+        expected_advance = constants.TWO_PI * reference_frequency / cycle_rate_hz
+        phases = np.unwrap(phase_per_cycle(cycles, reference_frequency) - expected_advance * window_idxs)
+        frequencies = reference_frequency + np.gradient(phases) * cycle_rate_hz / constants.TWO_PI
+
+    return frequencies.tolist()
+
+
+def frequency_per_cycle(data: np.ndarray, method: str = FREQUENCY_METHOD_PHASE) -> List[float]:
+    """
+    Calculates the fundamental frequency per cycle.
+    :param data: Data to calculate frequency over.
+    :param method: Either FREQUENCY_METHOD_PHASE (default) or FREQUENCY_METHOD_FIT.
+    :return: A list of frequency calculations.
+    """
+    if method == FREQUENCY_METHOD_PHASE:
+        return frequency_per_cycle_phase(data)
+
+    if method == FREQUENCY_METHOD_FIT:
+        return frequency_per_cycle_fit(data)
+
+    raise ValueError("Unknown frequency method {}".format(method))
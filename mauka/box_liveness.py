@@ -0,0 +1,155 @@
+"""
+This module provides a tracker of when each OPQ Box was first and last seen that is shared by the plugins and the mongo
+client of a Mauka process.
+"""
+
+import threading
+import time
+import typing
+
+import pymongo.collection
+
+
+def timestamp_ms() -> int:
+    """
+    Returns the current timestamp in milliseconds since the epoch.
+    :return: The current timestamp in milliseconds since the epoch.
+    """
+    return int(round(time.time() * 1000))
+
+
+class BoxLivenessTracker:
+    """
+    Tracks when each box was first and last seen from the measurements collection.
+
+    Each update runs one server-side $group aggregation over the measurements received since the previous update, so
+    only one document per box is returned no matter how many measurements were received. A box's first seen timestamp
+    is the start of its current run of measurements: it is reset whenever the box resumes after being silent for more
+    than gap_ms.
+    """
+
+    def __init__(self,
+                 measurements_collection: pymongo.collection.Collection,
+                 gap_ms: int = 60_000,
+                 lookback_ms: int = 60_000,
+                 min_update_interval_ms: int = 1_000,
+                 clock: typing.Callable[[], int] = timestamp_ms):
+        """
+        Initializes a BoxLivenessTracker.
+        :param measurements_collection: The measurements collection.
+        :param gap_ms: Number of milliseconds a box must be silent for before it is considered to have a gap.
+        :param lookback_ms: Number of milliseconds of measurements that the first update aggregates.
+        :param min_update_interval_ms: Updates requested sooner than this after the previous update are skipped.
+        :param clock: Returns the current time in milliseconds since the epoch.
+        """
+        self.measurements_collection = measurements_collection
+        self.gap_ms = gap_ms
+        self.min_update_interval_ms = min_update_interval_ms
+        self.clock = clock
+        self.last_update_ms: int = clock() - lookback_ms
+        self.updated = False
+        self.first_seen_ms: typing.Dict[str, int] = {}
+        self.last_seen_ms: typing.Dict[str, int] = {}
+        self.updates = 0
+        self.lock = threading.Lock()
+        self.update_lock = threading.Lock()
+
+    def update(self, now_ms: typing.Optional[int] = None):
+        """
+        Aggregates the measurements received since the previous update into the first and last seen timestamps.
+        :param now_ms: The current time in milliseconds since the epoch.
+        """
+        now_ms = self.clock() if now_ms is None else now_ms
+        with self.update_lock:
+            if self.updated and now_ms - self.last_update_ms < self.min_update_interval_ms:
+                return
+
+            groups = list(self.measurements_collection.aggregate([
+                {"$match": {"timestamp_ms": {"$gte": self.last_update_ms}}},
+                {"$group": {"_id": "$box_id",
+                            "first_seen_ms": {"$min": "$timestamp_ms"},
+                            "last_seen_ms": {"$max": "$timestamp_ms"}}}
+            ]))
+
+            with self.lock:
+                for group in groups:
+                    box_id = group["_id"]
+                    last_seen_ms = self.last_seen_ms.get(box_id)
+                    if last_seen_ms is None or group["first_seen_ms"] - last_seen_ms > self.gap_ms:
+                        self.first_seen_ms[box_id] = group["first_seen_ms"]
+                    if last_seen_ms is None or group["last_seen_ms"] > last_seen_ms:
+                        self.last_seen_ms[box_id] = group["last_seen_ms"]
+
+                self.last_update_ms = now_ms
+                self.updated = True
+                self.updates += 1
+
+    def first_seen(self, box_id: str) -> typing.Optional[int]:
+        """
+        Returns the start of the current run of measurements of a box.
+        :param box_id: The box id.
+        :return: The timestamp in milliseconds or None if the box has not been seen.
+        """
+        with self.lock:
+            return self.first_seen_ms.get(box_id)
+
+    def last_seen(self, box_id: str) -> typing.Optional[int]:
+        """
+        Returns the timestamp of the last measurement of a box.
+        :param box_id: The box id.
+        :return: The timestamp in milliseconds or None if the box has not been seen.
+        """
+        with self.lock:
+            return self.last_seen_ms.get(box_id)
+
+    def last_seen_by_box(self) -> typing.Dict[str, int]:
+        """
+        Returns when every box that has been seen was last seen.
+        :return: A dictionary from box ids to the timestamps in milliseconds of their last measurements.
+        """
+        with self.lock:
+            return dict(self.last_seen_ms)
+
+    def is_active(self, box_id: str, window_ms: int = 60_000, now_ms: typing.Optional[int] = None) -> bool:
+        """
+        Returns whether a box has sent a measurement within a window.
+        :param box_id: The box id.
+        :param window_ms: The window in milliseconds.
+        :param now_ms: The current time in milliseconds since the epoch.
+        :return: Whether the box has sent a measurement within the window.
+        """
+        now_ms = self.clock() if now_ms is None else now_ms
+        last_seen_ms = self.last_seen(box_id)
+        return last_seen_ms is not None and now_ms - last_seen_ms <= window_ms
+
+    def active_boxes(self, window_ms: int = 60_000, now_ms: typing.Optional[int] = None) -> typing.Set[str]:
+        """
+        Returns the boxes that have sent a measurement within a window.
+        :param window_ms: The window in milliseconds.
+        :param now_ms: The current time in milliseconds since the epoch.
+        :return: The ids of the active boxes.
+        """
+        now_ms = self.clock() if now_ms is None else now_ms
+        with self.lock:
+            return {box_id for box_id, last_seen_ms in self.last_seen_ms.items() if now_ms - last_seen_ms <= window_ms}
+
+    def gaps(self, now_ms: typing.Optional[int] = None) -> typing.Dict[str, int]:
+        """
+        Returns the boxes that have been silent for more than gap_ms.
+        :param now_ms: The current time in milliseconds since the epoch.
+        :return: A dictionary from the ids of the silent boxes to when they were last seen.
+        """
+        now_ms = self.clock() if now_ms is None else now_ms
+        with self.lock:
+            return {box_id: last_seen_ms for box_id, last_seen_ms in self.last_seen_ms.items()
+                    if now_ms - last_seen_ms > self.gap_ms}
+
+    def stats(self) -> typing.Dict[str, int]:
+        """
+        Returns the statistics of this tracker.
+        :return: The statistics of this tracker.
+        """
+        with self.lock:
+            return {"boxes": len(self.last_seen_ms),
+                    "updates": self.updates,
+                    "last_update_ms": self.last_update_ms}
@@ -0,0 +1,294 @@
+"""
+This module contains digital signal processing utilities that are shared between Mauka plugins.
+
+Filters are designed once per parameter tuple and stored in second-order sections (SOS) form, which is numerically
+better conditioned than the transfer function (ba) form for low cutoff frequencies relative to the sample rate.
+"""
+
+import functools
+import threading
+import time
+import typing
+
+import numpy
+from scipy import optimize
+from scipy import signal
+
+import constants
+
+# Correlations with fewer multiply-adds than this are computed directly rather than with FFTs
+DIRECT_CORRELATION_MAX_OPS = 500000
+
+
+@functools.lru_cache(maxsize=64)
+def butter_sos(filter_order: int,
+               cutoff_frequency: float,
+               btype: str = "lowpass",
+               sample_rate_hz: float = constants.SAMPLE_RATE_HZ) -> numpy.ndarray:
+    """
+    Designs (or returns the previously designed) digital Butterworth filter in second-order sections form.
+    :param filter_order: The order of the filter.
+    :param cutoff_frequency: The cutoff frequency in Hz.
+    :param btype: The type of filter (lowpass or highpass).
+    :param sample_rate_hz: The sample rate of the signal in Hz.
+    :return: An array of second-order sections which is shared by every caller and must not be modified.
+    """
+    # Cutoff frequencies in half-cycles / sample
+    cutoff_frequency_nyquist = cutoff_frequency * 2 / sample_rate_hz
+    return signal.butter(int(filter_order), cutoff_frequency_nyquist, btype=btype, output="sos")
+
+
+def zero_phase_lowpass(waveform: numpy.ndarray,
+                       filter_order: int,
+                       cutoff_frequency: float,
+                       sample_rate_hz: float = constants.SAMPLE_RATE_HZ) -> numpy.ndarray:
+    """
+    Applies a Butterworth low pass filter forwards and backwards so that the filtered waveform has no phase shift.
+    :param waveform: The waveform to filter.
+    :param filter_order: The order of the filter.
+    :param cutoff_frequency: The cutoff frequency in Hz.
+    :param sample_rate_hz: The sample rate of the waveform in Hz.
+    :return: The low passed waveform.
+    """
+    return signal.sosfiltfilt(butter_sos(filter_order, cutoff_frequency, "lowpass", sample_rate_hz), waveform)
+
+
+def zero_phase_highpass(waveform: numpy.ndarray,
+                        filter_order: int,
+                        cutoff_frequency: float,
+                        sample_rate_hz: float = constants.SAMPLE_RATE_HZ,
+                        lowpassed_waveform: typing.Optional[numpy.ndarray] = None,
+                        out: typing.Optional[numpy.ndarray] = None) -> numpy.ndarray:
+    """
+    Removes the content below the cutoff frequency by subtracting the zero phase low passed waveform from the waveform.
+    This is how transients are separated from the fundamental.
+    :param waveform: The waveform to filter.
+    :param filter_order: The order of the filter.
+    :param cutoff_frequency: The cutoff frequency in Hz.
+    :param sample_rate_hz: The sample rate of the waveform in Hz.
+    :param lowpassed_waveform: An optional, already computed zero_phase_lowpass of the waveform.
+    :param out: An optional array to store the result in.
+    :return: The high passed waveform.
+    """
+    if lowpassed_waveform is None:
+        lowpassed_waveform = zero_phase_lowpass(waveform, filter_order, cutoff_frequency, sample_rate_hz)
+    return numpy.subtract(waveform, lowpassed_waveform, out=out)
+
+
+def lowpass_decimate(waveform: numpy.ndarray,
+                     downsample_factor: int,
+                     filter_order: int,
+                     cutoff_frequency: float,
+                     sample_rate_hz: float = constants.SAMPLE_RATE_HZ) -> numpy.ndarray:
+    """
+    Applies a zero phase Butterworth low pass filter and then keeps every downsample_factor-th sample. This is
+    equivalent to scipy.signal.decimate with a Butterworth dlti, without redesigning the filter for every call.
+    :param waveform: The waveform to decimate.
+    :param downsample_factor: The downsample factor.
+    :param filter_order: The order of the filter.
+    :param cutoff_frequency: The cutoff frequency in Hz.
+    :param sample_rate_hz: The sample rate of the waveform in Hz.
+    :return: A strided view of the filtered waveform.
+    """
+    return zero_phase_lowpass(waveform, filter_order, cutoff_frequency, sample_rate_hz)[::int(downsample_factor)]
+
+
+class CorrelationWorkspace:
+    """
+    A zero padded, power of two length buffer that is reused by FFT correlations of similarly sized waveforms.
+    """
+
+    def __init__(self):
+        """
+        Initializes a CorrelationWorkspace.
+        """
+        self.buffer = numpy.zeros(0)
+
+    def padded(self, size: int) -> numpy.ndarray:
+        """
+        Returns a view of the buffer with a power of two length of at least size, growing the buffer if needed.
+        :param size: The minimum length of the view.
+        :return: A view of the buffer.
+        """
+        fft_size = 1 << max(0, size - 1).bit_length()
+        if len(self.buffer) < fft_size:
+            self.buffer = numpy.zeros(fft_size)
+        return self.buffer[:fft_size]
+
+
+_correlation_workspaces = threading.local()
+
+
+def sliding_autocorrelation(waveform: numpy.ndarray,
+                            prefix_size: int,
+                            workspace: typing.Optional[CorrelationWorkspace] = None) -> numpy.ndarray:
+    """
+    Correlates a waveform with its first prefix_size samples. This is equivalent to
+    numpy.correlate(waveform, waveform[:prefix_size], mode='valid'), but uses FFTs when the direct method would be slow.
+    :param waveform: The waveform to correlate.
+    :param prefix_size: The number of samples at the start of the waveform to correlate the waveform against.
+    :param workspace: An optional workspace to reuse, otherwise a per thread workspace is used.
+    :return: The correlation of the waveform at each of the len(waveform) - prefix_size + 1 lags.
+    """
+    num_samples = len(waveform)
+    num_lags = num_samples - prefix_size + 1
+    if prefix_size * num_lags <= DIRECT_CORRELATION_MAX_OPS or prefix_size < 1:
+        return numpy.correlate(waveform, waveform[:prefix_size], mode='valid')
+
+    if workspace is None:
+        if not hasattr(_correlation_workspaces, "workspace"):
+            _correlation_workspaces.workspace = CorrelationWorkspace()
+        workspace = _correlation_workspaces.workspace
+
+    # Lags are non-negative and the padded length is at least len(waveform), so the circular correlation never wraps
+    padded = workspace.padded(num_samples)
+    padded[:num_samples] = waveform
+    padded[num_samples:] = 0.0
+    waveform_spectrum = numpy.fft.rfft(padded)
+    padded[prefix_size:num_samples] = 0.0
+    prefix_spectrum = numpy.fft.rfft(padded)
+    waveform_spectrum *= prefix_spectrum.conj()
+    return numpy.fft.irfft(waveform_spectrum, len(padded))[:num_lags]
+
+
+class DampedSinusoid:
+    """
+    A damped sinusoid amplitude * exp(-decay * t) * cos(2 * pi * frequency * t + phase) + mean fit to a waveform.
+    """
+
+    def __init__(self,
+                 amplitude: float,
+                 decay: float,
+                 frequency: float,
+                 phase: float,
+                 mean: float,
+                 rss: float,
+                 method: str):
+        """
+        Initializes a DampedSinusoid.
+        :param amplitude: The initial amplitude.
+        :param decay: The decay rate in 1/s.
+        :param frequency: The frequency in Hz.
+        :param phase: The phase in radians.
+        :param mean: The offset.
+        :param rss: The residual sum of squares of the fit.
+        :param method: The method used to fit the sinusoid.
+        """
+        self.amplitude = amplitude
+        self.decay = decay
+        self.frequency = frequency
+        self.phase = phase
+        self.mean = mean
+        self.rss = rss
+        self.method = method
+
+
+def matrix_pencil_damped_sinusoid(waveform: numpy.ndarray,
+                                  sample_rate_hz: float = constants.SAMPLE_RATE_HZ,
+                                  max_pencil: int = 32) -> typing.Optional[DampedSinusoid]:
+    """
+    Estimates the dominant damped sinusoid of a waveform with the matrix pencil method.
+
+    The poles of a three pole model (a complex conjugate pair and an offset) are found from the dominant singular
+    subspace of a Hankel matrix of the waveform. The frequency and decay come directly from the oscillatory pole and the
+    amplitude, phase, and offset are then a linear least squares solve.
+    :param waveform: The waveform to fit.
+    :param sample_rate_hz: The sample rate of the waveform in Hz.
+    :param max_pencil: The largest pencil parameter to use, which bounds the cost for long waveforms.
+    :return: The fit damped sinusoid or None if the waveform does not contain an oscillatory pole pair.
+    """
+    model_order = 3
+    waveform = numpy.asarray(waveform, dtype=numpy.float64)
+    num_samples = len(waveform)
+    pencil = min(num_samples // 3, max_pencil)
+    if pencil < model_order:
+        return None
+
+    # The right singular vectors of the Hankel matrix are the eigenvectors of its small (pencil + 1) square Gram matrix
+    hankel = numpy.lib.stride_tricks.sliding_window_view(waveform, pencil + 1)
+    eigenvalues, eigenvectors = numpy.linalg.eigh(hankel.T @ hankel)
+    eigenvalues, eigenvectors = eigenvalues[::-1], eigenvectors[:, ::-1]
+    if eigenvalues[0] <= 0.0:
+        return None
+    # Drop directions that are numerically zero so that noise free waveforms do not produce spurious poles
+    rank = min(model_order, int((eigenvalues > eigenvalues[0] * 1e-12).sum()))
+    signal_subspace = eigenvectors[:, :rank]
+    poles = numpy.linalg.eigvals(numpy.linalg.pinv(signal_subspace[:-1]) @ signal_subspace[1:])
+
+    # Poles of a real waveform come in conjugate pairs, so a three pole model has at most one oscillatory pole
+    oscillatory_poles = poles[(poles.imag > 0) & (numpy.abs(poles) > 0)]
+    if len(oscillatory_poles) == 0:
+        return None
+    pole = oscillatory_poles[0]
+
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        frequency = float(numpy.angle(pole)) * sample_rate_hz / (2 * numpy.pi)
+        decay = -float(numpy.log(numpy.abs(pole))) * sample_rate_hz
+        t = numpy.arange(num_samples) / sample_rate_hz
+        envelope = numpy.exp(-decay * t)
+        basis = numpy.column_stack((envelope * numpy.cos(2 * numpy.pi * frequency * t),
+                                    envelope * numpy.sin(2 * numpy.pi * frequency * t),
+                                    numpy.ones(num_samples)))
+        if not numpy.isfinite(basis).all():
+            return None
+
+    (cos_coefficient, sin_coefficient, mean), _, _, _ = numpy.linalg.lstsq(basis, waveform, rcond=None)
+    residuals = waveform - basis @ numpy.array([cos_coefficient, sin_coefficient, mean])
+    return DampedSinusoid(float(numpy.hypot(cos_coefficient, sin_coefficient)),
+                          decay,
+                          frequency,
+                          float(numpy.arctan2(-sin_coefficient, cos_coefficient)),
+                          float(mean),
+                          float(numpy.dot(residuals, residuals)),
+                          "matrix_pencil")
+
+
+def leastsq_damped_sinusoid(waveform: numpy.ndarray,
+                            sample_rate_hz: float = constants.SAMPLE_RATE_HZ,
+                            max_evaluations: int = 0,
+                            budget_s: typing.Optional[float] = None) -> typing.Optional[DampedSinusoid]:
+    """
+    Fits a damped sinusoid to a waveform with nonlinear least squares.
+    :param waveform: The waveform to fit.
+    :param sample_rate_hz: The sample rate of the waveform in Hz.
+    :param max_evaluations: The maximum number of function evaluations, or 0 for scipy's default.
+    :param budget_s: An optional time budget in seconds, which further caps the number of function evaluations.
+    :return: The fit damped sinusoid or None if the budget does not allow a single iteration.
+    """
+    waveform = numpy.asarray(waveform, dtype=numpy.float64)
+    t = numpy.arange(len(waveform)) / sample_rate_hz
+    guess = numpy.array([constants.NOMINAL_VRMS * numpy.sqrt(2), 200.0, 2500.0, 0.0, 0.0])
+
+    def optimize_func(args):
+        """
+        Optimized the function for finding and fitting the frequency.
+        :param args: A list containing in this order: amplitude, decay, frequency, phase, mean.
+        :return: Optimized function.
+        """
+        y_hat = args[0] * numpy.exp(-1.0 * args[1] * t) * numpy.cos(args[2] * 2 * numpy.pi * t + args[3]) + args[4]
+        return waveform - y_hat
+
+    if max_evaluations <= 0:
+        # scipy's default for a Jacobian estimated with forward differences
+        max_evaluations = 200 * (len(guess) + 1)
+    if budget_s is not None:
+        # Every evaluation costs about the same and each iteration adds a factorization of about the same cost, so
+        # the budget buys half as many evaluations as one timed evaluation suggests
+        start_s = time.perf_counter()
+        optimize_func(guess)
+        evaluation_s = max(time.perf_counter() - start_s, 1e-9)
+        max_evaluations = min(max_evaluations, int((budget_s - evaluation_s) / (2 * evaluation_s)))
+        # An iteration needs one evaluation per parameter for the Jacobian and one for the step
+        if max_evaluations < len(guess) + 1:
+            return None
+
+    # full_output keeps leastsq from warning every time it stops at max_evaluations
+    solution = optimize.leastsq(optimize_func, guess, maxfev=max_evaluations, full_output=True)[0]
+    residuals = optimize_func(solution)
+    return DampedSinusoid(solution[0],
+                          solution[1],
+                          solution[2],
+                          solution[3],
+                          solution[4],
+                          float(numpy.dot(residuals, residuals)),
+                          "leastsq")
@@ -2,8 +2,10 @@
 This module contains classes and functions for querying and manipulating data within a mongo database.
 """
 
+import bisect
 import datetime
 import enum
+import threading
 import time
 import typing
 
@@ -13,10 +15,17 @@ import bson.objectid
 import gridfs
 import numpy
 import pymongo
+import pymongo.errors
 
 import analysis
+import box_liveness
 import config
 import constants
+import log
+import waveform_cache
+
+# pylint: disable=C0103
+logger = log.get_logger(__name__)
 
 
 def timestamp_ms() -> int:
@@ -97,17 +106,280 @@ class Collection(enum.Enum):
     FS_CHUNKS = "fs.chunks"
     LAHA_CONFIG = "laha_config"
     MAKAI_CONFIG = "makai_config"
+    INCIDENT_IDS = "incident_ids"
+
+
+class IndexSpec:
+    """
+    A declared index on one of the OPQ collections.
+    """
+
+    def __init__(self,
+                 collection: Collection,
+                 keys: typing.List[typing.Tuple[str, int]],
+                 **options):
+        """
+        Initializes an IndexSpec.
+        :param collection: The collection the index belongs to.
+        :param keys: The (field, direction) pairs of the index.
+        :param options: Additional options passed to create_index (e.g. unique).
+        """
+        self.collection = collection
+        self.keys = keys
+        self.options = options
+
+    @property
+    def name(self) -> str:
+        """
+        Returns the name mongo assigns to this index by default.
+        :return: The name of this index.
+        """
+        return "_".join("%s_%s" % (field, direction) for field, direction in self.keys)
+
+    def __repr__(self) -> str:
+        return "IndexSpec(%s, %s)" % (self.collection.value, self.name)
+
+
+INDEX_CATALOG: typing.List[IndexSpec] = [
+    IndexSpec(Collection.MEASUREMENTS, [("expire_at", pymongo.ASCENDING)]),
+    IndexSpec(Collection.MEASUREMENTS, [("box_id", pymongo.ASCENDING), ("timestamp_ms", pymongo.ASCENDING)]),
+    IndexSpec(Collection.MEASUREMENTS, [("timestamp_ms", pymongo.ASCENDING)]),
+    IndexSpec(Collection.TRENDS, [("expire_at", pymongo.ASCENDING)]),
+    IndexSpec(Collection.TRENDS, [("box_id", pymongo.ASCENDING), ("timestamp_ms", pymongo.ASCENDING)]),
+    IndexSpec(Collection.EVENTS, [("expire_at", pymongo.ASCENDING)]),
+    IndexSpec(Collection.EVENTS, [("event_id", pymongo.ASCENDING)], unique=True),
+    IndexSpec(Collection.BOX_EVENTS, [("event_id", pymongo.ASCENDING), ("box_id", pymongo.ASCENDING)]),
+    IndexSpec(Collection.INCIDENTS, [("expire_at", pymongo.ASCENDING)]),
+    IndexSpec(Collection.INCIDENTS, [("incident_id", pymongo.ASCENDING)], unique=True),
+    IndexSpec(Collection.OPQ_BOXES, [("box_id", pymongo.ASCENDING)], unique=True),
+    # The same indexes GridFS creates on its first write, declared so that they exist before the first read
+    IndexSpec(Collection.FS_FILES, [("filename", pymongo.ASCENDING), ("uploadDate", pymongo.ASCENDING)]),
+    IndexSpec(Collection.FS_CHUNKS, [("files_id", pymongo.ASCENDING), ("n", pymongo.ASCENDING)], unique=True),
+]
+"""The indexes Mauka relies on, reconciled against the database by ensure_indexes"""
+
+
+class QueryShape:
+    """
+    The shape of a query that Mauka issues frequently and that must be served by an index.
+    """
+
+    def __init__(self,
+                 collection: Collection,
+                 query: typing.Dict,
+                 sort: typing.Optional[typing.List[typing.Tuple[str, int]]] = None,
+                 limit: int = 0):
+        """
+        Initializes a QueryShape.
+        :param collection: The collection that is queried.
+        :param query: A representative query filter.
+        :param sort: An optional sort specification.
+        :param limit: An optional limit, 0 for no limit.
+        """
+        self.collection = collection
+        self.query = query
+        self.sort = sort
+        self.limit = limit
+
+    def __repr__(self) -> str:
+        return "QueryShape(%s, %s, sort=%s)" % (self.collection.value, self.query, self.sort)
+
+
+HOT_QUERY_SHAPES: typing.List[QueryShape] = [
+    QueryShape(Collection.BOX_EVENTS, {"event_id": 1, "box_id": "1000"}),
+    QueryShape(Collection.BOX_EVENTS, {"event_id": 1}),
+    QueryShape(Collection.MEASUREMENTS, {"box_id": "1000", "timestamp_ms": {"$gte": 0, "$lte": 1}},
+               sort=[("timestamp_ms", pymongo.ASCENDING)]),
+    QueryShape(Collection.MEASUREMENTS, {"timestamp_ms": {"$gte": 0}}),
+    QueryShape(Collection.MEASUREMENTS, {"expire_at": {"$lt": 0}}),
+    # The batches of expired documents read by the incremental collectors of LahaGcPlugin
+    QueryShape(Collection.MEASUREMENTS, {"expire_at": {"$lt": 0}}, sort=[("expire_at", pymongo.ASCENDING)],
+               limit=1000),
+    QueryShape(Collection.TRENDS, {"box_id": "1000", "timestamp_ms": {"$gte": 0, "$lte": 1}}),
+    QueryShape(Collection.TRENDS, {"expire_at": {"$lt": 0}}, sort=[("expire_at", pymongo.ASCENDING)], limit=1000),
+    QueryShape(Collection.EVENTS, {"event_id": 1}),
+    QueryShape(Collection.EVENTS, {"expire_at": {"$lt": 0}}),
+    QueryShape(Collection.INCIDENTS, {"incident_id": 1}),
+    QueryShape(Collection.INCIDENTS, {}, sort=[("incident_id", pymongo.DESCENDING)], limit=1),
+    QueryShape(Collection.INCIDENTS, {"expire_at": {"$lt": 0}}),
+    QueryShape(Collection.FS_FILES, {"filename": "event_1_1000"}),
+    QueryShape(Collection.FS_FILES, {"filename": {"$in": ["event_1_1000", "event_1_1001"]}}),
+    QueryShape(Collection.FS_CHUNKS, {"files_id": {"$in": [bson.objectid.ObjectId()]}},
+               sort=[("files_id", pymongo.ASCENDING), ("n", pymongo.ASCENDING)]),
+    QueryShape(Collection.OPQ_BOXES, {"box_id": "1000"}),
+    QueryShape(Collection.OPQ_BOXES, {"box_id": {"$in": ["1000", "1001"]}}),
+]
+"""Representative shapes of the hot queries in Mauka, checked by verify_query_plans"""
+
+
+class BoxEventWaveform:
+    """
+    A box_event loaded together with its raw and calibrated waveforms.
+    """
+
+    def __init__(self, box_event: typing.Dict, waveform: numpy.ndarray, calibration_constant: float):
+        """
+        Initializes a BoxEventWaveform.
+        :param box_event: The box_event document.
+        :param waveform: The raw ADC waveform.
+        :param calibration_constant: The calibration constant of the box that recorded the waveform.
+        """
+        self.box_event = box_event
+        self.box_id: str = box_event["box_id"]
+        self.event_id: int = box_event["event_id"]
+        self.start_timestamp_ms: int = box_event["event_start_timestamp_ms"]
+        self.end_timestamp_ms: int = box_event["event_end_timestamp_ms"]
+        self.waveform = waveform
+        self.calibration_constant = calibration_constant
+
+    @property
+    def waveform_calibrated(self) -> numpy.ndarray:
+        """
+        :return: The waveform divided by the calibration constant.
+        """
+        return self.waveform / self.calibration_constant
+
+
+class BoxMetadataCache:
+    """
+    A thread safe, TTL bounded cache of opq_boxes metadata (location, calibration constant, etc).
+
+    Entries expire ttl_s seconds after they were loaded so that changes to the opq_boxes collection are picked up
+    without restarting Mauka. Boxes that DNE are cached as well so that unknown boxes do not cause repeated queries.
+    """
+
+    def __init__(self,
+                 opq_boxes_collection: pymongo.collection.Collection,
+                 ttl_s: float = 60.0,
+                 clock: typing.Callable[[], float] = time.time):
+        """
+        Initializes a BoxMetadataCache.
+        :param opq_boxes_collection: The opq_boxes collection to load metadata from.
+        :param ttl_s: Number of seconds an entry is valid for after being loaded.
+        :param clock: Function returning the current time in seconds.
+        """
+        self.opq_boxes_collection = opq_boxes_collection
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.entries: typing.Dict[str, typing.Tuple[float, typing.Optional[typing.Dict]]] = {}
+        self.lock = threading.Lock()
+
+    def get_many(self, box_ids: typing.List[str]) -> typing.Dict[str, typing.Optional[typing.Dict]]:
+        """
+        Returns the opq_boxes documents for several boxes. Expired or missing entries are loaded with a single query.
+        :param box_ids: The box_ids to get metadata for.
+        :return: A mapping from box_id to opq_box document, or None if the box DNE.
+        """
+        now = self.clock()
+        result = {}
+        stale_box_ids = set()
+        with self.lock:
+            for box_id in box_ids:
+                entry = self.entries.get(box_id)
+                if entry is not None and now - entry[0] < self.ttl_s:
+                    self.hits += 1
+                    result[box_id] = entry[1]
+                else:
+                    self.misses += 1
+                    stale_box_ids.add(box_id)
+
+        if not stale_box_ids:
+            return result
+
+        loaded = {box_id: None for box_id in stale_box_ids}
+        opq_boxes = self.opq_boxes_collection.find({"box_id": {"$in": list(stale_box_ids)}},
+                                                   projection={"_id": False})
+        for opq_box in opq_boxes:
+            loaded[opq_box["box_id"]] = opq_box
+
+        with self.lock:
+            for box_id, opq_box in loaded.items():
+                self.entries[box_id] = (now, opq_box)
+
+        result.update(loaded)
+        return result
+
+    def get(self, box_id: str) -> typing.Optional[typing.Dict]:
+        """
+        Returns the opq_boxes document for a box.
+        :param box_id: The box_id to get metadata for.
+        :return: The opq_box document, or None if the box DNE.
+        """
+        return self.get_many([box_id])[box_id]
+
+    def location(self, box_id: str) -> str:
+        """
+        Returns the current location of a box, or "UNKNOWN" if the location DNE.
+        :param box_id: The box to lookup the location for.
+        :return: The location slug for the provided box.
+        """
+        opq_box = self.get(box_id)
+        if opq_box is None or "location" not in opq_box:
+            return "UNKNOWN"
+
+        return opq_box["location"]
+
+    def calibration_constants(self, box_ids: typing.List[str]) -> typing.Dict[str, float]:
+        """
+        Returns the calibration constants for several boxes.
+        :param box_ids: The box_ids to get calibration constants for.
+        :return: A mapping from box_id to calibration constant. Boxes that DNE map to 1.0.
+        """
+        calibration_constants = {}
+        for box_id, opq_box in self.get_many(box_ids).items():
+            if opq_box is None or "calibration_constant" not in opq_box:
+                calibration_constants[box_id] = 1.0
+            else:
+                calibration_constants[box_id] = opq_box["calibration_constant"]
+
+        return calibration_constants
+
+    def calibration_constant(self, box_id: str) -> float:
+        """
+        Returns the calibration constant associated with the provided box_id.
+        :param box_id: The box_id to get the calibration constant for.
+        :return: The calibration constant or 1.0 if the box DNE.
+        """
+        return self.calibration_constants([box_id])[box_id]
+
+    def invalidate(self, box_id: typing.Optional[str] = None):
+        """
+        Invalidates a single cached box, or all cached boxes when no box_id is provided.
+        :param box_id: The box_id to invalidate.
+        """
+        with self.lock:
+            if box_id is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(box_id, None)
+
+    def stats(self) -> typing.Dict[str, int]:
+        """
+        Returns the hit and miss counters and the number of cached boxes.
+        :return: The hit and miss counters and the number of cached boxes.
+        """
+        with self.lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "size": len(self.entries)}
 
 
 class OpqMongoClient:
     """Convenience mongo client for easily operating on OPQ data"""
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 27017, database_name: str = "opq"):
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 27017,
+                 database_name: str = "opq",
+                 box_metadata_ttl_s: float = 60.0):
         """
         Initializes an OpqMongoClient.
         :param host: Host of mongo database
         :param port: Port of mongo database
         :param database_name: The name of the database on mongo
+        :param box_metadata_ttl_s: Number of seconds opq_boxes metadata is cached for
         """
 
         self.client = pymongo.MongoClient(host, port)
@@ -152,6 +424,21 @@ class OpqMongoClient:
 
         self.makai_config_collection = self.get_collection(Collection.MAKAI_CONFIG.value)
 
+        self.incident_ids_collection = self.get_collection(Collection.INCIDENT_IDS.value)
+        """Incident id high-water mark"""
+
+        self.box_metadata_cache = BoxMetadataCache(self.opq_boxes_collection, box_metadata_ttl_s)
+        """Cache of opq_boxes metadata"""
+
+        self.box_liveness = box_liveness.BoxLivenessTracker(self.measurements_collection)
+        """When each box was first and last seen"""
+
+        self.incident_writer: typing.Optional['IncidentWriter'] = None
+        """Optional write-behind writer used by store_incident"""
+
+        self.waveform_cache: typing.Optional[waveform_cache.WaveformCache] = None
+        """Optional node-local cache of raw event waveforms"""
+
     def get_collection(self, collection: str) -> pymongo.collection.Collection:
         """ Returns a mongo collection by name
 
@@ -186,6 +473,60 @@ class OpqMongoClient:
             file_id = gridfs_document["_id"]
             self.gridfs.delete(file_id)
 
+    def delete_gridfs_files(self, filenames: typing.List[str]) -> typing.Tuple[int, int]:
+        """
+        Deletes many files from gridfs using one query and two bulk deletes rather than one round-trip per file.
+        Chunks are deleted before their files so that an interrupted delete can be completed by deleting the same
+        filenames again.
+        :param filenames: The filenames of the files to delete.
+        :return: The number of files that were deleted and the sum of their lengths in bytes.
+        """
+        if not filenames:
+            return 0, 0
+
+        fs_files = list(self.fs_files_collection.find({"filename": {"$in": list(set(filenames))}},
+                                                      projection={"_id": True,
+                                                                  "length": True}))
+        if not fs_files:
+            return 0, 0
+
+        file_ids = [fs_file["_id"] for fs_file in fs_files]
+        self.fs_chunks_collection.delete_many({"files_id": {"$in": file_ids}})
+        deleted_count = self.fs_files_collection.delete_many({"_id": {"$in": file_ids}}).deleted_count
+        return deleted_count, sum(fs_file.get("length", 0) for fs_file in fs_files)
+
+    def gridfs_length_by_prefix(self,
+                                prefixes: typing.List[str],
+                                id_query: typing.Optional[typing.Dict] = None) -> typing.Dict[str, int]:
+        """
+        Sums the lengths of gridfs files grouped by filename prefix with a single server-side aggregation.
+        :param prefixes: The filename prefixes to group by. A file belongs to the first prefix its filename starts with
+        and files that start with none of the prefixes are not summed.
+        :param id_query: An optional query on _id that limits which files are summed.
+        :return: The sum of the file lengths in bytes of each prefix.
+        """
+        branches = [{"case": {"$eq": [{"$indexOfCP": [{"$ifNull": ["$filename", ""]}, prefix]}, 0]},
+                     "then": prefix}
+                    for prefix in prefixes]
+
+        pipeline = []
+        if id_query:
+            pipeline.append({"$match": {"_id": id_query}})
+        pipeline.extend([
+            {"$project": {"_id": False,
+                          "length": True,
+                          "prefix": {"$switch": {"branches": branches,
+                                                 "default": None}}}},
+            {"$match": {"prefix": {"$ne": None}}},
+            {"$group": {"_id": "$prefix",
+                        "length": {"$sum": "$length"}}}
+        ])
+
+        lengths = {prefix: 0 for prefix in prefixes}
+        for group in self.fs_files_collection.aggregate(pipeline):
+            lengths[group["_id"]] = int(group["length"])
+        return lengths
+
     def get_ttl(self, collection: str) -> int:
         """
         Returns the TTL for the provided collection.
@@ -229,15 +570,7 @@ class OpqMongoClient:
         :param box_id: The box_id to get the calibration constant for.
         :return: The calibration constant.
         """
-        opq_box = self.opq_boxes_collection.find_one({"box_id": box_id},
-                                                     projection={'_id': False,
-                                                                 "calibration_constant": True,
-                                                                 "box_id": True})
-
-        if opq_box is None:
-            return 1.0
-        else:
-            return opq_box["calibration_constant"]
+        return self.box_metadata_cache.calibration_constant(box_id)
 
     def read_file(self, fid: str) -> bytes:
         """
@@ -273,6 +606,126 @@ class OpqMongoClient:
         self.gridfs.put(payload_bytes, **{"filename": filename})
         return filename
 
+    def latest_file_ids(self, filenames: typing.List[str]) -> typing.Dict[str, typing.Any]:
+        """
+        Looks up the gridfs file _ids of several files using one fs.files query.
+        :param filenames: The file names to look up.
+        :return: A mapping from file name to file _id. Files that DNE are not included.
+        """
+        if not filenames:
+            return {}
+
+        # When a filename was written more than once, the latest version wins (like gridfs.get_last_version)
+        fs_files = self.fs_files_collection.find({"filename": {"$in": list(set(filenames))}},
+                                                 projection={"_id": True,
+                                                             "filename": True}).sort("uploadDate", pymongo.ASCENDING)
+        return {fs_file["filename"]: fs_file["_id"] for fs_file in fs_files}
+
+    def read_file_ids(self, file_ids: typing.List[typing.Any]) -> typing.Dict[typing.Any, bytes]:
+        """
+        Loads several files from gridfs by _id using one fs.chunks query.
+        :param file_ids: The file _ids to load.
+        :return: A mapping from file _id to file contents.
+        """
+        if not file_ids:
+            return {}
+
+        file_id_to_chunks: typing.Dict[typing.Any, typing.List[typing.Tuple[int, bytes]]] = {
+            file_id: [] for file_id in file_ids
+        }
+        fs_chunks = self.fs_chunks_collection.find({"files_id": {"$in": list(file_id_to_chunks.keys())}},
+                                                   projection={"_id": False,
+                                                               "files_id": True,
+                                                               "n": True,
+                                                               "data": True})
+        for fs_chunk in fs_chunks:
+            file_id_to_chunks[fs_chunk["files_id"]].append((fs_chunk["n"], fs_chunk["data"]))
+
+        files = {}
+        for file_id, chunks in file_id_to_chunks.items():
+            chunks.sort(key=lambda chunk: chunk[0])
+            files[file_id] = b"".join(map(lambda chunk: bytes(chunk[1]), chunks))
+
+        return files
+
+    def read_files(self, filenames: typing.List[str]) -> typing.Dict[str, bytes]:
+        """
+        Loads several files from gridfs using one fs.files query and one fs.chunks query.
+        :param filenames: The file names to load.
+        :return: A mapping from file name to file contents. Files that DNE are not included.
+        """
+        filename_to_file_id = self.latest_file_ids(filenames)
+        files = self.read_file_ids(list(filename_to_file_id.values()))
+        return {filename: files[file_id] for filename, file_id in filename_to_file_id.items()}
+
+    def read_waveforms(self, data_fs_filenames: typing.List[str]) -> typing.Dict[str, numpy.ndarray]:
+        """
+        Loads several raw 16 bit waveforms. The waveform cache is keyed by gridfs file _id, so the _ids are looked up
+        first. Waveforms are read from the waveform cache when available, the remaining waveforms are loaded with
+        read_file_ids and then added to the cache.
+        :param data_fs_filenames: The gridfs filenames of the waveforms.
+        :return: A mapping from file name to waveform. Files that DNE are not included.
+        """
+        if self.waveform_cache is None:
+            return {filename: to_s16bit(data) for filename, data in self.read_files(data_fs_filenames).items()}
+
+        waveforms = {}
+        uncached_file_ids = {}
+        for data_fs_filename, file_id in self.latest_file_ids(data_fs_filenames).items():
+            waveform = self.waveform_cache.get(str(file_id))
+            if waveform is None:
+                uncached_file_ids[file_id] = data_fs_filename
+            else:
+                waveforms[data_fs_filename] = waveform
+
+        for file_id, data in self.read_file_ids(list(uncached_file_ids.keys())).items():
+            try:
+                self.waveform_cache.put(str(file_id), data)
+            except OSError as error:
+                logger.warning("Error caching waveform %s: %s", uncached_file_ids[file_id], str(error))
+            waveforms[uncached_file_ids[file_id]] = to_s16bit(data)
+
+        return waveforms
+
+    def get_box_calibration_constants(self, box_ids: typing.List[str]) -> typing.Dict[str, float]:
+        """
+        Returns the calibration constants for several boxes using at most a single query.
+        :param box_ids: The box_ids to get calibration constants for.
+        :return: A mapping from box_id to calibration constant. Boxes that DNE map to 1.0.
+        """
+        return self.box_metadata_cache.calibration_constants(box_ids)
+
+    def load_event_waveforms(self, event_id: int) -> typing.Dict[str, BoxEventWaveform]:
+        """
+        Loads every box_event of an event together with its raw and calibrated waveforms.
+
+        This uses a constant number of queries independent of the number of boxes: one for box_events, one each for
+        fs.files and fs.chunks, and one for calibration constants.
+        :param event_id: The event to load.
+        :return: A mapping from box_id to the loaded box_event. Box events whose waveform DNE are not included.
+        """
+        box_events = list(self.box_events_collection.find({"event_id": event_id},
+                                                          projection={"_id": False}))
+        if not box_events:
+            return {}
+
+        waveforms = self.read_waveforms(list(map(lambda box_event: box_event["data_fs_filename"], box_events)))
+        calibration_constants = self.get_box_calibration_constants(
+            list(map(lambda box_event: box_event["box_id"], box_events)))
+
+        box_event_waveforms = {}
+        for box_event in box_events:
+            data_fs_filename = box_event["data_fs_filename"]
+            if data_fs_filename not in waveforms:
+                continue
+
+            waveform = waveforms[data_fs_filename].astype(numpy.int64)
+            box_event_waveforms[box_event["box_id"]] = BoxEventWaveform(box_event,
+                                                                        waveform,
+                                                                        calibration_constants[box_event["box_id"]])
+
+        return box_event_waveforms
+
     def get_collection_size_bytes(self,
                                   collection: Collection) -> int:
         """
@@ -285,15 +738,11 @@ class OpqMongoClient:
 
     def get_active_box_ids(self) -> typing.List[str]:
         """
-        Returns a list of active box ids.
+        Returns a list of boxes that have sent a measurement within the last minute.
         :return: A list of active box ids.
         """
-        one_min_ago = timestamp_ms() - 60000
-        query = self.measurements_collection.find({"timestamp_ms": {"$gte": one_min_ago}},
-                                                  projection={"timestamp_ms": True,
-                                                              "box_id": True})
-
-        return list(set(map(lambda measurement: measurement["box_id"], query)))
+        self.box_liveness.update()
+        return list(self.box_liveness.active_boxes(60_000))
 
 
 def get_waveform(mongo_client: OpqMongoClient, data_fs_filename: str) -> numpy.ndarray:
@@ -416,12 +865,42 @@ def next_available_incident_id(opq_mongo_client: OpqMongoClient) -> int:
     :return: Next available incident id
     """
     mongo_client = get_default_client(opq_mongo_client)
+    high_water_mark = get_incident_id_high_water_mark(mongo_client)
     if mongo_client.incidents_collection.count() > 0:
         last_incident = mongo_client.incidents_collection.find().sort("incident_id", pymongo.DESCENDING).limit(1)[0]
         last_incident_id = last_incident["incident_id"]
-        return last_incident_id + 1
+        return max(last_incident_id + 1, high_water_mark)
+
+    return max(1, high_water_mark)
 
-    return 1
+
+INCIDENT_ID_HIGH_WATER_MARK_ID = "incident_id_high_water_mark"
+
+
+def get_incident_id_high_water_mark(opq_mongo_client: OpqMongoClient) -> int:
+    """
+    Returns the persisted incident id high-water mark, the first incident id that has never been leased.
+    :param opq_mongo_client: An optional mongo client to use for DB access (will be created if not-provided)
+    :return: The persisted incident id high-water mark or 0 if one has not been persisted.
+    """
+    mongo_client = get_default_client(opq_mongo_client)
+    high_water_mark = mongo_client.incident_ids_collection.find_one({"_id": INCIDENT_ID_HIGH_WATER_MARK_ID})
+    if high_water_mark is None:
+        return 0
+
+    return high_water_mark["high_water_mark"]
+
+
+def store_incident_id_high_water_mark(high_water_mark: int, opq_mongo_client: OpqMongoClient):
+    """
+    Persists the incident id high-water mark. The persisted value never decreases.
+    :param high_water_mark: The first incident id that has never been leased.
+    :param opq_mongo_client: An optional mongo client to use for DB access (will be created if not-provided)
+    """
+    mongo_client = get_default_client(opq_mongo_client)
+    mongo_client.incident_ids_collection.update_one({"_id": INCIDENT_ID_HIGH_WATER_MARK_ID},
+                                                    {"$max": {"high_water_mark": high_water_mark}},
+                                                    upsert=True)
 
 
 def store_event(event_id: int,
@@ -536,39 +1015,8 @@ def store_incident(incident_id: int,
         return None
 
     mongo_client = get_default_client(opq_mongo_client)
-    # incident_id = next_available_incident_id(mongo_client)
-    location = get_location(box_id, mongo_client)
     ieee_duration = ieee_duration.value if ieee_duration is not None else get_ieee_duration(end_timestamp_ms -
                                                                                             start_timestamp_ms).value
-    expire_at = timestamp_s_plus_s(mongo_client.get_ttl("incidents"))
-
-    if copy_data:
-        box_event = mongo_client.box_events_collection.find_one({"event_id": event_id,
-                                                                 "box_id": box_id})
-
-        measurements = list(mongo_client.measurements_collection.find({"box_id": box_id,
-                                                                       "timestamp_ms": {"$gte": start_timestamp_ms,
-                                                                                        "$lte": end_timestamp_ms}},
-                                                                      {"_id": False,
-                                                                       "expireAt": False}))
-
-        event_adc_samples = get_waveform(mongo_client, box_event["data_fs_filename"])
-        event_start_timestamp_ms = box_event["event_start_timestamp_ms"]
-        delta_start_ms = start_timestamp_ms - event_start_timestamp_ms
-        delta_end_ms = end_timestamp_ms - event_start_timestamp_ms
-        # Provide a ms worth of buffer to account for floating point error?
-        incident_start_idx = int(max(0,
-                                     round(analysis.ms_to_samples(delta_start_ms)) - constants.SAMPLES_PER_MILLISECOND))
-        incident_end_idx = int(min(len(event_adc_samples),
-                                   round(analysis.ms_to_samples(delta_end_ms)) + constants.SAMPLES_PER_MILLISECOND))
-        incident_adc_samples_bytes = event_adc_samples[incident_start_idx:incident_end_idx].astype(
-            numpy.int16).tobytes()
-
-        gridfs_filename = "incident_{}".format(incident_id)
-        mongo_client.write_incident_waveform(incident_id, gridfs_filename, incident_adc_samples_bytes)
-    else:
-        measurements = []
-        gridfs_filename = ""
 
     incident = {
         "incident_id": incident_id,
@@ -576,23 +1024,357 @@ def store_incident(incident_id: int,
         "box_id": box_id,
         "start_timestamp_ms": start_timestamp_ms,
         "end_timestamp_ms": end_timestamp_ms,
-        "location": location,
+        "location": get_location(box_id, mongo_client),
         "measurement_type": measurement_type.value,
         "deviation_from_nominal": deviation_from_nominal,
-        "measurements": measurements,
-        "gridfs_filename": gridfs_filename,
+        "measurements": [],
+        "gridfs_filename": "",
         "classifications": list(map(lambda e: e.value, classifications)),
         "ieee_duration": ieee_duration,
         "annotations": annotations,
         "metadata": metadata,
-        "expire_at": expire_at
+        "expire_at": timestamp_s_plus_s(mongo_client.get_ttl("incidents"))
     }
 
-    mongo_client.incidents_collection.insert_one(incident)
+    if mongo_client.incident_writer is not None:
+        mongo_client.incident_writer.add(incident, copy_data)
+    else:
+        write_incidents([(incident, copy_data)], mongo_client)
 
     return incident_id
 
 
+def incident_gridfs_filename(incident: typing.Dict) -> str:
+    """
+    Returns the gridfs filename of the waveform of an incident.
+    :param incident: The incident document.
+    :return: The gridfs filename.
+    """
+    return "incident_{}".format(incident["incident_id"])
+
+
+def write_incidents(incidents: typing.List[typing.Tuple[typing.Dict, bool]], opq_mongo_client: OpqMongoClient):
+    """
+    Writes a batch of incidents created by store_incident.
+
+    When data is copied, the parent box_events, their waveforms, and the measurements covering every incident are each
+    loaded with a single query so that a parent waveform is only read once per (event_id, box_id). Parent waveforms
+    already in the waveform cache are not read from gridfs at all. The incidents are
+    then inserted with a single insert_many.
+    :param incidents: A list of (incident document, copy_data) pairs.
+    :param opq_mongo_client: An optional mongo client to use for DB access (will be created if not-provided)
+    """
+    if not incidents:
+        return
+
+    mongo_client = get_default_client(opq_mongo_client)
+    incidents_to_copy = [incident for incident, copy_data in incidents if copy_data]
+
+    if incidents_to_copy:
+        event_box_ids = {(incident["event_id"], incident["box_id"]) for incident in incidents_to_copy}
+        box_events = mongo_client.box_events_collection.find({"$or": [{"event_id": event_id, "box_id": box_id}
+                                                                      for event_id, box_id in event_box_ids]},
+                                                             projection={"_id": False,
+                                                                         "event_id": True,
+                                                                         "box_id": True,
+                                                                         "event_start_timestamp_ms": True,
+                                                                         "data_fs_filename": True})
+        event_box_id_to_box_event = {(box_event["event_id"], box_event["box_id"]): box_event
+                                     for box_event in box_events}
+        waveforms = mongo_client.read_waveforms(list(map(lambda box_event: box_event["data_fs_filename"],
+                                                         event_box_id_to_box_event.values())))
+
+        measurements = mongo_client.measurements_collection.find(
+            {"$or": [{"box_id": incident["box_id"],
+                      "timestamp_ms": {"$gte": incident["start_timestamp_ms"],
+                                       "$lte": incident["end_timestamp_ms"]}}
+                     for incident in incidents_to_copy]},
+            {"_id": False,
+             "expireAt": False}).sort("timestamp_ms", pymongo.ASCENDING)
+        box_id_to_measurements: typing.Dict[str, typing.List[typing.Dict]] = {}
+        for measurement in measurements:
+            box_id_to_measurements.setdefault(measurement["box_id"], []).append(measurement)
+        box_id_to_timestamps = {box_id: list(map(lambda measurement: measurement["timestamp_ms"], box_measurements))
+                                for box_id, box_measurements in box_id_to_measurements.items()}
+
+        # A batch that is retried after a failed insert must not store its incident waveforms a second time
+        existing_filenames = {fs_file["filename"] for fs_file in mongo_client.fs_files_collection.find(
+            {"filename": {"$in": [incident_gridfs_filename(incident) for incident in incidents_to_copy]}},
+            projection={"_id": False, "filename": True})}
+
+        for incident in incidents_to_copy:
+            box_id = incident["box_id"]
+            start_timestamp_ms = incident["start_timestamp_ms"]
+            end_timestamp_ms = incident["end_timestamp_ms"]
+
+            if box_id in box_id_to_measurements:
+                timestamps = box_id_to_timestamps[box_id]
+                start_idx = bisect.bisect_left(timestamps, start_timestamp_ms)
+                end_idx = bisect.bisect_right(timestamps, end_timestamp_ms)
+                incident["measurements"] = box_id_to_measurements[box_id][start_idx:end_idx]
+
+            box_event = event_box_id_to_box_event.get((incident["event_id"], box_id))
+            if box_event is None or box_event["data_fs_filename"] not in waveforms:
+                continue
+
+            event_adc_samples = waveforms[box_event["data_fs_filename"]]
+            event_start_timestamp_ms = box_event["event_start_timestamp_ms"]
+            delta_start_ms = start_timestamp_ms - event_start_timestamp_ms
+            delta_end_ms = end_timestamp_ms - event_start_timestamp_ms
+            # Provide a ms worth of buffer to account for floating point error?
+            incident_start_idx = int(max(0,
+                                         round(analysis.ms_to_samples(delta_start_ms)) -
+                                         constants.SAMPLES_PER_MILLISECOND))
+            incident_end_idx = int(min(len(event_adc_samples),
+                                       round(analysis.ms_to_samples(delta_end_ms)) +
+                                       constants.SAMPLES_PER_MILLISECOND))
+            incident_adc_samples_bytes = event_adc_samples[incident_start_idx:incident_end_idx].tobytes()
+
+            gridfs_filename = incident_gridfs_filename(incident)
+            if gridfs_filename not in existing_filenames:
+                mongo_client.write_incident_waveform(incident["incident_id"],
+                                                     gridfs_filename,
+                                                     incident_adc_samples_bytes)
+            incident["gridfs_filename"] = gridfs_filename
+
+    mongo_client.incidents_collection.insert_many([incident for incident, _ in incidents])
+
+
+class WriteBehindBuffer:
+    """
+    Base class of buffers that collect pending writes and write them in batches from a background flush thread.
+
+    Subclasses implement take_pending, restore_pending and write, and optionally written. A batch whose write raises is
+    handed back to restore_pending so that the next flush retries it, and the flush thread backs off exponentially up
+    to max_backoff_s while writes keep failing. stop ends the flush thread and makes a final attempt to write.
+    """
+
+    def __init__(self, description: str, window_s: float, max_backoff_s: float = 60.0):
+        """
+        Initializes a WriteBehindBuffer. The flush thread is started by start_flush_thread.
+        :param description: What is written, used in error messages.
+        :param window_s: Number of seconds between flushes.
+        :param max_backoff_s: Maximum number of seconds between flushes while writes are failing.
+        """
+        self.description = description
+        self.window_s = window_s
+        self.max_backoff_s = max(window_s, max_backoff_s)
+        self.failed_flushes = 0
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def start_flush_thread(self):
+        """
+        Starts the thread that flushes every window_s seconds until stop is called.
+        """
+        threading.Thread(target=self.run_flush_loop, daemon=True).start()
+
+    def take_pending(self) -> typing.Any:
+        """
+        Removes and returns everything pending. Called with lock held.
+        :return: The pending batch, which is falsy when nothing is pending.
+        """
+        raise NotImplementedError()
+
+    def restore_pending(self, batch: typing.Any):
+        """
+        Puts back a batch that could not be written ahead of anything added since. Called with lock held.
+        :param batch: The batch that could not be written.
+        """
+        raise NotImplementedError()
+
+    def write(self, batch: typing.Any):
+        """
+        Writes a batch. If only part of the batch was written before an error, the written part may be removed from
+        the batch before the error is raised so that it is not retried.
+        :param batch: The batch to write.
+        """
+        raise NotImplementedError()
+
+    def written(self, batch: typing.Any):
+        """
+        Called once a batch has been written.
+        :param batch: The batch that was written.
+        """
+
+    def flush(self):
+        """
+        Writes everything pending. If the write fails the batch is restored and the error is raised.
+        """
+        with self.flush_lock:
+            with self.lock:
+                batch = self.take_pending()
+
+            if not batch:
+                return
+
+            try:
+                self.write(batch)
+            except Exception:
+                with self.lock:
+                    self.restore_pending(batch)
+                    self.failed_flushes += 1
+                raise
+
+            self.written(batch)
+
+    def try_flush(self) -> bool:
+        """
+        Writes everything pending and logs rather than raises errors.
+        :return: Whether the flush succeeded.
+        """
+        try:
+            self.flush()
+            return True
+        # pylint: disable=W0703
+        except Exception as exception:
+            logger.error("Error writing %s: %s", self.description, str(exception))
+            return False
+
+    def run_flush_loop(self):
+        """
+        Flushes every window_s seconds, backing off while writes fail, until stop is called.
+        """
+        delay_s = self.window_s
+        while not self.stop_event.wait(delay_s):
+            delay_s = self.window_s if self.try_flush() else min(2 * delay_s, self.max_backoff_s)
+
+    def stop(self):
+        """
+        Stops the flush thread and writes everything pending.
+        :return: Whether the final flush succeeded.
+        """
+        self.stop_event.set()
+        return self.try_flush()
+
+
+# Error code of a write rejected by a unique index
+DUPLICATE_KEY_ERROR = 11000
+
+
+class IncidentWriter(WriteBehindBuffer):
+    """
+    Write-behind writer that batches incidents created by store_incident.
+
+    Incidents are collected for at most window_s seconds (or until max_batch incidents are pending) and then written
+    with write_incidents. Incident ids are still returned synchronously by store_incident. Work that depends on an
+    incident being in the database can be deferred with run_when_written. Incidents that fail to be written stay
+    pending, together with their deferred work, until a later flush writes them. Incidents that the server rejects are
+    not retried, see reject.
+    """
+
+    def __init__(self, mongo_client: OpqMongoClient, window_s: float, max_batch: int = 64):
+        """
+        Initializes an IncidentWriter and starts its flush thread.
+        :param mongo_client: The mongo client to write incidents with.
+        :param window_s: Maximum number of seconds an incident stays pending.
+        :param max_batch: Number of pending incidents that triggers an immediate flush.
+        """
+        super().__init__("incidents", window_s)
+        self.mongo_client = mongo_client
+        self.max_batch = max_batch
+        self.pending: typing.List[typing.Tuple[typing.Dict, bool]] = []
+        self.pending_callbacks: typing.Dict[int, typing.List[typing.Callable[[], None]]] = {}
+        self.incidents_written = 0
+        self.incidents_dropped = 0
+        self.batches_written = 0
+        self.start_flush_thread()
+
+    def add(self, incident: typing.Dict, copy_data: bool):
+        """
+        Adds an incident to the pending batch.
+        :param incident: The incident document.
+        :param copy_data: Should data be copied from measurements and waveforms?
+        """
+        with self.lock:
+            self.pending.append((incident, copy_data))
+            self.pending_callbacks[incident["incident_id"]] = []
+            batch_full = len(self.pending) >= self.max_batch
+
+        if batch_full:
+            self.try_flush()
+
+    def run_when_written(self, incident_id: int, callback: typing.Callable[[], None]):
+        """
+        Runs a callback once an incident has been written. If the incident is not pending, the callback is ran now.
+        :param incident_id: The incident id.
+        :param callback: The callback to run.
+        """
+        with self.lock:
+            if incident_id in self.pending_callbacks:
+                self.pending_callbacks[incident_id].append(callback)
+                return
+
+        callback()
+
+    def take_pending(self) -> typing.List[typing.Tuple[typing.Dict, bool]]:
+        incidents = self.pending
+        self.pending = []
+        return incidents
+
+    def restore_pending(self, batch: typing.List[typing.Tuple[typing.Dict, bool]]):
+        self.pending = batch + self.pending
+
+    def write(self, batch: typing.List[typing.Tuple[typing.Dict, bool]]):
+        while True:
+            try:
+                write_incidents(batch, self.mongo_client)
+                return
+            except pymongo.errors.BulkWriteError as error:
+                # Incidents are inserted in order, so the ones before the error are in the database and must not be
+                # retried
+                inserted = error.details.get("nInserted", 0)
+                self.written(batch[:inserted])
+                del batch[:inserted]
+                write_error = next((write_error for write_error in error.details.get("writeErrors", [])
+                                    if write_error.get("index") == inserted), None)
+                if write_error is None:
+                    raise
+
+                # Retrying an incident that the server rejected fails the same way and would hold back every incident
+                # added after it, so it is taken out of the batch and the rest of the batch is written now
+                self.reject(batch.pop(0), write_error)
+                if not batch:
+                    return
+
+    def reject(self, pending_incident: typing.Tuple[typing.Dict, bool], write_error: typing.Dict):
+        """
+        Takes an incident that the server rejected out of the pending incidents. An incident rejected as a duplicate
+        key is already in the database, likely from a write whose reply was lost, so its callbacks are ran. Any other
+        incident is dropped together with its callbacks.
+        :param pending_incident: The rejected (incident document, copy_data) pair.
+        :param write_error: The write error the server rejected the incident with.
+        """
+        incident_id = pending_incident[0]["incident_id"]
+        if write_error.get("code") == DUPLICATE_KEY_ERROR:
+            logger.warning("Incident %d was already written", incident_id)
+            self.written([pending_incident])
+            return
+
+        logger.error("Dropping incident %d: %s", incident_id, write_error.get("errmsg"))
+        with self.lock:
+            self.incidents_dropped += 1
+            self.pending_callbacks.pop(incident_id, None)
+
+    def written(self, batch: typing.List[typing.Tuple[typing.Dict, bool]]):
+        """
+        Runs the callbacks waiting on written incidents.
+        :param batch: The incidents that were written.
+        """
+        if not batch:
+            return
+
+        with self.lock:
+            self.incidents_written += len(batch)
+            self.batches_written += 1
+            callbacks = [self.pending_callbacks.pop(incident["incident_id"], []) for incident, _ in batch]
+
+        for incident_callbacks in callbacks:
+            for callback in incident_callbacks:
+                callback()
+
+
 def get_box_event(event_id: int, box_id: str, opq_mongo_client: OpqMongoClient = None) -> typing.Dict:
     """
     Returns the box_event associated with the provided event_id and box_id.
@@ -613,66 +1395,124 @@ def get_location(box_id: str, opq_mongo_client: OpqMongoClient) -> str:
     :param opq_mongo_client: An optional mongo client to use for DB access (will be created if not-provided)
     :return: The location slug for the provided box
     """
-    unknown = "UNKNOWN"
     mongo_client = get_default_client(opq_mongo_client)
-    box = mongo_client.opq_boxes_collection.find_one({"box_id": box_id})
-
-    if box is None:
-        return unknown
+    return mongo_client.box_metadata_cache.location(box_id)
 
-    if "location" not in box:
-        return unknown
 
-    return box["location"]
-
-
-def get_calibration_constant(box_id: str) -> float:
+def get_calibration_constant(box_id: str, opq_mongo_client: OpqMongoClient = None) -> float:
     """
     Return the calibration constant for a specified box id.
     :param box_id: The box id to query
+    :param opq_mongo_client: An optional mongo client to use for DB access (will be created if not-provided)
     :return: The calibration constant or 1.0 if the constant can't be found
     """
-    calibration_constants = get_box_calibration_constants()
-    if box_id in calibration_constants:
-        return calibration_constants[box_id]
+    mongo_client = get_default_client(opq_mongo_client)
+    return mongo_client.box_metadata_cache.calibration_constant(box_id)
 
-    return 1.0
 
+def object_id(oid: str) -> bson.objectid.ObjectId:
+    """Given the string representation of an object an id, return an instance of an ObjectID
 
-def memoize(single_param_fn: typing.Callable) -> typing.Callable:
-    """
-    Memoizes function returns.
-    :param single_param_fn: The function to memoize.
-    :return: A memoized version of callable
+    :param oid: The oid to encode
+    :return: ObjectId from string
     """
-    cache = {}
-
-    def helper(key):
-        """
-        Closure that closes over cache. If value is not in cache, callable is ran to produce the value.
-        :param key: Value to check if in cache
-        :return: Value from fn call.
-        """
-        if key in cache:
-            return cache[key]
-
-        cache[key] = single_param_fn(key)
-        return cache[key]
+    return bson.objectid.ObjectId(oid)
 
-    return helper
 
+def index_keys(keys: typing.List[typing.Tuple[str, typing.Union[int, float, str]]]) -> typing.Tuple:
+    """
+    Normalizes the key of an index as reported by index_information so that it can be compared with an IndexSpec.
+    :param keys: The (field, direction) pairs of an index.
+    :return: The normalized (field, direction) pairs.
+    """
+    return tuple((field, direction if isinstance(direction, str) else int(direction)) for field, direction in keys)
 
-# pylint: disable=C0103
-cached_calibration_constant = memoize(get_calibration_constant)
 
+def ensure_indexes(mongo_client: OpqMongoClient,
+                   index_catalog: typing.Optional[typing.List[IndexSpec]] = None) -> typing.List[IndexSpec]:
+    """
+    Reconciles the indexes in the database with a declared index catalog by creating any declared index that is
+    missing. An existing index with the same keys satisfies a declared index regardless of its name or options so that
+    indexes created by hand are not recreated. Indexes that are not declared are left in place.
+    :param mongo_client: An OpqMongoClient.
+    :param index_catalog: The declared indexes, defaults to INDEX_CATALOG.
+    :return: The indexes that were created.
+    """
+    index_catalog = INDEX_CATALOG if index_catalog is None else index_catalog
+    existing_keys: typing.Dict[Collection, typing.Set[typing.Tuple]] = {}
+    created = []
+    for index_spec in index_catalog:
+        if index_spec.collection not in existing_keys:
+            index_information = mongo_client.get_collection(index_spec.collection.value).index_information()
+            existing_keys[index_spec.collection] = {index_keys(index["key"]) for index in index_information.values()}
+
+        keys = tuple(index_spec.keys)
+        if keys in existing_keys[index_spec.collection]:
+            continue
+
+        try:
+            mongo_client.get_collection(index_spec.collection.value).create_index(index_spec.keys,
+                                                                                  **index_spec.options)
+            existing_keys[index_spec.collection].add(keys)
+            created.append(index_spec)
+            logger.info("Created index %s", index_spec)
+        except pymongo.errors.PyMongoError as error:
+            logger.error("Error creating index %s: %s", index_spec, str(error))
+
+    return created
+
+
+def query_plan_stages(plan: typing.Dict) -> typing.List[str]:
+    """
+    Returns every stage of an explained query plan.
+    :param plan: A query plan (or any part of an explain document).
+    :return: The names of the stages within the plan.
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(query_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(query_plan_stages(value))
+    return stages
+
+
+def explain_stages(mongo_client: OpqMongoClient, query_shape: QueryShape) -> typing.List[str]:
+    """
+    Explains a query shape and returns the stages of its winning plan.
+    :param mongo_client: An OpqMongoClient.
+    :param query_shape: The query shape to explain.
+    :return: The names of the stages within the winning plan.
+    """
+    cursor = mongo_client.get_collection(query_shape.collection.value).find(query_shape.query)
+    if query_shape.sort:
+        cursor = cursor.sort(query_shape.sort)
+    if query_shape.limit:
+        cursor = cursor.limit(query_shape.limit)
+    return query_plan_stages(cursor.explain()["queryPlanner"]["winningPlan"])
 
-def object_id(oid: str) -> bson.objectid.ObjectId:
-    """Given the string representation of an object an id, return an instance of an ObjectID
 
-    :param oid: The oid to encode
-    :return: ObjectId from string
+def verify_query_plans(mongo_client: OpqMongoClient,
+                       query_shapes: typing.Optional[typing.List[QueryShape]] = None) -> typing.List[QueryShape]:
     """
-    return bson.objectid.ObjectId(oid)
+    Explains each hot query shape and returns the ones whose winning plan scans a whole collection.
+    :param mongo_client: An OpqMongoClient.
+    :param query_shapes: The query shapes to verify, defaults to HOT_QUERY_SHAPES.
+    :return: The query shapes that fall back to a COLLSCAN.
+    """
+    query_shapes = HOT_QUERY_SHAPES if query_shapes is None else query_shapes
+    collscans = []
+    for query_shape in query_shapes:
+        stages = explain_stages(mongo_client, query_shape)
+        if "COLLSCAN" in stages:
+            logger.error("%s falls back to a COLLSCAN: %s", query_shape, " <- ".join(stages))
+            collscans.append(query_shape)
+        else:
+            logger.info("%s uses %s", query_shape, " <- ".join(stages))
+    return collscans
 
 
 def from_config(conf: config.MaukaConfig) -> OpqMongoClient:
@@ -684,4 +1524,13 @@ def from_config(conf: config.MaukaConfig) -> OpqMongoClient:
     mongo_host = conf.get("mongo.host")
     mongo_port = conf.get("mongo.port")
     mongo_db = conf.get("mongo.db")
-    return OpqMongoClient(mongo_host, mongo_port, mongo_db)
+    box_metadata_ttl_s = float(conf.get("mongo.boxMetadataTtlS", 60.0))
+    mongo_client = OpqMongoClient(mongo_host, mongo_port, mongo_db, box_metadata_ttl_s)
+
+    waveform_cache_dir = conf.get("mongo.waveformCache.dir", "")
+    if waveform_cache_dir:
+        mongo_client.waveform_cache = waveform_cache.WaveformCache(
+            waveform_cache_dir,
+            int(conf.get("mongo.waveformCache.maxBytes", 512 * 1024 * 1024)))
+
+    return mongo_client
@@ -50,10 +50,7 @@ def bootstrap_db(conf: config.MaukaConfig):
         mongo_client.laha_config_collection.insert_one(conf.get("laha.config.default"))
 
     # Indexes
-    mongo_client.measurements_collection.create_index("expire_at")
-    mongo_client.trends_collection.create_index("expire_at")
-    mongo_client.events_collection.create_index("expire_at")
-    mongo_client.incidents_collection.create_index("expire_at")
+    mongo.ensure_indexes(mongo_client)
 
 
 def bootstrap(conf: config.MaukaConfig):
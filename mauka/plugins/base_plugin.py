@@ -2,8 +2,10 @@
 This module provides classes and base functionality for building OPQMauka plugins.
 """
 import enum
+import functools
 import json
 import multiprocessing
+import queue
 import signal
 import threading
 import time
@@ -86,6 +88,226 @@ class PluginState(enum.Enum):
     BUSY = "BUSY"
 
 
+class DispatchMode(enum.Enum):
+    """
+    Enum for specifying whether dispatch workers are threads or processes.
+    """
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+_WORKER_IDLE = 0
+_WORKER_BUSY = 1
+
+# Dispatch worker processes start from a fresh interpreter rather than a fork of a plugin process that already has
+# running threads, open sockets and an open MongoClient
+_SPAWN_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _run_dispatch_worker(plugin_factory: typing.Callable[[], "MaukaPlugin"],
+                         index: int,
+                         work_queue: typing.Union[queue.Queue, multiprocessing.Queue],
+                         worker_states: multiprocessing.Array,
+                         serialized: bool,
+                         owns_plugin: bool):
+    """
+    Handles the messages of one dispatch worker in order until it receives None.
+    :param plugin_factory: Returns the plugin whose on_message handles the messages.
+    :param index: The index of this worker.
+    :param work_queue: The queue of (topic, message) tuples of this worker.
+    :param worker_states: The shared state of every worker.
+    :param serialized: Whether the queued messages are serialized and must be deserialized first.
+    :param owns_plugin: Whether this worker created its own plugin and should run its on_exit when it stops.
+    """
+    if owns_plugin:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        plugin = plugin_factory()
+    # pylint: disable=W0703
+    except Exception:
+        # The dispatcher restarts workers that died once it dispatches to them again
+        logger.exception("Dispatch worker %d failed to create its plugin", index)
+        return
+
+    while True:
+        item = work_queue.get()
+        if item is None:
+            break
+
+        topic, message = item
+        worker_states[index] = _WORKER_BUSY
+        try:
+            if serialized:
+                message = protobuf.pb_util.deserialize_mauka_message(message)
+            plugin.on_message(topic, message)
+        # pylint: disable=W0703
+        except Exception:
+            # One bad message must not stall every key assigned to this worker
+            logger.exception("Dispatch worker %d of %s failed to handle a message on %s", index, plugin.name, topic)
+        finally:
+            worker_states[index] = _WORKER_IDLE
+
+    if owns_plugin:
+        plugin.on_exit()
+
+
+class KeyedDispatcher:
+    """
+    Dispatches messages to a fixed pool of workers by key.
+
+    Every key is assigned to one worker and every worker handles its messages in the order they were dispatched, so
+    messages sharing a key are handled in order while messages with different keys are handled in parallel. Thread
+    workers share a single plugin instance. Process workers are started with the spawn start method and each creates
+    its own plugin instance in its fresh interpreter, so the plugin factory must be picklable and any state a plugin
+    keeps between messages must be partitioned by the same key. A worker that died is restarted the next time a
+    message is dispatched to it.
+    """
+
+    def __init__(self,
+                 plugin_factory: typing.Callable[[], "MaukaPlugin"],
+                 workers: int,
+                 mode: DispatchMode = DispatchMode.THREAD,
+                 queue_size: int = 1024,
+                 put_timeout_s: float = 10.0,
+                 close_timeout_s: float = 60.0):
+        """
+        Initializes a KeyedDispatcher and starts its workers.
+        :param plugin_factory: Returns the plugin whose on_message handles the messages. It is called once per worker,
+        within the worker process when the mode is PROCESS, in which case it must be picklable.
+        :param workers: The number of workers.
+        :param mode: Whether the workers are threads or processes.
+        :param queue_size: The maximum number of messages queued per worker before dispatch blocks.
+        :param put_timeout_s: How long dispatch blocks on a full queue before it checks that the worker is alive.
+        :param close_timeout_s: How long close waits for each worker to stop.
+        """
+        self.plugin_factory = plugin_factory
+        self.mode = mode
+        self.queue_size = queue_size
+        self.put_timeout_s = put_timeout_s
+        self.close_timeout_s = close_timeout_s
+        context = _SPAWN_CONTEXT if mode is DispatchMode.PROCESS else multiprocessing
+        self.worker_states = context.Array("b", workers, lock=False)
+        self.dispatched: typing.List[int] = [0] * workers
+        self.restarts: typing.List[int] = [0] * workers
+        self.queues = [self.create_queue() for _ in range(workers)]
+        self.workers = [self.start_worker(index) for index in range(workers)]
+
+    def create_queue(self) -> typing.Union[queue.Queue, multiprocessing.Queue]:
+        """
+        Creates the queue of a worker.
+        :return: The queue.
+        """
+        if self.mode is DispatchMode.PROCESS:
+            return _SPAWN_CONTEXT.Queue(self.queue_size)
+        return queue.Queue(self.queue_size)
+
+    def start_worker(self, index: int) -> typing.Union[threading.Thread, multiprocessing.Process]:
+        """
+        Starts a worker on the queue at index.
+        :param index: The index of the worker.
+        :return: The started worker.
+        """
+        if self.mode is DispatchMode.PROCESS:
+            worker = _SPAWN_CONTEXT.Process(target=_run_dispatch_worker,
+                                            args=(self.plugin_factory, index, self.queues[index], self.worker_states,
+                                                  True, True))
+        else:
+            worker = threading.Thread(target=_run_dispatch_worker,
+                                      args=(self.plugin_factory, index, self.queues[index], self.worker_states,
+                                            False, False),
+                                      daemon=True)
+        worker.start()
+        return worker
+
+    def restart_worker(self, index: int):
+        """
+        Replaces a worker that died. A dead process may have died holding the lock of its queue, so a process worker
+        is given a new queue and the messages that were still queued on the dead worker are lost.
+        :param index: The index of the worker.
+        """
+        self.restarts[index] += 1
+        logger.error("Dispatch worker %d died, restarting it (restart %d)", index, self.restarts[index])
+        self.worker_states[index] = _WORKER_IDLE
+        if self.mode is DispatchMode.PROCESS:
+            # Nothing reads the old queue anymore, so this process must not wait on it to be flushed when it exits
+            self.queues[index].cancel_join_thread()
+            self.queues[index].close()
+            self.queues[index] = self.create_queue()
+        self.workers[index] = self.start_worker(index)
+
+    def worker_index(self, key: typing.Hashable) -> int:
+        """
+        Returns the worker that handles the messages of a key.
+        :param key: The key.
+        :return: The index of the worker.
+        """
+        return hash(key) % len(self.workers)
+
+    def dispatch(self,
+                 key: typing.Hashable,
+                 topic: str,
+                 message: bytes,
+                 mauka_message: protobuf.mauka_pb2.MaukaMessage):
+        """
+        Queues a message on the worker of its key.
+        :param key: The key of the message.
+        :param topic: The topic of the message.
+        :param message: The serialized message.
+        :param mauka_message: The deserialized message.
+        """
+        index = self.worker_index(key)
+        item = (topic, message if self.mode is DispatchMode.PROCESS else mauka_message)
+        while True:
+            if not self.workers[index].is_alive():
+                self.restart_worker(index)
+            try:
+                self.queues[index].put(item, timeout=self.put_timeout_s)
+                break
+            except queue.Full:
+                logger.warning("Dispatch worker %d has not taken a message for %.1f s", index, self.put_timeout_s)
+        self.dispatched[index] += 1
+
+    def states(self) -> typing.List[str]:
+        """
+        Returns the state of every worker.
+        :return: IDLE or BUSY for every worker.
+        """
+        return [PluginState.BUSY.name if state == _WORKER_BUSY else PluginState.IDLE.name
+                for state in self.worker_states]
+
+    def close(self):
+        """
+        Stops the workers once they have handled every queued message. Workers that do not stop within
+        close_timeout_s are logged and, when they are processes, killed since they ignore SIGTERM.
+        """
+        for index, work_queue in enumerate(self.queues):
+            if not self.workers[index].is_alive():
+                continue
+            try:
+                work_queue.put(None, timeout=self.close_timeout_s)
+            except queue.Full:
+                logger.error("Could not stop dispatch worker %d, its queue stayed full", index)
+
+        for index, worker in enumerate(self.workers):
+            worker.join(self.close_timeout_s)
+            if worker.is_alive():
+                logger.error("Dispatch worker %d did not stop within %.1f s", index, self.close_timeout_s)
+                if self.mode is DispatchMode.PROCESS:
+                    worker.kill()
+
+    def stats(self) -> typing.Dict:
+        """
+        Returns the statistics of this dispatcher.
+        :return: The statistics of this dispatcher.
+        """
+        return {"mode": self.mode.value,
+                "dispatched": list(self.dispatched),
+                "restarts": list(self.restarts),
+                "states": self.states()}
+
+
 class MaukaPlugin:
     """
     This is the base MaukaPlugin class that provides easy access to the database and also provides publish/subscribe
@@ -118,6 +340,13 @@ class MaukaPlugin:
         self.mongo_client = self.get_mongo_client()
         """MongoDB OPQ client"""
 
+        incident_write_window_s = float(self.config.get("plugins.base.incidentWriteWindowS", 0.0))
+        if incident_write_window_s > 0:
+            self.mongo_client.incident_writer = mongo.IncidentWriter(
+                self.mongo_client,
+                incident_write_window_s,
+                int(self.config.get("plugins.base.incidentWriteMaxBatch", 64)))
+
         self.zmq_context = zmq.Context()
         """ZeroMQ context"""
 
@@ -161,29 +390,87 @@ class MaukaPlugin:
 
         self.plugin_state: str = PluginState.IDLE.name
 
+        self.dispatcher: typing.Optional[KeyedDispatcher] = None
+        """Dispatches messages to a pool of workers by key when plugins.<name>.dispatch.workers > 0"""
+
+        self.incident_id_timeout_ms: int = int(self.config.get("zmq.incident_id_provider.req.timeoutMs", 5000))
+        """Number of milliseconds to wait on the incident id provider before a lease fails"""
+
         # ZMQ channel for getting incident ids
-        self.zmq_incident_id_req_socket = self.zmq_context.socket(zmq.REQ)
-        self.zmq_incident_id_req_socket.connect(self.config.get("zmq.incident_id_provider.req.interface"))
+        self.zmq_incident_id_req_socket = self.connect_incident_id_req_socket()
+
+        self.incident_id_block_size: int = max(1, int(self.config.get("plugins.base.incidentIdBlockSize", 1)))
+        """Number of incident ids leased from the incident id provider per request"""
+
+        self.next_leased_incident_id: int = 0
+        self.end_leased_incident_id: int = 0
+        self.incident_id_lock = threading.Lock()
+        """Lock that ensures leased incident ids are handed out once and the REQ socket is used by one thread"""
 
     # pylint: disable=E1101
     def request_next_available_incident_id(self) -> typing.Optional[int]:
         """
-        Requests the next available incident id from the incident id provider service.
+        Returns the next available incident id. Incident ids are leased in blocks of incident_id_block_size from the
+        incident id provider service and handed out locally until the block is exhausted.
         :return: The next available incident id or None.
         """
+        with self.incident_id_lock:
+            if self.next_leased_incident_id >= self.end_leased_incident_id:
+                lease = self.request_incident_id_lease(self.incident_id_block_size)
+                if lease is None:
+                    return None
+                self.next_leased_incident_id, self.end_leased_incident_id = lease
+
+            incident_id = self.next_leased_incident_id
+            self.next_leased_incident_id += 1
+            return incident_id
+
+    def connect_incident_id_req_socket(self) -> zmq.Socket:
+        """
+        Connects a REQ socket to the incident id provider service that gives up on replies after incident_id_timeout_ms.
+        :return: The connected socket.
+        """
+        # noinspection PyUnresolvedReferences
+        # pylint: disable=E1101
+        zmq_incident_id_req_socket = self.zmq_context.socket(zmq.REQ)
+        zmq_incident_id_req_socket.setsockopt(zmq.RCVTIMEO, self.incident_id_timeout_ms)
+        zmq_incident_id_req_socket.setsockopt(zmq.LINGER, 0)
+        zmq_incident_id_req_socket.connect(self.config.get("zmq.incident_id_provider.req.interface"))
+        return zmq_incident_id_req_socket
+
+    def request_incident_id_lease(self, count: int) -> typing.Optional[typing.Tuple[int, int]]:
+        """
+        Leases a block of consecutive incident ids from the incident id provider service.
+        :param count: The number of incident ids to lease.
+        :return: The half open range [start, end) of leased incident ids or None.
+        """
         req_id = int(time.time())
-        req = protobuf.pb_util.build_incident_id_req(self.name, req_id)
+        req = protobuf.pb_util.build_incident_id_req(self.name, req_id, count)
         self.zmq_incident_id_req_socket.send(protobuf.pb_util.serialize_message(req))
-        resp: bytes = self.zmq_incident_id_req_socket.recv()
+        try:
+            resp: bytes = self.zmq_incident_id_req_socket.recv()
+        except zmq.Again:
+            # A REQ socket can not send another request until it receives a reply, so it is replaced
+            self.logger.error("Timed out after %d ms waiting for an incident id response", self.incident_id_timeout_ms)
+            self.zmq_incident_id_req_socket.close()
+            self.zmq_incident_id_req_socket = self.connect_incident_id_req_socket()
+            return None
+
         mauka_message: protobuf.mauka_pb2.MaukaMessage = protobuf.pb_util.deserialize_mauka_message(resp)
         if protobuf.pb_util.is_incident_id_resp(mauka_message):
             if mauka_message.incident_id_resp.resp_id == req_id:
-                return mauka_message.incident_id_resp.incident_id
+                # Services that do not lease blocks leave count unset (0)
+                leased = max(1, mauka_message.incident_id_resp.count)
+                incident_id = mauka_message.incident_id_resp.incident_id
+                return incident_id, incident_id + leased
             else:
                 self.logger.error("Incident req id %d != incident resp id %d",
                                   req_id,
                                   mauka_message.incident_id_resp.resp_id)
                 return None
+        elif protobuf.pb_util.which_message_oneof(mauka_message) is None:
+            self.logger.error("The incident id provider could not lease incident ids")
+            return None
         else:
             self.logger.error("Received an incorrect message for an incident id response")
             return None
@@ -209,20 +496,20 @@ class MaukaPlugin:
         """ Return the status of this plugin
         :return: The status of this plugin
         """
-        return json.dumps({"messages_received": self.messages_received,
-                           "messages_published": self.messages_published,
-                           "bytes_received": self.bytes_received,
-                           "bytes_published": self.bytes_published})
+        status = {"messages_received": self.messages_received,
+                  "messages_published": self.messages_published,
+                  "bytes_received": self.bytes_received,
+                  "bytes_published": self.bytes_published}
+        if self.dispatcher is not None:
+            status["dispatch"] = self.dispatcher.stats()
+        return json.dumps(status)
 
     def get_mongo_client(self):
         """ Returns an OPQ mongo client
 
         :return: An OPQ mongo client
         """
-        mongo_host = self.config.get("mongo.host")
-        mongo_port = self.config.get("mongo.port")
-        mongo_db = self.config.get("mongo.db")
-        return mongo.OpqMongoClient(mongo_host, mongo_port, mongo_db)
+        return mongo.from_config(self.config)
 
     def start_heartbeat(self):
         """
@@ -238,11 +525,14 @@ class MaukaPlugin:
             """
             Recursively produces a heartbeat message on a timer.
             """
+            worker_states = self.dispatcher.states() if self.dispatcher is not None else []
+            plugin_state = PluginState.BUSY.name if PluginState.BUSY.name in worker_states else self.plugin_state
             heartbeat_message = protobuf.pb_util.build_heartbeat(self.name,
                                                                  self.last_received,
                                                                  self.on_message_cnt,
                                                                  self.get_status(),
-                                                                 self.plugin_state)
+                                                                 plugin_state,
+                                                                 worker_states)
             self.produce("heartbeat", heartbeat_message)
             timer = threading.Timer(self.heartbeat_interval_s, heartbeat)
             timer.start()
@@ -261,9 +551,69 @@ class MaukaPlugin:
         """
         logger.info("on_message not implemented")
 
+    # pylint: disable=R0201
+    def dispatch_key(self, topic: str, mauka_message: protobuf.mauka_pb2.MaukaMessage) -> typing.Hashable:
+        """Returns the key of a message when messages are dispatched to a pool of workers. Messages sharing a key are
+        handled in order, messages with different keys may be handled in parallel.
+
+        Payloads are keyed by (event_id, box_id) and measurements by box_id. All other messages share the None key.
+        Plugins that keep state across other messages should override this.
+
+        :param topic: The topic this message is associated with
+        :param mauka_message: The message contents
+        :return: The key of the message
+        """
+        if protobuf.pb_util.is_payload(mauka_message):
+            return mauka_message.payload.event_id, mauka_message.payload.box_id
+        if protobuf.pb_util.is_measurement(mauka_message):
+            return mauka_message.measurement.box_id
+        return None
+
+    def create_dispatcher(self) -> typing.Optional[KeyedDispatcher]:
+        """Creates the dispatcher of this plugin if plugins.<name>.dispatch.workers is configured.
+
+        :return: A started dispatcher or None if messages are handled on the receiving thread
+        """
+        workers = int(self.config.get("plugins.%s.dispatch.workers" % self.name, 0))
+        if workers <= 0:
+            return None
+
+        mode = DispatchMode(self.config.get("plugins.%s.dispatch.mode" % self.name, DispatchMode.THREAD.value))
+        queue_size = int(self.config.get("plugins.base.dispatch.queueSize", 1024))
+        put_timeout_s = float(self.config.get("plugins.base.dispatch.putTimeoutS", 10.0))
+        close_timeout_s = float(self.config.get("plugins.base.dispatch.closeTimeoutS", 60.0))
+
+        if mode is DispatchMode.PROCESS:
+            # Each worker process builds its own instance, including any threads and clients its __init__ starts. The
+            # exit event of this process cannot be shared with spawned processes, and workers exit by their queues.
+            plugin_factory = functools.partial(type(self), self.config, _SPAWN_CONTEXT.Event())
+        else:
+            def plugin_factory():
+                """Returns this plugin, which is shared by every thread worker"""
+                return self
+
+        logger.info("Dispatching %s messages to %d %s workers", self.name, workers, mode.value)
+        return KeyedDispatcher(plugin_factory, workers, mode, queue_size, put_timeout_s, close_timeout_s)
+
     def produce(self, topic: str, mauka_message: protobuf.mauka_pb2.MaukaMessage):
         """Produces a message with a given topic to the system
 
+        :param topic: The topic to produce this message to
+        :param mauka_message: The message to produce
+        """
+        # GC updates for incidents are only useful once the incident has been written
+        incident_writer = self.mongo_client.incident_writer
+        if incident_writer is not None \
+                and protobuf.pb_util.is_gc_update(mauka_message) \
+                and mauka_message.laha.gc_update.from_domain == protobuf.mauka_pb2.INCIDENTS:
+            incident_writer.run_when_written(mauka_message.laha.gc_update.id,
+                                             lambda: self.produce_now(topic, mauka_message))
+        else:
+            self.produce_now(topic, mauka_message)
+
+    def produce_now(self, topic: str, mauka_message: protobuf.mauka_pb2.MaukaMessage):
+        """Produces a message with a given topic to the system without waiting on pending incidents
+
         :param topic: The topic to produce this message to
         :param mauka_message: The message to produce
         """
@@ -320,6 +670,7 @@ class MaukaPlugin:
             # pylint: disable=E1101
             self.zmq_consumer.setsockopt_string(zmq.SUBSCRIBE, subscription)
 
+        self.dispatcher = self.create_dispatcher()
         self.start_heartbeat()
 
         while not self.exit_event.is_set():
@@ -342,9 +693,22 @@ class MaukaPlugin:
                 self.on_message_cnt += 1
                 self.last_received = protobuf.pb_util.get_timestamp_ms()
                 mauka_message = protobuf.pb_util.deserialize_mauka_message(message)
-                self.on_message(topic, mauka_message)
+                if self.dispatcher is not None:
+                    self.dispatcher.dispatch(self.dispatch_key(topic, mauka_message), topic, message, mauka_message)
+                else:
+                    self.on_message(topic, mauka_message)
                 self.update_received(len(message))
 
             self.set_plugin_state_idle()
 
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+
+        self.on_exit()
         logger.info("Exiting Mauka plugin: %s", self.name)
+
+    def on_exit(self):
+        """Writes anything this plugin has buffered. This is called once the run loop exits and by each dispatch
+        worker process as it stops."""
+        if self.mongo_client.incident_writer is not None:
+            self.mongo_client.incident_writer.stop()
@@ -51,7 +51,7 @@ def find_frequency_variation_incidents(mauka_message: mauka_pb2.MaukaMessage,
     :param plugin: An instance of this plugin.
     :return: A list of incident ids.
     """
-    frequencies_per_cycle: typing.List[float] = list(mauka_message.payload.data)
+    frequencies_per_cycle: typing.List[float] = protobuf.pb_util.repeated_as_ndarray(mauka_message.payload).tolist()
     log.maybe_debug("Found %d frequencies" % len(frequencies_per_cycle), plugin)
     bounds = [[0.0, frequency_threshold_low],
               [frequency_threshold_high, 1_000_000]]
@@ -150,9 +150,10 @@ class FrequencyVariationPlugin(plugins.base_plugin.MaukaPlugin):
         """
         self.debug("{} on_message".format(topic))
         if protobuf.pb_util.is_payload(mauka_message, protobuf.mauka_pb2.FREQUENCY_WINDOWED):
-            self.debug("on_message {}:{} len:{}".format(mauka_message.payload.event_id,
-                                                        mauka_message.payload.box_id,
-                                                        len(mauka_message.payload.data)))
+            self.debug("on_message {}:{} len:{}".format(
+                mauka_message.payload.event_id,
+                mauka_message.payload.box_id,
+                len(protobuf.pb_util.repeated_as_ndarray(mauka_message.payload))))
 
             incident_ids = find_frequency_variation_incidents(mauka_message,
                                                               self.freq_var_low,
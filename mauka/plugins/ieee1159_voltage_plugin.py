@@ -51,7 +51,7 @@ def ieee1159_voltage(mauka_message: protobuf.mauka_pb2.MaukaMessage,
     """
     Calculate the ieee1159 voltage incidents and add them to the mongo database
     """
-    data: typing.List[float] = list(mauka_message.payload.data)
+    data: typing.List[float] = protobuf.pb_util.repeated_as_ndarray(mauka_message.payload).tolist()
     log.maybe_debug("Found %d Vrms values." % len(data), ieee1159_voltage_plugin)
     try:
         incidents = mauka_native_py.classify_rms(mauka_message.payload.start_timestamp_ms, data)
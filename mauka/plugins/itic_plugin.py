@@ -91,19 +91,47 @@ NO_INTERRUPTION_REGION_POLYGON = [
 """Polygon representing the no interruption region"""
 
 
-def point_in_polygon(x_point: float, y_point: float, polygon: typing.List[typing.List[float]]) -> bool:
+def polygon_geometry(polygon: typing.List[typing.List[float]]) -> shapely.geometry.Polygon:
     """
-    Checks if a point is in a given polygon.
+    Builds a prepared shapely polygon from a list of vertices so that repeated point queries are fast.
+    :param polygon: The vertices of the polygon.
+    :return: The prepared polygon.
+    """
+    geometry = shapely.geometry.Polygon([(x_y[0], x_y[1]) for x_y in polygon])
+    shapely.prepare(geometry)
+    return geometry
+
+
+NO_INTERRUPTION_REGION_GEOMETRY = polygon_geometry(NO_INTERRUPTION_REGION_POLYGON)
+"""Prepared geometry of the no interruption region"""
+
+PROHIBITED_REGION_GEOMETRY = polygon_geometry(PROHIBITED_REGION_POLYGON)
+"""Prepared geometry of the prohibited region"""
+
+NO_DAMAGE_REGION_GEOMETRY = polygon_geometry(NO_DAMAGE_REGION_POLYGON)
+"""Prepared geometry of the no damage region"""
+
+REGION_GEOMETRIES = {id(NO_INTERRUPTION_REGION_POLYGON): NO_INTERRUPTION_REGION_GEOMETRY,
+                     id(PROHIBITED_REGION_POLYGON): PROHIBITED_REGION_GEOMETRY,
+                     id(NO_DAMAGE_REGION_POLYGON): NO_DAMAGE_REGION_GEOMETRY}
+"""Prepared geometries of the region polygons, keyed by the identity of the vertex lists"""
+
+
+def point_in_polygon(x_point: float,
+                     y_point: float,
+                     polygon: typing.Union[typing.List[typing.List[float]], shapely.geometry.Polygon]) -> bool:
+    """
+    Checks if a point is in a given polygon. Points on the boundary of the polygon are considered inside of it.
     :param x_point: x
     :param y_point: y
-    :param polygon: The polygon to check for inclusion
+    :param polygon: The polygon to check for inclusion, either as a list of vertices or as a shapely polygon
     :return: Whether or not the given point is in the provided polygon
     """
-    polygon = list(map(lambda xy: (xy[0], xy[1]), polygon))
-    polygon = shapely.geometry.Polygon(polygon)
-    point = shapely.geometry.Point(analysis.ms_to_c(x_point), y_point)
-    return polygon.contains(point) or polygon.intersects(point)
-
+    if not isinstance(polygon, shapely.geometry.Polygon):
+        geometry = REGION_GEOMETRIES.get(id(polygon))
+        polygon = geometry if geometry is not None else polygon_geometry(polygon)
+    # A point that is contained by a polygon also intersects it, so intersects alone covers contains or intersects
+    return bool(shapely.intersects_xy(polygon, analysis.ms_to_c(x_point), y_point))
 
 
 def itic_region(rms_voltage: float, duration_ms: float) -> IticRegion:
@@ -116,19 +144,47 @@ def itic_region(rms_voltage: float, duration_ms: float) -> IticRegion:
     """
     percent_nominal = analysis.rms_to_percent_nominal(rms_voltage)
 
-    if point_in_polygon(duration_ms, percent_nominal, NO_INTERRUPTION_REGION_POLYGON):
+    if point_in_polygon(duration_ms, percent_nominal, NO_INTERRUPTION_REGION_GEOMETRY):
         return IticRegion.NO_INTERRUPTION
 
-    if point_in_polygon(duration_ms, percent_nominal, PROHIBITED_REGION_POLYGON):
+    if point_in_polygon(duration_ms, percent_nominal, PROHIBITED_REGION_GEOMETRY):
         return IticRegion.PROHIBITED
 
-    if point_in_polygon(duration_ms, percent_nominal, NO_DAMAGE_REGION_POLYGON):
+    if point_in_polygon(duration_ms, percent_nominal, NO_DAMAGE_REGION_GEOMETRY):
         return IticRegion.NO_DAMAGE
 
     # If it's directly on the line of one of the polygons, its easiest to just say no_interruption
     return IticRegion.NO_INTERRUPTION
 
 
+def itic_regions(rms_voltages: numpy.ndarray, durations_ms: numpy.ndarray) -> typing.List[IticRegion]:
+    """
+    Returns the ITIC regions of many RMS voltage and duration pairs at once. This is equivalent to calling itic_region
+    on every pair, but each region is tested against all of the points in a single vectorized query.
+    :param rms_voltages: The RMS voltage values
+    :param durations_ms: The durations of the voltage events in milliseconds
+    :return: The appropriate ITIC region enum for each pair
+    """
+    percent_nominal = analysis.rms_to_percent_nominal(numpy.asarray(rms_voltages, dtype=float))
+    durations_c = analysis.ms_to_c(numpy.asarray(durations_ms, dtype=float))
+    regions = [IticRegion.NO_INTERRUPTION] * len(percent_nominal)
+
+    # Only points outside of the earlier regions are tested against the later ones, mirroring itic_region
+    remaining = numpy.flatnonzero(~shapely.intersects_xy(NO_INTERRUPTION_REGION_GEOMETRY,
+                                                          durations_c,
+                                                          percent_nominal))
+    for geometry, region in ((PROHIBITED_REGION_GEOMETRY, IticRegion.PROHIBITED),
+                             (NO_DAMAGE_REGION_GEOMETRY, IticRegion.NO_DAMAGE)):
+        if len(remaining) == 0:
+            break
+        inside = shapely.intersects_xy(geometry, durations_c[remaining], percent_nominal[remaining])
+        for i in remaining[inside]:
+            regions[i] = region
+        remaining = remaining[~inside]
+
+    return regions
+
+
 def maybe_debug(itic_plugin: typing.Optional['IticPlugin'],
                 msg: str):
     """
@@ -153,34 +209,41 @@ def itic(mauka_message: protobuf.mauka_pb2.MaukaMessage,
     :return: ITIC region.
     """
     mongo_client = mongo.get_default_client(opq_mongo_client)
-    if len(mauka_message.payload.data) < 0.01:
-        maybe_debug(itic_plugin, "Bad payload data length: %d" % len(mauka_message.payload.data))
-
-    maybe_debug(itic_plugin, "Preparing to get segments for %d Vrms values" % len(mauka_message.payload.data))
-    # segments = analysis.segment(mauka_message.payload.data, segment_threshold)
-    try:
-        segments = analysis.segment_array(numpy.array(list(mauka_message.payload.data)))
-    except Exception as exception:
-        itic_plugin.logger.error("Error segmenting data for ITIC plugin: %s", str(exception))
-        segments = []
-
-    if len(segments) == 0:
+
+    # Segments are computed once upstream by MakaiEventPlugin, otherwise segment the Vrms values here
+    segments = protobuf.pb_util.payload_segments(mauka_message.payload)
+    if segments is None:
+        data = protobuf.pb_util.repeated_as_ndarray(mauka_message.payload)
+        if len(data) < 0.01:
+            maybe_debug(itic_plugin, "Bad payload data length: %d" % len(data))
+
+        maybe_debug(itic_plugin, "Preparing to get segments for %d Vrms values" % len(data))
+        # segments = analysis.segment(mauka_message.payload.data, segment_threshold)
+        try:
+            segments = analysis.segment_summary(data,
+                                                itic_plugin.segmentation_engine if itic_plugin is not None else None)
+        except Exception as exception:
+            itic_plugin.logger.error("Error segmenting data for ITIC plugin: %s", str(exception))
+            segments = ([], [])
+
+    segment_lens, segment_means = segments
+    if len(segment_lens) == 0:
         maybe_debug(itic_plugin, "No segments found. Ignoring")
         return []
 
-    maybe_debug(itic_plugin, "Calculating ITIC with {} segments.".format(len(segments)))
+    maybe_debug(itic_plugin, "Calculating ITIC with {} segments.".format(len(segment_lens)))
+
+    segment_lens_c = numpy.asarray(segment_lens, dtype=float)
+    segment_lens_ms = analysis.c_to_ms(segment_lens_c)
+    segment_starts_ms = analysis.c_to_ms(numpy.concatenate(([0.0], numpy.cumsum(segment_lens_c)[:-1])))
+    itic_enums = itic_regions(numpy.asarray(segment_means, dtype=float), segment_lens_ms)
 
     incident_ids = []
-    for i, segment in enumerate(segments):
+    for start_t, segment_len, mean_rms, itic_enum in zip(segment_starts_ms, segment_lens_ms, segment_means, itic_enums):
         try:
-            segment_len = analysis.c_to_ms(len(segment))
-            start_t = analysis.c_to_ms(sum([len(segments[x]) for x in range(0, i)]))
             end_t = start_t + segment_len
-            mean_rms = segment.mean()
             maybe_debug(itic_plugin, "start=%f end=%f mean=%f" % (start_t, end_t, mean_rms))
 
-            itic_enum = itic_region(mean_rms, segment_len)
-
             if itic_enum == IticRegion.NO_INTERRUPTION:
                 maybe_debug(itic_plugin, "NO_INTERRUPTION")
                 continue
@@ -236,6 +299,7 @@ class IticPlugin(plugins.base_plugin.MaukaPlugin):
         """
         super().__init__(conf, [Routes.rms_windowed_voltage], IticPlugin.NAME, exit_event)
         self.segment_threshold = self.config.get("plugins.IticPlugin.segment.threshold.rms")
+        self.segmentation_engine = analysis.SegmentationEngine.from_config(self.config)
 
     def on_message(self, topic, mauka_message):
         """
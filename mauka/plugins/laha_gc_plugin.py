@@ -2,15 +2,25 @@
 This module contains a plugin and functions that perform GC and update TTLs for OPQ collections.
 """
 
+import json
 import multiprocessing
+import threading
 import time
+import typing
+
+import pymongo
+import pymongo.collection
 
 import config
+import log
+import mongo
 import plugins.base_plugin as base_plugin
 from plugins.routes import Routes
 import protobuf.pb_util as util_pb2
 import protobuf.mauka_pb2 as mauka_pb2
 
+# pylint: disable=C0103
+logger = log.get_logger(__name__)
 
 
 def timestamp_s() -> int:
@@ -21,6 +31,273 @@ def timestamp_s() -> int:
     return int(round(time.time()))
 
 
+def gc_expired_events_batch(mongo_client: mongo.OpqMongoClient,
+                            now: int,
+                            batch_size: int) -> typing.Tuple[int, int, int, int]:
+    """
+    GCs one batch of expired events along with their box_events and gridfs data.
+
+    Every level is resolved and deleted with one query per collection. Events are deleted last so that the box_events
+    and gridfs data of an interrupted batch are found again by the next batch.
+    :param mongo_client: An OpqMongoClient.
+    :param now: Events that expire before this timestamp in seconds are GCed.
+    :param batch_size: The maximum number of events to GC.
+    :return: The number of events, box_events, and gridfs files that were deleted and the gridfs bytes freed.
+    """
+    events = list(mongo_client.events_collection.find({"expire_at": {"$lt": now}},
+                                                      projection={"_id": True,
+                                                                  "event_id": True}).limit(batch_size))
+    if not events:
+        return 0, 0, 0, 0
+
+    box_events = list(mongo_client.box_events_collection.find(
+        {"event_id": {"$in": list(map(lambda event: event["event_id"], events))}},
+        projection={"_id": True,
+                    "data_fs_filename": True}))
+
+    files_deleted, bytes_deleted = mongo_client.delete_gridfs_files([box_event["data_fs_filename"]
+                                                                     for box_event in box_events
+                                                                     if box_event.get("data_fs_filename")])
+
+    box_events_deleted = 0
+    if box_events:
+        box_events_deleted = mongo_client.box_events_collection.delete_many(
+            {"_id": {"$in": list(map(lambda box_event: box_event["_id"], box_events))}}).deleted_count
+
+    events_deleted = mongo_client.events_collection.delete_many(
+        {"_id": {"$in": list(map(lambda event: event["_id"], events))}}).deleted_count
+
+    return events_deleted, box_events_deleted, files_deleted, bytes_deleted
+
+
+class IncrementalCollector:
+    """
+    Deletes the expired documents of a collection incrementally in bounded batches.
+
+    Each batch reads the _ids of at most batch_size expired documents in expire_at order, which the expire_at index
+    serves without visiting unexpired or already deleted documents, and deletes them by _id. A cycle ends when its time
+    budget is spent, when it has deleted as many documents as the documents-per-second budget accrued since the
+    previous cycle, or when a batch finds fewer expired documents than it asked for, which completes a sweep.
+
+    Counting the expired documents is as expensive as the backlog is large, so the backlog is only counted every
+    backlog_refresh_s seconds. In between it is estimated by subtracting the documents deleted since the last count,
+    and a completed sweep sets it to 0.
+    """
+
+    def __init__(self,
+                 collection: pymongo.collection.Collection,
+                 batch_size: int,
+                 docs_per_s: float,
+                 cycle_budget_s: float,
+                 backlog_refresh_s: float = 300.0,
+                 clock: typing.Callable[[], float] = time.monotonic):
+        """
+        Initializes an IncrementalCollector.
+        :param collection: The collection to GC.
+        :param batch_size: The maximum number of documents deleted by each batch.
+        :param docs_per_s: The average number of documents deleted per second, 0 for no limit.
+        :param cycle_budget_s: The maximum number of seconds spent deleting batches in one cycle.
+        :param backlog_refresh_s: The minimum number of seconds between counts of the backlog.
+        :param clock: Returns the current time in seconds.
+        """
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.docs_per_s = docs_per_s
+        self.cycle_budget_s = cycle_budget_s
+        self.backlog_refresh_s = backlog_refresh_s
+        self.clock = clock
+        self.last_cycle_s = clock()
+        self.backlog_counted_s: typing.Optional[float] = None
+        self.deleted = 0
+        self.batches = 0
+        self.sweeps = 0
+        self.backlog = 0
+        self.last_cycle_duration_s = 0.0
+
+    def collect_batch(self, expire_before: int, limit: int) -> typing.Tuple[int, bool]:
+        """
+        Deletes up to limit of the documents that expired first.
+        :param expire_before: Documents that expire before this timestamp in seconds are deleted.
+        :param limit: The maximum number of documents to delete.
+        :return: The number of documents that were deleted and whether no expired documents are left.
+        """
+        expired_ids = [document["_id"] for document in
+                       self.collection.find({"expire_at": {"$lt": expire_before}}, projection={"_id": True})
+                       .sort("expire_at", pymongo.ASCENDING)
+                       .limit(limit)]
+        if not expired_ids:
+            return 0, True
+
+        # A gc_update may have extended the expire_at of a document since it was read
+        deleted = self.collection.delete_many({"_id": {"$in": expired_ids},
+                                               "expire_at": {"$lt": expire_before}}).deleted_count
+        self.deleted += deleted
+        self.batches += 1
+        return deleted, len(expired_ids) < limit
+
+    def collect(self, expire_before: int) -> int:
+        """
+        Performs one GC cycle within the time and documents-per-second budgets and then updates the backlog.
+        :param expire_before: Documents that expire before this timestamp in seconds are deleted.
+        :return: The number of documents that were deleted.
+        """
+        start_s = self.clock()
+        doc_budget = None
+        if self.docs_per_s > 0:
+            doc_budget = max(1, int(self.docs_per_s * (start_s - self.last_cycle_s)))
+        self.last_cycle_s = start_s
+
+        deleted = 0
+        while True:
+            limit = self.batch_size if doc_budget is None else min(self.batch_size, doc_budget - deleted)
+            batch_deleted, swept = self.collect_batch(expire_before, limit)
+            deleted += batch_deleted
+            if swept:
+                self.sweeps += 1
+                break
+            if doc_budget is not None and deleted >= doc_budget:
+                break
+            if self.clock() - start_s >= self.cycle_budget_s:
+                break
+
+        end_s = self.clock()
+        self.last_cycle_duration_s = end_s - start_s
+        if swept:
+            self.backlog = 0
+        elif self.backlog_counted_s is None or end_s - self.backlog_counted_s >= self.backlog_refresh_s:
+            self.backlog = self.collection.count_documents({"expire_at": {"$lt": expire_before}})
+            self.backlog_counted_s = end_s
+        else:
+            self.backlog = max(0, self.backlog - deleted)
+        return deleted
+
+    def stats(self) -> typing.Dict[str, typing.Union[int, float]]:
+        """
+        Returns the statistics of this collector.
+        :return: The statistics of this collector.
+        """
+        return {"deleted": self.deleted,
+                "batches": self.batches,
+                "sweeps": self.sweeps,
+                "backlog": self.backlog,
+                "last_cycle_duration_s": self.last_cycle_duration_s}
+
+
+def merge_intervals(intervals: typing.List[typing.Tuple[int, int]]) -> typing.List[typing.Tuple[int, int]]:
+    """
+    Merges overlapping or touching closed intervals.
+    :param intervals: The (start, end) intervals to merge.
+    :return: The merged intervals sorted by start.
+    """
+    merged: typing.List[typing.Tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class GcUpdateCoalescer(mongo.WriteBehindBuffer):
+    """
+    Buffers the expire_at updates that gc_updates make to measurements and trends and writes them in bulk.
+
+    Updates are collected for at most window_s seconds (or until max_pending intervals are pending). Overlapping time
+    ranges of the same box and expire_at are then merged, and every merged interval is written with one UpdateMany in a
+    single ordered bulk write per collection. Intervals are written in increasing expire_at order so that a document
+    covered by several updates ends up with the latest expire_at. Intervals whose write fails stay pending until a later
+    flush writes them.
+    """
+
+    def __init__(self, mongo_client: mongo.OpqMongoClient, window_s: float, max_pending: int = 1024):
+        """
+        Initializes a GcUpdateCoalescer and starts its flush thread if updates are buffered.
+        :param mongo_client: The mongo client to write updates with.
+        :param window_s: Maximum number of seconds an update stays pending, 0 to write updates immediately.
+        :param max_pending: Number of pending intervals that triggers an immediate flush.
+        """
+        super().__init__("gc_updates", window_s)
+        self.mongo_client = mongo_client
+        self.max_pending = max_pending
+        self.pending: typing.Dict[typing.Tuple[str, int], typing.List[typing.Tuple[int, int]]] = {}
+        self.pending_intervals = 0
+        self.updates_received = 0
+        self.intervals_received = 0
+        self.intervals_merged = 0
+        self.update_requests = 0
+        self.bulk_writes = 0
+        if window_s > 0:
+            self.start_flush_thread()
+
+    def add(self, box_ids: typing.List[str], start_timestamp_ms: int, end_timestamp_ms: int, expire_at: int):
+        """
+        Adds an expire_at update for the measurements and trends of the provided boxes within a time range.
+        :param box_ids: The boxes to update.
+        :param start_timestamp_ms: The start of the time range.
+        :param end_timestamp_ms: The end of the time range.
+        :param expire_at: The new expire_at.
+        """
+        with self.lock:
+            for box_id in box_ids:
+                self.pending.setdefault((box_id, expire_at), []).append((start_timestamp_ms, end_timestamp_ms))
+            self.pending_intervals += len(box_ids)
+            self.updates_received += 1
+            self.intervals_received += len(box_ids)
+            flush = self.window_s <= 0 or self.pending_intervals >= self.max_pending
+
+        if flush:
+            self.try_flush()
+
+    def take_pending(self) -> typing.Dict[typing.Tuple[str, int], typing.List[typing.Tuple[int, int]]]:
+        pending = self.pending
+        self.pending = {}
+        self.pending_intervals = 0
+        return pending
+
+    def restore_pending(self, batch: typing.Dict[typing.Tuple[str, int], typing.List[typing.Tuple[int, int]]]):
+        for box_id_expire_at, intervals in batch.items():
+            self.pending.setdefault(box_id_expire_at, []).extend(intervals)
+            self.pending_intervals += len(intervals)
+
+    def write(self, batch: typing.Dict[typing.Tuple[str, int], typing.List[typing.Tuple[int, int]]]):
+        # Merged intervals that are shared by several boxes are written together
+        interval_to_box_ids: typing.Dict[typing.Tuple[int, int, int], typing.List[str]] = {}
+        intervals_merged = 0
+        for (box_id, expire_at), intervals in batch.items():
+            for start_timestamp_ms, end_timestamp_ms in merge_intervals(intervals):
+                interval_to_box_ids.setdefault((expire_at, start_timestamp_ms, end_timestamp_ms), []).append(box_id)
+                intervals_merged += 1
+
+        requests = [pymongo.UpdateMany({"timestamp_ms": {"$gte": start_timestamp_ms,
+                                                         "$lte": end_timestamp_ms},
+                                        "box_id": {"$in": sorted(box_ids)}},
+                                       {"$set": {"expire_at": expire_at}})
+                    for (expire_at, start_timestamp_ms, end_timestamp_ms), box_ids
+                    in sorted(interval_to_box_ids.items())]
+
+        # Setting expire_at is idempotent, so a batch that failed part way is safely rewritten in full
+        self.mongo_client.trends_collection.bulk_write(requests, ordered=True)
+        self.mongo_client.measurements_collection.bulk_write(requests, ordered=True)
+
+        with self.lock:
+            self.intervals_merged += intervals_merged
+            self.update_requests += len(requests)
+            self.bulk_writes += 2
+
+    def stats(self) -> typing.Dict[str, int]:
+        """
+        Returns the statistics of this coalescer.
+        :return: The statistics of this coalescer.
+        """
+        with self.lock:
+            return {"updates": self.updates_received,
+                    "intervals": self.intervals_received,
+                    "coalesced": self.intervals_received - self.pending_intervals - self.intervals_merged,
+                    "update_requests": self.update_requests,
+                    "bulk_writes": self.bulk_writes,
+                    "failed_flushes": self.failed_flushes}
+
+
 class LahaGcPlugin(base_plugin.MaukaPlugin):
     """
     This class provides a plugin for performing GC and TTL updates on OPQ MongoDB collections.
@@ -32,71 +309,104 @@ class LahaGcPlugin(base_plugin.MaukaPlugin):
                  conf: config.MaukaConfig,
                  exit_event: multiprocessing.Event):
         super().__init__(conf, [Routes.laha_gc, Routes.heartbeat], LahaGcPlugin.NAME, exit_event)
+        self.events_batch_size = int(self.config.get("plugins.LahaGcPlugin.events.batchSize", 500))
+
+        batch_size = int(self.config.get("plugins.LahaGcPlugin.incremental.batchSize", 1000))
+        docs_per_s = float(self.config.get("plugins.LahaGcPlugin.incremental.docsPerS", 0.0))
+        cycle_budget_s = float(self.config.get("plugins.LahaGcPlugin.incremental.cycleBudgetS", 5.0))
+        backlog_refresh_s = float(self.config.get("plugins.LahaGcPlugin.incremental.backlogRefreshS", 300.0))
+        self.measurements_collector = IncrementalCollector(self.mongo_client.measurements_collection,
+                                                           batch_size,
+                                                           docs_per_s,
+                                                           cycle_budget_s,
+                                                           backlog_refresh_s)
+        self.trends_collector = IncrementalCollector(self.mongo_client.trends_collection,
+                                                     batch_size,
+                                                     docs_per_s,
+                                                     cycle_budget_s,
+                                                     backlog_refresh_s)
+
+        self.gc_update_coalescer = GcUpdateCoalescer(
+            self.mongo_client,
+            float(self.config.get("plugins.LahaGcPlugin.updates.windowS", 0.0)),
+            int(self.config.get("plugins.LahaGcPlugin.updates.maxPending", 1024)))
+
+    def get_status(self) -> str:
+        """
+        Returns the status of this plugin including the state of the incremental collectors.
+        :return: The status of this plugin.
+        """
+        status = json.loads(super().get_status())
+        status["measurements_gc"] = self.measurements_collector.stats()
+        status["trends_gc"] = self.trends_collector.stats()
+        status["gc_updates"] = self.gc_update_coalescer.stats()
+        return json.dumps(status)
+
+    def handle_gc_trigger_incremental(self,
+                                      collector: IncrementalCollector,
+                                      gc_domain: mauka_pb2.GcDomain):
+        """
+        Performs one incremental GC cycle and produces a GcStat with the number of documents deleted, the time taken,
+        and the remaining backlog.
+        :param collector: The incremental collector of the collection.
+        :param gc_domain: The GC domain of the collection.
+        """
+        start_s = time.perf_counter()
+        deleted = collector.collect(timestamp_s())
+        duration_ms = (time.perf_counter() - start_s) * 1000.0
+        self.produce(Routes.gc_stat,
+                     util_pb2.build_gc_stat(self.NAME, gc_domain, deleted, duration_ms, collector.backlog))
+        self.debug("Garbage collected %d %s in %f ms, backlog=%d" % (deleted,
+                                                                    mauka_pb2.GcDomain.Name(gc_domain).lower(),
+                                                                    duration_ms,
+                                                                    collector.backlog))
 
     def handle_gc_trigger_measurements(self):
         """
-        GCs measurements by removing measurements older than their expire_at field.
+        GCs measurements incrementally by removing measurements older than their expire_at field.
         """
         self.debug("gc_trigger measurements")
-        now = timestamp_s()
-        delete_result = self.mongo_client.measurements_collection.delete_many({"expire_at": {"$lt": now}})
-        self.produce(Routes.gc_stat, util_pb2.build_gc_stat(
-            self.NAME, mauka_pb2.MEASUREMENTS, delete_result.deleted_count))
-        self.debug("Garbage collected %d measurements" % delete_result.deleted_count)
+        self.handle_gc_trigger_incremental(self.measurements_collector, mauka_pb2.MEASUREMENTS)
 
     def handle_gc_trigger_trends(self):
         """
-        GCs trends by removing trends older than their expire_at field.
+        GCs trends incrementally by removing trends older than their expire_at field.
         """
         self.debug("gc_trigger trends")
-        now = timestamp_s()
-        delete_result = self.mongo_client.trends_collection.delete_many({"expire_at": {"$lt": now}})
-        self.produce(Routes.gc_stat, util_pb2.build_gc_stat(self.NAME, mauka_pb2.TRENDS, delete_result.deleted_count))
-        self.debug("Garbage collected %d trends" % delete_result.deleted_count)
+        self.handle_gc_trigger_incremental(self.trends_collector, mauka_pb2.TRENDS)
 
     def handle_gc_trigger_events(self):
         """
-        GCs events.
+        GCs events in batches of at most events_batch_size events.
 
-        First, find all events whose expire_at field is older than now.
-        Second, find corresponding box_events.
-        Third, from box_events, delete expired gridfs files
-        Fourth, delete all expired box_events
-        Fifth, delete all expired events
+        For each batch, find events whose expire_at field is older than now, find the corresponding box_events, delete
+        their gridfs files, and then delete the box_events and events. A GcStat with the time taken is produced for
+        every batch.
         """
         self.debug("gc_trigger events")
         now = timestamp_s()
-        events = self.mongo_client.events_collection.find({"expire_at": {"$lt": now}},
-                                                          projection={"_id": True,
-                                                                      "expire_at": True,
-                                                                      "event_id": True,
-                                                                      "boxes_received": True})
-
-        # Find corresponding box events
-        box_events = []
-        for event in events:
-            for box_triggered in event["boxes_received"]:
-                box_event = self.mongo_client.box_events_collection.find_one({"event_id": event["event_id"],
-                                                                              "box_id": box_triggered},
-                                                                             projection={"_id": True,
-                                                                                         "event_id": True,
-                                                                                         "box_id": True,
-                                                                                         "data_fs_filename": True})
-
-                if box_event is not None:
-                    box_events.append(box_event)
-
-        # Cleanup gridfs files and box_events
-        for box_event in box_events:
-            self.mongo_client.delete_gridfs(box_event["data_fs_filename"])
-            self.mongo_client.box_events_collection.delete_one({"_id": box_event["_id"]})
-
-        self.debug("Garbage collected %d box_events and corresponding gridfs data" % len(box_events))
-
-        # Cleanup events
-        delete_result = self.mongo_client.events_collection.delete_many({"expire_at": {"$lt": now}})
-        self.produce(Routes.gc_stat, util_pb2.build_gc_stat(self.NAME, mauka_pb2.EVENTS, delete_result.deleted_count))
-        self.debug("Garbage collected %d events" % delete_result.deleted_count)
+        while True:
+            start_s = time.perf_counter()
+            events_deleted, box_events_deleted, files_deleted, bytes_deleted = gc_expired_events_batch(
+                self.mongo_client,
+                now,
+                self.events_batch_size)
+            duration_ms = (time.perf_counter() - start_s) * 1000.0
+            if events_deleted == 0:
+                break
+
+            self.produce(Routes.gc_stat,
+                         util_pb2.build_gc_stat(self.NAME,
+                                                mauka_pb2.EVENTS,
+                                                events_deleted,
+                                                duration_ms,
+                                                gc_bytes=bytes_deleted))
+            self.debug("Garbage collected %d events, %d box_events, and %d gridfs files in %f ms" % (events_deleted,
+                                                                                                   box_events_deleted,
+                                                                                                   files_deleted,
+                                                                                                   duration_ms))
+            if events_deleted < self.events_batch_size:
+                break
 
     def handle_gc_trigger_incidents(self):
         """
@@ -110,13 +420,12 @@ class LahaGcPlugin(base_plugin.MaukaPlugin):
         incidents = self.mongo_client.incidents_collection.find({"expire_at": {"$lt": now}},
                                                                 projection={"expire_at": True,
                                                                             "gridfs_filename": True})
-        filenames = list(map(lambda incident: incident["gridfs_filename"], incidents))
-        for filename in filenames:
-            self.mongo_client.delete_gridfs(filename)
+        filenames = [incident["gridfs_filename"] for incident in incidents if incident.get("gridfs_filename")]
+        _, bytes_deleted = self.mongo_client.delete_gridfs_files(filenames)
 
         delete_result = self.mongo_client.incidents_collection.delete_many({"expire_at": {"$lt": now}})
         self.produce(Routes.gc_stat, util_pb2.build_gc_stat(
-            self.NAME, mauka_pb2.INCIDENTS, delete_result.deleted_count))
+            self.NAME, mauka_pb2.INCIDENTS, delete_result.deleted_count, gc_bytes=bytes_deleted))
         self.debug("Garbage collected %d incidents and associated gridfs data" % delete_result.deleted_count)
 
     def handle_gc_trigger_phenomena(self):
@@ -173,22 +482,13 @@ class LahaGcPlugin(base_plugin.MaukaPlugin):
         if incident is None:
             self.logger.warning("gc_update incidents, incident with id=%s not found", str(_id))
         else:
-            query = {"timestamp_ms": {"$gte": incident["start_timestamp_ms"],
-                                      "$lte": incident["end_timestamp_ms"]},
-                     "box_id": incident["box_id"]}
-
-            update = {"$set": {"expire_at": incident["expire_at"]}}
-
-            # Update trends
-            update_trends_result = self.mongo_client.trends_collection.update_many(query, update)
-            self.debug("Updated expire_at=%d %d trends" % (incident["expire_at"],
-                                                           update_trends_result.modified_count))
-
-            # Update measurements
-            update_measurements_result = self.mongo_client.measurements_collection.update_many(query, update)
-
-            self.debug("Updated expire_at=%d for %d measurements" % (incident["expire_at"],
-                                                                     update_measurements_result.modified_count))
+            # Update trends and measurements
+            self.gc_update_coalescer.add([incident["box_id"]],
+                                         incident["start_timestamp_ms"],
+                                         incident["end_timestamp_ms"],
+                                         incident["expire_at"])
+            self.debug("Queued expire_at=%d for trends and measurements of incident %s" % (incident["expire_at"],
+                                                                                          str(_id)))
 
             event = self.mongo_client.events_collection.find_one({"event_id": incident["event_id"]},
                                                                  projection={"_id": True,
@@ -233,24 +533,12 @@ class LahaGcPlugin(base_plugin.MaukaPlugin):
         if event is None:
             self.logger.warning("gc_update event event with event_id=%s is None", str(_id))
         else:
-            boxes_received = event["boxes_received"]
-
-            query = {"timestamp_ms": {"$gte": event["target_event_start_timestamp_ms"],
-                                      "$lte": event["target_event_end_timestamp_ms"]},
-                     "box_id": {"$in": boxes_received}}
-
-            update = {"$set": {"expire_at": event["expire_at"]}}
-
-            # Update trends
-            update_trends_result = self.mongo_client.trends_collection.update_many(query, update)
-            self.debug("Updated expire_at=%d %d trends" % (event["expire_at"],
-                                                           update_trends_result.modified_count))
-
-            # Update measurements
-            update_measurements_result = self.mongo_client.measurements_collection.update_many(query, update)
-
-            self.debug("Updated expire_at=%d for %d measurements" % (event["expire_at"],
-                                                                     update_measurements_result.modified_count))
+            # Update trends and measurements
+            self.gc_update_coalescer.add(event["boxes_received"],
+                                         event["target_event_start_timestamp_ms"],
+                                         event["target_event_end_timestamp_ms"],
+                                         event["expire_at"])
+            self.debug("Queued expire_at=%d for trends and measurements of event %s" % (event["expire_at"], str(_id)))
 
     def handle_gc_update_from_trend(self, _id: str):
         """
@@ -314,3 +602,10 @@ class LahaGcPlugin(base_plugin.MaukaPlugin):
             self.handle_gc_update(mauka_message.laha.gc_update)
         else:
             self.logger.error("Received incorrect type of MaukaMessage")
+
+    def on_exit(self):
+        """
+        Writes any pending gc_updates once this plugin exits.
+        """
+        super().on_exit()
+        self.gc_update_coalescer.stop()
@@ -4,23 +4,29 @@ This module provides a plugin and utilities for interacting and transforming raw
 
 import math
 import multiprocessing
+import queue
 import threading
+import time
 import typing
 
 import numpy
 from scipy import optimize
-from scipy import signal
 
 import analysis
 import config
 import constants
+import dsp
+import log
 import mongo
 import plugins.base_plugin
 from plugins.routes import Routes
 import plugins.thd_plugin
 import protobuf.mauka_pb2
 import protobuf.pb_util
+import shared_payloads
 
+# pylint: disable=C0103
+logger = log.get_logger(__name__)
 
 
 def smooth_waveform(sample: numpy.ndarray, filter_order: int = 2, cutoff_frequency: float = 500.0,
@@ -33,17 +39,7 @@ def smooth_waveform(sample: numpy.ndarray, filter_order: int = 2, cutoff_frequen
     :param downsample_factor: downsample factor for decimate function
     :return:
     """
-
-    # smooth digital signal w/ butterworth filter
-    # First, design the Butterworth filter
-    # Cutoff frequencies in half-cycles / sample
-    cutoff_frequency_nyquist = cutoff_frequency * 2 / constants.SAMPLE_RATE_HZ
-    numerator, denominator = signal.butter(filter_order, cutoff_frequency_nyquist, output='ba')
-
-    # Second, create Dicrete-time linear time invariant system instance
-    dtltis = signal.dlti(numerator, denominator)
-    # decimate signal to improve runtime
-    return signal.decimate(sample, downsample_factor, ftype=dtltis)
+    return dsp.lowpass_decimate(sample, downsample_factor, filter_order, cutoff_frequency)
 
 
 def find_zero_xings(waveform: numpy.ndarray) -> numpy.ndarray:
@@ -65,26 +61,17 @@ def vrms(samples: numpy.ndarray) -> float:
     return math.sqrt(summed_sqs / len(samples))
 
 
-def vrms_waveform(waveform: numpy.ndarray, window_size: int = constants.SAMPLES_PER_CYCLE) -> numpy.ndarray:
+def vrms_waveform(waveform: numpy.ndarray, window_size: int = constants.SAMPLES_PER_CYCLE,
+                  step: typing.Optional[int] = None) -> numpy.ndarray:
     """
     Calculated Vrms of a waveform using a given window size. In most cases, our window size should be the
     number of samples in a cycle.
     :param waveform: The waveform to find Vrms values for.
     :param window_size: The size of the window used to compute Vrms over the waveform.
+    :param step: Optional number of samples between window starts for overlapping windows.
     :return: An array of vrms values calculated for a given waveform.
     """
-    rms_voltages = []
-    window_size = int(window_size)
-    while len(waveform) >= window_size:
-        samples = waveform[:window_size]
-        waveform = waveform[window_size:]
-        rms_voltages.append(vrms(samples))
-
-    # pylint: disable=len-as-condition
-    if len(waveform) > 0:
-        rms_voltages.append(vrms(waveform))
-
-    return numpy.array(rms_voltages)
+    return analysis.vrms_windowed(waveform, int(window_size), step)
 
 
 def frequency(samples: numpy.ndarray, down_sample_factor: int) -> float:
@@ -157,40 +144,36 @@ AcquireDataType = typing.Tuple[
     protobuf.mauka_pb2.MaukaMessage]
 
 
-def acquire_data(mongo_client: mongo.OpqMongoClient,
-                 makai_event_plugin: 'MakaiEventPlugin',
-                 event_id: int,
-                 box_id: str,
-                 name: str) -> AcquireDataType:
+def extract_features(box_event_waveform: mongo.BoxEventWaveform,
+                     name: str,
+                     makai_event_plugin: typing.Optional['MakaiEventPlugin'] = None,
+                     segment_rms_windowed: bool = True,
+                     segmentation_engine: typing.Optional[analysis.SegmentationEngine] = None) -> AcquireDataType:
     """
-    Given an event_id, acquire the raw data for each box associated with the given event. Perform feature
-    extraction of the raw data and publish those features for downstream plugins.
-    :param makai_event_plugin: An instance of the plugin.
-    :param box_id: The box id.
-    :param mongo_client: The mongo client to use to make this request.
-    :param event_id: The event id to acquire data for.
+    Perform feature extraction of the raw data of a single box_event and build the payloads for downstream plugins.
+    :param box_event_waveform: The loaded box_event and waveform.
     :param name: The name of the service requesting data.
+    :param makai_event_plugin: An optional instance of the plugin used for debugging.
+    :param segment_rms_windowed: Whether to attach the segmentation of the windowed Vrms to its payload.
+    :param segmentation_engine: An optional segmentation engine, otherwise the default engine is used.
     """
-    box_event = mongo_client.box_events_collection.find_one({"event_id": event_id,
-                                                             "box_id": box_id})
-    waveform = mongo.get_waveform(mongo_client, box_event["data_fs_filename"])
+    event_id = box_event_waveform.event_id
+    box_id = box_event_waveform.box_id
+    waveform = box_event_waveform.waveform
 
-    makai_event_plugin.debug("Loaded waveform for event_id=%s box_id=%s with len=%d" %
-                             (event_id, box_id, len(waveform)))
+    log.maybe_debug("Loaded waveform for event_id=%s box_id=%s with len=%d" %
+                    (event_id, box_id, len(waveform)), makai_event_plugin)
 
-    box_id = box_event["box_id"]
-    makai_event_plugin.debug("box_id={} and type={}".format(box_id, type(box_id)))
-    calibration_constant = mongo_client.get_box_calibration_constant(box_id)
-    makai_event_plugin.debug("calibration_constant=%f" % calibration_constant)
-    waveform_calibrated = waveform / calibration_constant
+    log.maybe_debug("calibration_constant=%f" % box_event_waveform.calibration_constant, makai_event_plugin)
+    waveform_calibrated = box_event_waveform.waveform_calibrated
 
-    makai_event_plugin.debug("Loaded calibrated waveform for event_id=%s box_id=%s with len=%d" %
-                             (event_id, box_id, len(waveform_calibrated)))
+    log.maybe_debug("Loaded calibrated waveform for event_id=%s box_id=%s with len=%d" %
+                    (event_id, box_id, len(waveform_calibrated)), makai_event_plugin)
 
-    start_timestamp = box_event["event_start_timestamp_ms"]
-    end_timestamp = box_event["event_end_timestamp_ms"]
+    start_timestamp = box_event_waveform.start_timestamp_ms
+    end_timestamp = box_event_waveform.end_timestamp_ms
 
-    makai_event_plugin.debug("Extracted timestamps %d-%d" % (start_timestamp, end_timestamp))
+    log.maybe_debug("Extracted timestamps %d-%d" % (start_timestamp, end_timestamp), makai_event_plugin)
 
     try:
         adc_samples = protobuf.pb_util.build_payload(name,
@@ -200,9 +183,9 @@ def acquire_data(mongo_client: mongo.OpqMongoClient,
                                                      waveform,
                                                      start_timestamp,
                                                      end_timestamp)
-        makai_event_plugin.debug("Got ADC samples")
+        log.maybe_debug("Got ADC samples", makai_event_plugin)
     except Exception as exception:
-        makai_event_plugin.logger.error("Error getting ADC_SAMPLES %s", str(exception))
+        logger.error("Error getting ADC_SAMPLES %s", str(exception))
         adc_samples = protobuf.pb_util.build_payload(name,
                                                      event_id,
                                                      box_id,
@@ -219,9 +202,9 @@ def acquire_data(mongo_client: mongo.OpqMongoClient,
                                                      waveform_calibrated,
                                                      start_timestamp,
                                                      end_timestamp)
-        makai_event_plugin.debug("Got raw voltage")
+        log.maybe_debug("Got raw voltage", makai_event_plugin)
     except Exception as exception:
-        makai_event_plugin.logger.error("Error getting VOLTAGE_RAW: %s", str(exception))
+        logger.error("Error getting VOLTAGE_RAW: %s", str(exception))
         raw_voltage = protobuf.pb_util.build_payload(name,
                                                      event_id,
                                                      box_id,
@@ -231,17 +214,18 @@ def acquire_data(mongo_client: mongo.OpqMongoClient,
                                                      end_timestamp)
 
     try:
+        rms_windowed = vrms_waveform(waveform_calibrated, int(constants.SAMPLES_PER_CYCLE))
         rms_windowed_voltage = protobuf.pb_util.build_payload(name,
                                                               event_id,
                                                               box_id,
                                                               protobuf.mauka_pb2.VOLTAGE_RMS_WINDOWED,
-                                                              vrms_waveform(waveform_calibrated,
-                                                                            int(constants.SAMPLES_PER_CYCLE)),
+                                                              rms_windowed,
                                                               start_timestamp,
                                                               end_timestamp)
-        makai_event_plugin.debug("Got rms windowed voltage")
+        log.maybe_debug("Got rms windowed voltage", makai_event_plugin)
     except Exception as exception:
-        makai_event_plugin.logger.error("Error getting VOLTAGE_RMS_WINDOWED: %s", str(exception))
+        logger.error("Error getting VOLTAGE_RMS_WINDOWED: %s", str(exception))
+        rms_windowed = None
         rms_windowed_voltage = protobuf.pb_util.build_payload(name,
                                                               event_id,
                                                               box_id,
@@ -250,15 +234,28 @@ def acquire_data(mongo_client: mongo.OpqMongoClient,
                                                               start_timestamp,
                                                               end_timestamp)
 
+    if segment_rms_windowed and rms_windowed is not None:
+        try:
+            protobuf.pb_util.add_segments(rms_windowed_voltage,
+                                          *analysis.segment_summary(rms_windowed, segmentation_engine))
+            log.maybe_debug("Got rms windowed voltage segments %s" %
+                            (segmentation_engine or analysis.DEFAULT_SEGMENTATION_ENGINE).last_timing,
+                            makai_event_plugin)
+        except Exception as exception:
+            # Subscribers segment the windowed Vrms themselves when the segments are missing
+            rms_windowed_voltage.payload.ClearField("segments")
+            logger.error("Error segmenting VOLTAGE_RMS_WINDOWED: %s", str(exception))
+
     try:
         frequency_windowed = protobuf.pb_util.build_payload(name,
                                                             event_id,
                                                             box_id,
                                                             protobuf.mauka_pb2.FREQUENCY_WINDOWED,
-                                                            analysis.frequency_per_cycle(waveform_calibrated),
+                                                            numpy.asarray(
+                                                                analysis.frequency_per_cycle(waveform_calibrated)),
                                                             start_timestamp,
                                                             end_timestamp)
-        makai_event_plugin.debug("Got windowed frequency")
+        log.maybe_debug("Got windowed frequency", makai_event_plugin)
     except Exception as exception:
         frequency_windowed = protobuf.pb_util.build_payload(name,
                                                             event_id,
@@ -267,11 +264,36 @@ def acquire_data(mongo_client: mongo.OpqMongoClient,
                                                             [],
                                                             start_timestamp,
                                                             end_timestamp)
-        makai_event_plugin.logger.error("Error getting FREQUENCY_WINDOWED: %s", str(exception))
+        logger.error("Error getting FREQUENCY_WINDOWED: %s", str(exception))
 
     return adc_samples, raw_voltage, rms_windowed_voltage, frequency_windowed
 
 
+def extract_features_worker(box_event_waveform: mongo.BoxEventWaveform,
+                            name: str,
+                            segment_rms_windowed: bool = True,
+                            segmentation_engine: typing.Optional[analysis.SegmentationEngine] = None
+                            ) -> typing.Tuple[typing.Tuple[bytes, ...], typing.Optional[typing.Dict[str, float]]]:
+    """
+    Runs extract_features within a feature extraction worker process. The generated protobuf classes can not be
+    pickled, so the payloads are serialized before they are returned to the plugin. The segmentation engine is a copy
+    of the plugin's engine, so the timing of its segmentation is returned for the plugin to record.
+    :param box_event_waveform: The loaded box_event and waveform.
+    :param name: The name of the service requesting data.
+    :param segment_rms_windowed: Whether to attach the segmentation of the windowed Vrms to its payload.
+    :param segmentation_engine: An optional segmentation engine, otherwise the default engine is used.
+    :return: The serialized extracted payloads and the segmentation timing or None if nothing was segmented.
+    """
+    segmentation_engine = segmentation_engine or analysis.DEFAULT_SEGMENTATION_ENGINE
+    calls = segmentation_engine.calls
+    payloads = tuple(protobuf.pb_util.serialize_message(payload)
+                     for payload in extract_features(box_event_waveform,
+                                                     name,
+                                                     segment_rms_windowed=segment_rms_windowed,
+                                                     segmentation_engine=segmentation_engine))
+    return payloads, segmentation_engine.last_timing if segmentation_engine.calls > calls else None
+
+
 class MakaiEventPlugin(plugins.base_plugin.MaukaPlugin):
     """
     This plugin retrieves data when Makai triggers events, performs feature extraction, and then publishes relevant
@@ -287,36 +309,138 @@ class MakaiEventPlugin(plugins.base_plugin.MaukaPlugin):
         self.samples_per_window = int(constants.SAMPLES_PER_CYCLE) * int(self.config.get(
             "plugins.MakaiEventPlugin.frequencyWindowCycles"))
         self.down_sample_factor = int(self.config.get("plugins.MakaiEventPlugin.frequencyDownSampleRate"))
+        self.workers = int(self.config.get("plugins.MakaiEventPlugin.workers", 1))
+        # Segmenting once here saves every subscriber of the windowed Vrms from segmenting it again
+        self.segment_rms_windowed = bool(self.config.get("plugins.MakaiEventPlugin.segmentRmsWindowed", True))
+        self.segmentation_engine = analysis.SegmentationEngine.from_config(self.config)
+        max_queued_events = int(self.config.get("plugins.MakaiEventPlugin.maxQueuedEvents", 64))
+
+        # Events waiting to be acquired. on_message blocks when this is full which pushes back on the ZMQ consumer.
+        self.event_queue: queue.Queue = queue.Queue(maxsize=max_queued_events)
+
+        # Limits the number of box_events that have been handed to workers, but not yet produced.
+        self.in_flight = threading.BoundedSemaphore(2 * max(1, self.workers))
+
+        # Workers are spawned rather than forked so that they do not inherit the mongo client, zmq context and the
+        # flush threads that already exist in this process
+        self.pool = None
+        if self.workers > 1:
+            self.pool = multiprocessing.get_context("spawn").Pool(self.workers)
+
+        # Large payloads are optionally handed to subscribers on this host through shared memory
+        self.shared_payload_writer: typing.Optional[shared_payloads.SharedPayloadWriter] = None
+        if self.config.get("plugins.MakaiEventPlugin.sharedMemoryPayloads.enabled", False):
+            self.shared_payload_writer = shared_payloads.SharedPayloadWriter(
+                float(self.config.get("plugins.MakaiEventPlugin.sharedMemoryPayloads.leaseS", 60.0)),
+                int(self.config.get("plugins.MakaiEventPlugin.sharedMemoryPayloads.minBytes", 65536)))
+
+        threading.Thread(target=self.dispatch_events, daemon=True).start()
+
+    def produce_acquired(self, acquired: AcquireDataType):
+        """
+        Produces the payloads of a single box as soon as it has been acquired. This is also the callback of the
+        worker pool, so every error is logged here rather than raised into the pool's result handler thread.
+        :param acquired: The acquired payloads.
+        """
+        try:
+            adc_samples, raw_voltage, rms_windowed_voltage, frequency_windowed = acquired
+            if self.shared_payload_writer is not None:
+                adc_samples = self.shared_payload_writer.share_payload(adc_samples)
+                raw_voltage = self.shared_payload_writer.share_payload(raw_voltage)
+            self.produce(Routes.adc_samples, adc_samples)
+            self.produce(Routes.raw_voltage, raw_voltage)
+            self.produce(Routes.rms_windowed_voltage, rms_windowed_voltage)
+            self.produce(Routes.windowed_frequency, frequency_windowed)
+            self.debug("Produced data for event_id=%d box_id=%s" % (adc_samples.payload.event_id,
+                                                                    adc_samples.payload.box_id))
+        except Exception as exception:
+            self.logger.error("Error producing acquired data: %s", str(exception))
+        finally:
+            self.in_flight.release()
+
+    def produce_extracted(self,
+                          extracted: typing.Tuple[typing.Tuple[bytes, ...], typing.Optional[typing.Dict[str, float]]]):
+        """
+        Records the segmentation timing and produces the payloads returned by a feature extraction worker.
+        :param extracted: The serialized payloads and the segmentation timing.
+        """
+        try:
+            payloads, segmentation_timing = extracted
+            if segmentation_timing is not None:
+                self.segmentation_engine.record(segmentation_timing)
+                self.debug("Got rms windowed voltage segments %s" % segmentation_timing)
+            acquired = tuple(protobuf.pb_util.deserialize_mauka_message(payload) for payload in payloads)
+        except Exception as exception:
+            self.acquire_error(exception)
+            return
+        self.produce_acquired(acquired)
+
+    def acquire_error(self, exception: BaseException):
+        """
+        Called when a worker fails to acquire data for a box.
+        :param exception: The exception raised by the worker.
+        """
+        self.in_flight.release()
+        self.logger.error("Error acquiring data: %s", str(exception))
 
     def acquire_and_produce(self, event_id: int):
         """
         Acquire raw data for a given event_id, perform feature extraction, and produce to the rest of the Mauka
-        processing pipeline.
+        processing pipeline. The data for all boxes is loaded with a constant number of queries. When workers are
+        configured, features for each box are extracted in parallel and produced as soon as they are ready.
         :param event_id: The event id to load raw data for.
         """
         self.debug("in acquire_and_produce")
-        box_events = self.mongo_client.box_events_collection.find({"event_id": event_id})
-        self.debug("Found %d box_events" % box_events.count())
-        for box_event in box_events:
-            box_id = box_event["box_id"]
-            adc_samples, raw_voltage, rms_windowed_voltage, frequency_windowed = acquire_data(self.mongo_client,
-                                                                                              self,
-                                                                                              event_id,
-                                                                                              box_id,
-                                                                                              self.name)
-            self.produce(Routes.adc_samples, adc_samples)
-            self.produce(Routes.raw_voltage, raw_voltage)
-            self.produce(Routes.rms_windowed_voltage, rms_windowed_voltage)
-            self.produce(Routes.windowed_frequency, frequency_windowed)
-            self.debug("Produced data for box_event=%s" % str(box_event))
+        box_event_waveforms = self.mongo_client.load_event_waveforms(event_id)
+        self.debug("Loaded %d box_events" % len(box_event_waveforms))
+        for box_event_waveform in box_event_waveforms.values():
+            self.in_flight.acquire()
+            if self.pool is not None:
+                self.pool.apply_async(extract_features_worker,
+                                      (box_event_waveform,
+                                       self.name,
+                                       self.segment_rms_windowed,
+                                       self.segmentation_engine),
+                                      callback=self.produce_extracted,
+                                      error_callback=self.acquire_error)
+            else:
+                try:
+                    acquired = extract_features(box_event_waveform,
+                                                self.name,
+                                                self,
+                                                self.segment_rms_windowed,
+                                                self.segmentation_engine)
+                except Exception as exception:
+                    self.acquire_error(exception)
+                    continue
+                self.produce_acquired(acquired)
         self.debug("Done with acquire_and_produce")
 
+    def dispatch_events(self):
+        """
+        Takes events off of the event queue once their data is available and acquires them. Shared payload segments
+        whose leases expired are freed while waiting so that they are not kept until the next event.
+        """
+        free_interval_s = None if self.shared_payload_writer is None else self.shared_payload_writer.lease_s
+        while not self.exit_event.is_set():
+            try:
+                event_id, acquire_at = self.event_queue.get(timeout=free_interval_s)
+            except queue.Empty:
+                self.shared_payload_writer.free_expired()
+                continue
+
+            delay_s = acquire_at - time.time()
+            if delay_s > 0:
+                time.sleep(delay_s)
+
+            try:
+                self.acquire_and_produce(event_id)
+            except Exception as exception:
+                self.logger.error("Error acquiring event_id=%d: %s", event_id, str(exception))
+
     def on_message(self, topic, mauka_message):
         if protobuf.pb_util.is_makai_event_message(mauka_message):
             self.debug("on_message: {}".format(mauka_message))
-            timer = threading.Timer(self.get_data_after_s,
-                                    function=self.acquire_and_produce,
-                                    args=[mauka_message.makai_event.event_id])
 
             # Produce a message to the GC
             self.debug("Producing laha_gc update")
@@ -324,7 +448,19 @@ class MakaiEventPlugin(plugins.base_plugin.MaukaPlugin):
                          protobuf.pb_util.build_gc_update(self.name, protobuf.mauka_pb2.EVENTS,
                                                           mauka_message.makai_event.event_id))
             self.debug("laha_gc update produced")
-            timer.start()
+            self.event_queue.put((mauka_message.makai_event.event_id, time.time() + self.get_data_after_s))
         else:
             self.logger.error("Received incorrect mauka message [%s] for MakaiEventPlugin",
                               protobuf.pb_util.which_message_oneof(mauka_message))
+
+    def on_exit(self):
+        """
+        Waits for the feature extraction workers and unlinks every shared payload segment once this plugin exits so
+        that none are left behind in /dev/shm.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+        super().on_exit()
+        if self.shared_payload_writer is not None:
+            self.shared_payload_writer.close()
@@ -55,44 +55,18 @@ class OutagePlugin(MaukaPlugin):
             if OutagePlugin.NAME == mauka_message.source:
                 now = unix_time_millis(datetime.datetime.utcnow())
                 self.debug("Recv outage heartbeat last_update=%s now=%s" % (str(self.last_update), str(now)))
-                box_to_max_timestamp: typing.Dict[str, int] = {}
-                box_to_min_timestamp: typing.Dict[str, int] = {}
-                measurements = self.mongo_client.measurements_collection.find(
-                    {"timestamp_ms": {"$gte": self.last_update}},
-                    projection={"_id": False,
-                                "box_id": True,
-                                "timestamp_ms": True})
-
-                # Find the min and max timestamps for each box
-                total_measurements = 0
-                for measurement in measurements:
-                    box_id = measurement["box_id"]
-                    timestamp = measurement["timestamp_ms"]
-
-                    if box_id not in box_to_max_timestamp:
-                        box_to_max_timestamp[box_id] = 0
-                        box_to_min_timestamp[box_id] = 9999999999999999999999
-
-                    if timestamp > box_to_max_timestamp[box_id]:
-                        box_to_max_timestamp[box_id] = timestamp
-
-                    if timestamp < box_to_min_timestamp[box_id]:
-                        box_to_min_timestamp[box_id] = timestamp
-
-                    total_measurements += 1
-
-                self.debug("Processed %d measurements" % total_measurements)
-                self.debug(str(box_to_max_timestamp))
-                self.debug(str(box_to_min_timestamp))
-
-                # Merge the max timestamps for each box into the last seen dictionary
-                self.box_to_last_seen = {**self.box_to_last_seen, **box_to_max_timestamp}
+                box_liveness = self.mongo_client.box_liveness
+                box_liveness.update(int(now))
+                self.debug(str(box_liveness.stats()))
+
+                self.box_to_last_seen = box_liveness.last_seen_by_box()
                 self.debug(str(self.box_to_last_seen))
 
                 # Check for outages
+                box_to_outage_last_seen = box_liveness.gaps(int(now))
                 for box_id, last_seen in self.box_to_last_seen.items():
                     # Outage
-                    if now - last_seen > 60_000:
+                    if box_id in box_to_outage_last_seen:
                         self.debug("Outage box_id=%s last_seen=%d" % (box_id, last_seen))
                         # Ignore if box is marked as unplugged
                         if is_unplugged(self.mongo_client, box_id):
@@ -134,7 +108,7 @@ class OutagePlugin(MaukaPlugin):
                             # Update previous incident
                             self.mongo_client.incidents_collection.update_one(
                                 {"incident_id": prev_incident_id},
-                                {"$set": {"end_timestamp_ms": int(box_to_min_timestamp[box_id])}})
+                                {"$set": {"end_timestamp_ms": int(box_liveness.first_seen(box_id))}})
 
                             # Produce a message to the GC
                             self.produce(Routes.laha_gc, protobuf.pb_util.build_gc_update(self.name,
@@ -60,26 +60,30 @@ def semi_violation(mongo_client: mongo.OpqMongoClient,
     """
     incident_ids = []
 
-    data = protobuf.pb_util.repeated_as_ndarray(mauka_message.payload.data)
-    maybe_debug("Recv %d Vrms values" % len(data), plugin)
-    try:
-        segments = analysis.segment_array(data)
-        maybe_debug("Found %d segments" % len(segments), plugin)
-    except Exception as exception:
-        plugin.logger.error("Error segmenting data for semi f47 plugin: %s", str(exception))
-        segments = []
-
-    for i, segment in enumerate(segments):
+    # Segments are computed once upstream by MakaiEventPlugin, otherwise segment the Vrms values here
+    segments = protobuf.pb_util.payload_segments(mauka_message.payload)
+    if segments is None:
+        data = protobuf.pb_util.repeated_as_ndarray(mauka_message.payload)
+        maybe_debug("Recv %d Vrms values" % len(data), plugin)
         try:
-            segment_len_c = len(segment)
+            segments = analysis.segment_summary(data, plugin.segmentation_engine if plugin is not None else None)
+            maybe_debug("Found %d segments" % len(segments[0]), plugin)
+        except Exception as exception:
+            plugin.logger.error("Error segmenting data for semi f47 plugin: %s", str(exception))
+            segments = ([], [])
+
+    segment_start = 0
+    for segment_len_c, segment_mean in zip(*segments):
+        try:
+            segment_start_c = segment_start
+            segment_start += segment_len_c
             segment_len_ms = analysis.c_to_ms(segment_len_c)
-            segment_mean = segment.mean()
 
             maybe_debug("Segment len c=%d ms=%f mean=%f" % (segment_len_c, segment_len_ms, segment_mean), plugin)
 
             if point_in_poly(segment_len_c, analysis.rms_to_percent_nominal(segment_mean)):
                 # New SEMI F47 violation
-                start_t = analysis.c_to_ms(sum([len(segments[x]) for x in range(0, i)]))
+                start_t = analysis.c_to_ms(segment_start_c)
                 end_t = start_t + segment_len_ms
                 incident_start_timestamp_ms = mauka_message.payload.start_timestamp_ms + start_t
                 incident_end_timestamp_ms = mauka_message.payload.start_timestamp_ms + end_t
@@ -115,6 +119,7 @@ class SemiF47Plugin(plugins.base_plugin.MaukaPlugin):
 
     def __init__(self, conf: config.MaukaConfig, exit_event):
         super().__init__(conf, [Routes.rms_windowed_voltage], "SemiF47Plugin", exit_event)
+        self.segmentation_engine = analysis.SegmentationEngine.from_config(self.config)
 
     def on_message(self, topic: str, mauka_message: protobuf.mauka_pb2.MaukaMessage):
         if protobuf.pb_util.is_payload(mauka_message, protobuf.mauka_pb2.VOLTAGE_RMS_WINDOWED):
@@ -184,6 +184,7 @@ class PluginStatus:
         self.bytes_recv = 0
         self.last_recv = mauka_message.heartbeat.last_received_timestamp_ms
         self.plugin_state = mauka_message.heartbeat.plugin_state
+        self.worker_states = list(mauka_message.heartbeat.worker_states)
 
     def as_json(self):
         """
@@ -200,7 +201,8 @@ class PluginStatus:
             "messages_recv": self.messages_recv,
             "bytes_recv": self.bytes_recv,
             "last_recv": self.last_recv,
-            "plugin_state": self.plugin_state
+            "plugin_state": self.plugin_state,
+            "worker_states": self.worker_states
         }
 
     def update(self, mauka_message: mauka_pb2.MaukaMessage):
@@ -212,6 +214,7 @@ class PluginStatus:
         self.bytes_recv = 0
         self.last_recv = mauka_message.heartbeat.last_received_timestamp_ms
         self.plugin_state = mauka_message.heartbeat.plugin_state
+        self.worker_states = list(mauka_message.heartbeat.worker_states)
 
 
 class PluginStatuses:
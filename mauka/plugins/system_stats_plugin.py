@@ -2,12 +2,14 @@
 This plugin calculates and stores statistics about mauka and the system,
 """
 import collections
+import datetime
 import json
 import multiprocessing.queues
 import threading
 import time
 import typing
 
+import bson.objectid
 import numpy
 import psutil
 
@@ -126,6 +128,97 @@ class DescriptiveStatistic:
         self.end_timestamp_s = 0
 
 
+class GridFsUsage:
+    """
+    A cache of the number of gridfs bytes used by each filename prefix.
+
+    The cache is rebuilt with a single server-side aggregation over fs.files every full_refresh_s seconds. In between,
+    each refresh only aggregates the files inserted since the previous refresh (by _id), and the bytes freed by GC are
+    subtracted as GcStat messages arrive. Bytes freed while a full refresh runs are subtracted again from its result,
+    since the aggregation may have counted them. Files are only counted once they are lag_s seconds old so that files
+    inserted with slightly older ObjectIds by other processes are not skipped.
+    """
+
+    def __init__(self,
+                 mongo_client: mongo.OpqMongoClient,
+                 prefixes: typing.List[str],
+                 full_refresh_s: float,
+                 lag_s: float = 60.0,
+                 clock: typing.Callable[[], float] = time.time):
+        """
+        Initializes a GridFsUsage cache.
+        :param mongo_client: An OpqMongoClient.
+        :param prefixes: The filename prefixes to track.
+        :param full_refresh_s: How often in seconds the cache is rebuilt from all of fs.files.
+        :param lag_s: How old in seconds a file must be before it is counted.
+        :param clock: Returns the current time in seconds since the epoch.
+        """
+        self.mongo_client = mongo_client
+        self.prefixes = prefixes
+        self.full_refresh_s = full_refresh_s
+        self.lag_s = lag_s
+        self.clock = clock
+        self.lengths: typing.Dict[str, int] = {prefix: 0 for prefix in prefixes}
+        self.cursor: typing.Optional[bson.objectid.ObjectId] = None
+        self.last_full_refresh_s = 0.0
+        self.full_refreshes = 0
+        self.incremental_refreshes = 0
+        self.removed_during_refresh: typing.Optional[typing.Dict[str, int]] = None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Adds the files inserted since the previous refresh, or rebuilds the cache if a full refresh is due.
+        """
+        now_s = self.clock()
+        upper_bound = bson.objectid.ObjectId.from_datetime(
+            datetime.datetime.fromtimestamp(now_s - self.lag_s, datetime.timezone.utc))
+
+        if self.cursor is None or now_s - self.last_full_refresh_s >= self.full_refresh_s:
+            with self.lock:
+                self.removed_during_refresh = {prefix: 0 for prefix in self.prefixes}
+            try:
+                lengths = self.mongo_client.gridfs_length_by_prefix(self.prefixes, {"$lt": upper_bound})
+            finally:
+                with self.lock:
+                    removed_during_refresh = self.removed_during_refresh
+                    self.removed_during_refresh = None
+            with self.lock:
+                self.lengths = {prefix: max(0, length - removed_during_refresh.get(prefix, 0))
+                                for prefix, length in lengths.items()}
+            self.last_full_refresh_s = now_s
+            self.full_refreshes += 1
+        else:
+            lengths = self.mongo_client.gridfs_length_by_prefix(self.prefixes, {"$gte": self.cursor,
+                                                                                "$lt": upper_bound})
+            with self.lock:
+                for prefix, length in lengths.items():
+                    self.lengths[prefix] += length
+            self.incremental_refreshes += 1
+
+        self.cursor = upper_bound
+
+    def remove(self, prefix: str, length: int):
+        """
+        Subtracts the bytes of files that were deleted.
+        :param prefix: The filename prefix of the deleted files.
+        :param length: The number of bytes deleted.
+        """
+        with self.lock:
+            self.lengths[prefix] = max(0, self.lengths[prefix] - length)
+            if self.removed_during_refresh is not None:
+                self.removed_during_refresh[prefix] += length
+
+    def length(self, prefix: str) -> int:
+        """
+        Returns the number of bytes used by the files of a prefix.
+        :param prefix: The filename prefix.
+        :return: The number of bytes used by the files of the prefix.
+        """
+        with self.lock:
+            return self.lengths[prefix]
+
+
 class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
     """
     Mauka plugin that retrieves and stores system and plugin stats
@@ -161,6 +254,10 @@ class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
 
         self.box_measurement_rates: typing.Dict[str, int] = {}
 
+        self.gridfs_usage = GridFsUsage(self.mongo_client,
+                                        ["event", "incident"],
+                                        float(conf.get("plugins.SystemStatsPlugin.gridfsFullRefreshS", 86400.0)))
+
         # Start stats collection
         system_stats_timer = threading.Timer(self.system_stats_interval_s, self.update_system_stats,
                                              args=[self.system_stats_interval_s])
@@ -180,16 +277,7 @@ class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
         # pylint: disable=C0103
         box_events_collection_size_bytes = self.mongo_client.get_collection_size_bytes(mongo.Collection.BOX_EVENTS)
         self.debug("Got collection sizes...")
-        cursor = self.mongo_client.fs_files_collection.find({},
-                                                            projection={
-                                                                '_id': False,
-                                                                'filename': True,
-                                                                'length': True})
-        self.debug("Got events cursor")
-
-        only_events = filter(lambda fs_file: fs_file["filename"].startswith("event"), cursor)
-        self.debug("Got only_events")
-        fs_files_size_bytes = sum(map(lambda fs_file: fs_file["length"], only_events))
+        fs_files_size_bytes = self.gridfs_usage.length("event")
         self.debug("Done collecting event stats.")
         return (
             events_collection_size_bytes +
@@ -207,13 +295,7 @@ class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
         self.debug("Collecting incident stats...")
         incidents_collection_size_bytes = self.mongo_client.get_collection_size_bytes(mongo.Collection.INCIDENTS)
 
-        cursor = self.mongo_client.fs_files_collection.find({},
-                                                            projection={
-                                                                '_id': False,
-                                                                'filename': True,
-                                                                'length': True})
-        only_incidents = filter(lambda fs_file: fs_file["filename"].startswith("incident"), cursor)
-        fs_files_size_bytes = sum(map(lambda fs_file: fs_file["length"], only_incidents))
+        fs_files_size_bytes = self.gridfs_usage.length("incident")
         self.debug("Done collecting incident stats.")
 
         return (
@@ -223,15 +305,11 @@ class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
 
     def active_devices(self) -> typing.Set[str]:
         """
-        Returns the set of active device ids.
+        Returns the set of device ids that have sent a measurement within the last 5 seconds.
         :return: The set of active device ids.
         """
-        measurements_last_minute = self.mongo_client.measurements_collection.find(
-            {"timestamp_ms": {"$gt": (timestamp() - 5) * 1000}},
-            projection={"_id": False,
-                        "timestamp_ms": True,
-                        "box_id": True})
-        return set(map(lambda measurement: measurement["box_id"], measurements_last_minute))
+        self.mongo_client.box_liveness.update()
+        return self.mongo_client.box_liveness.active_boxes(5_000)
 
     def num_active_devices(self) -> int:
         """
@@ -258,6 +336,7 @@ class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
         self.debug("handle_gc_stat_message")
         gc_domain = mauka_message.laha.gc_stat.gc_domain
         gc_cnt = mauka_message.laha.gc_stat.gc_cnt
+        gc_bytes = mauka_message.laha.gc_stat.gc_bytes
         if gc_domain == protobuf.mauka_pb2.SAMPLES:
             self.gc_stats[protobuf.mauka_pb2.SAMPLES] += gc_cnt
         elif gc_domain == protobuf.mauka_pb2.MEASUREMENTS:
@@ -266,8 +345,10 @@ class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
             self.gc_stats[protobuf.mauka_pb2.TRENDS] += gc_cnt
         elif gc_domain == protobuf.mauka_pb2.EVENTS:
             self.gc_stats[protobuf.mauka_pb2.EVENTS] += gc_cnt
+            self.gridfs_usage.remove("event", gc_bytes)
         elif gc_domain == protobuf.mauka_pb2.INCIDENTS:
             self.gc_stats[protobuf.mauka_pb2.INCIDENTS] += gc_cnt
+            self.gridfs_usage.remove("incident", gc_bytes)
         elif gc_domain == protobuf.mauka_pb2.PHENOMENA:
             self.gc_stats[protobuf.mauka_pb2.PHENOMENA] += gc_cnt
         else:
@@ -332,6 +413,7 @@ class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
         :param interval_s: The interval in seconds in which statistics should be collected.
         """
         self.debug("Collecting stats")
+        self.gridfs_usage.refresh()
         stats = {
             "timestamp_s": timestamp(),
             "plugin_stats": self.plugin_stats,
@@ -351,33 +433,33 @@ class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
                 "aggregate_measurements_stats": {
                     "measurements": {
                         "ttl": self.mongo_client.get_ttl("measurements"),
-                        "count": self.mongo_client.measurements_collection.count(),
+                        "count": self.mongo_client.measurements_collection.estimated_document_count(),
                         "size_bytes": self.mongo_client.get_collection_size_bytes(mongo.Collection.MEASUREMENTS)
                     },
                     "trends": {
                         "ttl": self.get_mongo_client().get_ttl("trends"),
-                        "count": self.mongo_client.trends_collection.count(),
+                        "count": self.mongo_client.trends_collection.estimated_document_count(),
                         "size_bytes": self.mongo_client.get_collection_size_bytes(mongo.Collection.TRENDS)
                     }
                 },
                 "detections_stats": {
                     "events": {
                         "ttl": self.mongo_client.get_ttl("events"),
-                        "count": self.mongo_client.events_collection.count(),
+                        "count": self.mongo_client.events_collection.estimated_document_count(),
                         "size_bytes": self.events_size_bytes()
                     }
                 },
                 "incidents_stats": {
                     "incidents": {
                         "ttl": self.mongo_client.get_ttl("incidents"),
-                        "count": self.mongo_client.incidents_collection.count(),
+                        "count": self.mongo_client.incidents_collection.estimated_document_count(),
                         "size_bytes": self.incidents_size_bytes()
                     }
                 },
                 "phenomena_stats": {
                     "phenomena": {
                         "ttl": -1,
-                        "count": self.mongo_client.phenomena_collection.count(),
+                        "count": self.mongo_client.phenomena_collection.estimated_document_count(),
                         "size_bytes": self.phenomena_size_bytes()
                     }
                 },
@@ -397,7 +479,7 @@ class SystemStatsPlugin(plugins.base_plugin.MaukaPlugin):
             },
             "other_stats": {
                 "ground_truth": {
-                    "count": self.mongo_client.ground_truth_collection.count(),
+                    "count": self.mongo_client.ground_truth_collection.estimated_document_count(),
                     "size_bytes": self.mongo_client.get_collection_size_bytes(mongo.Collection.GROUND_TRUTH)
                 }
             }
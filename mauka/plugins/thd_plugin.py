@@ -29,7 +29,7 @@ def thd(mauka_message: protobuf.mauka_pb2.MaukaMessage,
     :return: A list of incident ids (if any)
     """
     try:
-        data: typing.List[float] = list(mauka_message.payload.data)
+        data: typing.List[float] = protobuf.pb_util.repeated_as_ndarray(mauka_message.payload).tolist()
         log.maybe_debug("Found %d samples." % len(data), thd_plugin)
         incidents = mauka_native_py.classify_thd(mauka_message.payload.start_timestamp_ms, thd_threshold_percent, data)
         log.maybe_debug("Found %d THD Incidents." % len(incidents), thd_plugin)
@@ -85,9 +85,10 @@ class ThdPlugin(plugins.base_plugin.MaukaPlugin):
         :param mauka_message: Contents of the message.
         """
         if protobuf.pb_util.is_payload(mauka_message, protobuf.mauka_pb2.ADC_SAMPLES):
-            self.debug("on_message {}:{} len:{}".format(mauka_message.payload.event_id,
-                                                        mauka_message.payload.box_id,
-                                                        len(mauka_message.payload.data)))
+            self.debug("on_message {}:{} len:{}".format(
+                mauka_message.payload.event_id,
+                mauka_message.payload.box_id,
+                len(protobuf.pb_util.repeated_as_ndarray(mauka_message.payload))))
             incident_ids = thd(mauka_message, self.threshold_percent, self.mongo_client, self)
 
             for incident_id in incident_ids:
@@ -3,6 +3,9 @@ This plugin detects, classifies, and stores transient incidents.
 Transient are classified using the IEEE 1159 standard
 """
 import multiprocessing
+import time
+import typing
+
 import numpy
 
 from scipy import optimize
@@ -11,6 +14,7 @@ from scipy import signal
 
 import config
 import constants
+import dsp
 import plugins.base_plugin
 from plugins.routes import Routes
 import protobuf.mauka_pb2
@@ -19,39 +23,69 @@ import mongo
 
 
 
-def transient_sliding_window(filtered_waveform: numpy.ndarray, noise_floor: float, max_lull_ms: float) -> list:
+def iter_transient_windows(filtered_waveform: numpy.ndarray,
+                           noise_floor: float,
+                           max_lull_ms: float,
+                           chunk_samples: typing.Optional[int] = None) -> typing.Iterator[typing.Tuple[int, int]]:
+    """
+    Generates candidate transient window start and stop indices.
+
+    Runs of samples at or above the noise floor are found with numpy rather than by walking every sample. Runs separated
+    by a lull of at most max_lull_ms are merged into the same window. When chunk_samples is provided, the waveform is
+    processed chunk by chunk so that only one chunk's worth of the above noise floor mask is held in memory at a time.
+    :param filtered_waveform: The filtered waveform.
+    :param noise_floor: The noise floor.
+    :param max_lull_ms: The longest lull (in ms) that does not end a window.
+    :param chunk_samples: Optional number of samples to process at a time.
+    :return: An iterator of (start, stop) tuples.
+    """
+    max_samples = int(constants.SAMPLES_PER_MILLISECOND * max_lull_ms)
+    num_samples = len(filtered_waveform)
+    chunk_samples = num_samples if not chunk_samples else int(chunk_samples)
+    # Start of the open window and index of its last sample above the noise floor
+    start = None
+    last_above = 0
+
+    for offset in range(0, num_samples, max(1, chunk_samples)):
+        chunk = filtered_waveform[offset: offset + chunk_samples]
+        above = numpy.flatnonzero(numpy.abs(chunk) >= noise_floor)
+        if len(above) == 0:
+            continue
+        above += offset
+
+        if start is not None and above[0] - last_above - 1 > max_samples:
+            yield start, int(last_above) + 1
+            start = None
+        if start is None:
+            start = int(above[0])
+
+        # A window ends wherever the lull between two samples above the noise floor exceeds max_samples
+        breaks = numpy.flatnonzero(numpy.diff(above) - 1 > max_samples)
+        for stop, next_start in zip((above[breaks] + 1).tolist(), above[breaks + 1].tolist()):
+            yield start, stop
+            start = next_start
+        last_above = int(above[-1])
+
+    if start is not None:
+        if num_samples - last_above - 1 > max_samples:
+            yield start, last_above + 1
+        else:
+            yield start, num_samples
+
+
+def transient_sliding_window(filtered_waveform: numpy.ndarray,
+                             noise_floor: float,
+                             max_lull_ms: float,
+                             chunk_samples: typing.Optional[int] = None) -> list:
     """
     Function to find candidate transient window start and stop indices
     :param filtered_waveform:
     :param noise_floor:
     :param max_lull_ms:
+    :param chunk_samples: Optional number of samples to process at a time.
     :return:
     """
-    voltage_above_noise_floor = abs(filtered_waveform) >= noise_floor
-    transient_windows = []
-    max_samples = int(constants.SAMPLES_PER_MILLISECOND * max_lull_ms)
-    lull_counter = 0
-    new_pass = True
-    start = 0
-
-    for i in range(len(filtered_waveform)):
-        if voltage_above_noise_floor[i]:
-            lull_counter = 0
-            if new_pass:
-                start = i
-                new_pass = False
-        elif not new_pass:
-            lull_counter += 1
-
-        if lull_counter > max_samples:
-            transient_windows.append((start, i - max_samples))
-            lull_counter = 0
-            new_pass = True
-
-    if not new_pass:
-        transient_windows.append((start, len(filtered_waveform)))
-
-    return transient_windows
+    return list(iter_transient_windows(filtered_waveform, noise_floor, max_lull_ms, chunk_samples))
 
 
 def noise_canceler(voltage, noise_floor):
@@ -79,6 +113,72 @@ def find_zero_xings(waveform: numpy.ndarray) -> numpy.ndarray:
     return numpy.diff(numpy.signbit(waveform))
 
 
+def noise_cancel(waveform: numpy.ndarray, noise_floor: float) -> numpy.ndarray:
+    """
+    Cancels waveform measurements below noise floor. This is the array equivalent of noise_canceler.
+    :param waveform: The voltage measurements
+    :param noise_floor: The noise floor
+    :return: voltages above noise floor.
+    """
+    waveform = numpy.asarray(waveform, dtype=numpy.float64)
+    return numpy.where(numpy.abs(waveform) < noise_floor, 0.0, waveform - numpy.sign(waveform) * noise_floor)
+
+
+class TransientContext:
+    """
+    Per window values shared by the transient classifiers. Each value is computed once with array operations.
+    """
+
+    def __init__(self, filtered_waveform: numpy.ndarray, noise_floor: float):
+        """
+        Initializes a TransientContext.
+        :param filtered_waveform: The transient waveform, that is the sampled waveform without the fundamental frequency
+        included
+        :param noise_floor: The noise floor
+        """
+        self.filtered_waveform = filtered_waveform
+        self.noise_canceled_waveform = noise_cancel(filtered_waveform, noise_floor)
+        self.sign = numpy.sign(self.noise_canceled_waveform)
+        self.zero_xings = find_zero_xings(self.noise_canceled_waveform)
+        nonzero_indices = numpy.flatnonzero(self.noise_canceled_waveform)
+        self.first_non_zero_index = int(nonzero_indices[0]) if len(nonzero_indices) > 0 else None
+        self.last_non_zero_index = int(nonzero_indices[-1]) if len(nonzero_indices) > 0 else None
+        self.oscillatory_fit: typing.Optional[OscillatoryFit] = None
+
+
+class OscillatoryFit:
+    """
+    Records how the oscillatory classifier fit a damped sinusoid to a window.
+    """
+
+    def __init__(self, fit: typing.Optional[dsp.DampedSinusoid], method: str, elapsed_s: float):
+        """
+        Initializes an OscillatoryFit.
+        :param fit: The fit damped sinusoid or None if no fit was made.
+        :param method: The method used (matrix_pencil, leastsq, or over_budget if the fallback was skipped).
+        :param elapsed_s: The time spent fitting the window in seconds.
+        """
+        self.fit = fit
+        self.method = method
+        self.elapsed_s = elapsed_s
+
+
+def transient_context(filtered_waveform: numpy.ndarray,
+                      configs: dict,
+                      context: typing.Optional[TransientContext] = None) -> TransientContext:
+    """
+    Returns the provided context or builds one for the provided window.
+    :param filtered_waveform: The transient waveform
+    :param configs: Includes the noise floor
+    :param context: An optional precomputed context
+    :return: The transient context of the window.
+    """
+    if context is not None:
+        return context
+
+    return TransientContext(filtered_waveform, configs['noise_floor'])
+
+
 def waveform_filter(raw_waveform: numpy.ndarray, filter_order: int, transient_cutoff_frequency: float) -> dict:
     """
     Function to filter out the fundamental waveform to retrieve the potential transient waveform
@@ -87,68 +187,52 @@ def waveform_filter(raw_waveform: numpy.ndarray, filter_order: int, transient_cu
     :param transient_cutoff_frequency: The cutoff frequency of the low pass Butterworth filter.
     :return: The filtered waveform, that is the waveform without the fundamental frequency component
     """
-
-    # smooth digital signal w/ Butterworth filter
-    # First, design the Butterworth filter
-    # Cutoff frequencies in half-cycles / sample
-    cutoff_frequency_nyquist = transient_cutoff_frequency * 2 / constants.SAMPLE_RATE_HZ
-    # noinspection PyTupleAssignmentBalance
-    numerator, denominator = signal.butter(filter_order, cutoff_frequency_nyquist, output='ba')
-
-    fundamental_waveform = signal.filtfilt(numerator, denominator, raw_waveform)
-    filtered_waveform = raw_waveform - fundamental_waveform
+    fundamental_waveform = dsp.zero_phase_lowpass(raw_waveform, filter_order, transient_cutoff_frequency)
+    filtered_waveform = dsp.zero_phase_highpass(raw_waveform, filter_order, transient_cutoff_frequency,
+                                                lowpassed_waveform=fundamental_waveform)
 
     return {"fundamental_waveform": fundamental_waveform, "filtered_waveform": filtered_waveform,
             "raw_waveform": raw_waveform}
 
 
-def oscillatory_classifier(filtered_waveform: numpy.ndarray, configs: dict) -> (bool, dict):
+def oscillatory_classifier(filtered_waveform: numpy.ndarray, configs: dict,
+                           context: typing.Optional[TransientContext] = None) -> (bool, dict):
     """
     Identifies whether the transient is oscillatory and, if so, further classifies the transient as a medium, low, or
     high frequency oscillatory transient and calculates additional meta data for the transient such as the magnitude,
     duration, and spectral content.
     :param filtered_waveform: The transient waveform, that is the sampled waveform without the fundamental frequency
     included
+    :param configs: Includes the necessary parameters needed to classify the transient
+    :param context: An optional precomputed transient context of filtered_waveform
     :return: A tuple which has contains a boolean indicator of whether the transient was indeed classified as being
     oscillatory and then a dictionary of the calculated meta data.
     """
 
     # First ensure there is at least 3 periods in the potential oscillatory waveform
-    noise_canceled_waveform = numpy.vectorize(noise_canceler)(filtered_waveform, configs['noise_floor'])
-    z_crossings = find_zero_xings(noise_canceled_waveform)
-    if z_crossings.sum() < configs['oscillatory_min_cycles']:
+    context = transient_context(filtered_waveform, configs, context)
+    if context.zero_xings.sum() < configs['oscillatory_min_cycles']:
         return False, {}
 
-    # Fit damped sine wave to signal
-    guess_amp = constants.NOMINAL_VRMS * numpy.sqrt(2)
-    guess_decay = 200.0
-    guess_freq = 2500.0
-    guess_phase = 0.0
-    guess_mean = 0.0
-    idx = numpy.arange(0, len(filtered_waveform) / constants.SAMPLE_RATE_HZ, 1 / constants.SAMPLE_RATE_HZ)
+    # Fit damped sine wave to signal in closed form, only falling back to a nonlinear fit if the closed form estimator
+    # does not find an oscillatory pole pair. The nonlinear fit gets whatever is left of the window's time budget.
+    start_s = time.perf_counter()
     alpha = 0.05
-
-    i = 0
-    while len(idx) != len(filtered_waveform):
-        if len(idx) > len(filtered_waveform):
-            idx = idx[:len(filtered_waveform)]
-        elif len(idx) < len(filtered_waveform):
-            idx = numpy.arange(0, (len(filtered_waveform) + i) / constants.SAMPLE_RATE_HZ, 1 / constants.SAMPLE_RATE_HZ)
-            i = i + 1
-
-    def optimize_func(args):
-        """
-        Optimized the function for finding and fitting the frequency.
-        :param args: A list containing in this order: guess_amp, guess_freq, guess_phase, guess_mean.
-        :return: Optimized function.
-        """
-        y_hat = args[0] * numpy.exp(-1.0 * args[1] * idx) * numpy.cos(args[2] * 2 * numpy.pi * idx + args[3]) + args[4]
-        return filtered_waveform - y_hat
-
-    lst_sq_sol = optimize.leastsq(optimize_func,
-                                  numpy.array([guess_amp, guess_decay, guess_freq, guess_phase, guess_mean]))
-
-    rss1 = numpy.power(optimize_func(lst_sq_sol[0]), 2).sum()
+    fit = dsp.matrix_pencil_damped_sinusoid(filtered_waveform)
+    if fit is None:
+        budget_s = configs.get("oscillatory_fit_budget_ms", float("inf")) / 1000.0
+        remaining_s = None if numpy.isinf(budget_s) else budget_s - (time.perf_counter() - start_s)
+        if remaining_s is None or remaining_s > 0:
+            fit = dsp.leastsq_damped_sinusoid(filtered_waveform,
+                                              max_evaluations=configs.get("oscillatory_fit_max_evaluations", 0),
+                                              budget_s=remaining_s)
+        if fit is None:
+            context.oscillatory_fit = OscillatoryFit(None, "over_budget", time.perf_counter() - start_s)
+            return False, {}
+    context.oscillatory_fit = OscillatoryFit(fit, fit.method, time.perf_counter() - start_s)
+
+    rss1 = fit.rss
+    idx = numpy.arange(len(filtered_waveform)) / constants.SAMPLE_RATE_HZ
 
     def optimize_func_constrained(args):
         """
@@ -166,42 +250,45 @@ def oscillatory_classifier(filtered_waveform: numpy.ndarray, configs: dict) -> (
     numerator = numpy.divide((rss0 - rss1), 2)
     denominator = numpy.divide(rss1, (len(idx) - 4 - 1))
     # Stop ignoring
-    f_statistic = numerator / denominator
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        f_statistic = numerator / denominator
     p_value = 1 - stats.f.cdf(f_statistic, 2, (len(idx) - 4 - 1))
 
     if p_value < alpha:
-        return True, {'Frequency': lst_sq_sol[0][2], 'p_value': p_value}
+        return True, {'Frequency': fit.frequency, 'p_value': p_value}
     else:
         return False, {}
 
 
-def impulsive_classifier(filtered_waveform: numpy.ndarray, configs: dict) -> (bool, dict):
+def impulsive_classifier(filtered_waveform: numpy.ndarray, configs: dict,
+                         context: typing.Optional[TransientContext] = None) -> (bool, dict):
     """
     Identifies whether the transient is impulsive and, if so, calculates additional meta data for the transient, such as
     the magnitude, duration, and rise/fall and fall/rise times.
     :param filtered_waveform: The transient waveform, that is the sampled waveform without the fundamental frequency
     included
     :param configs: Includes the necessary parameters needed to classify the transient
+    :param context: An optional precomputed transient context of filtered_waveform
     :return: A tuple which has contains a boolean indicator of whether the transient was indeed classified as being
     impulsive and then a dictionary of the calculated meta data.
     """
 
-    noise_canceled_waveform = numpy.vectorize(noise_canceler)(filtered_waveform, configs['noise_floor'])
+    context = transient_context(filtered_waveform, configs, context)
+    noise_canceled_waveform = context.noise_canceled_waveform
+    start_index = context.first_non_zero_index if context.first_non_zero_index is not None else 0
 
-    if numpy.vectorize(lambda v: v >= 0)(noise_canceled_waveform).all():
+    if not (context.sign < 0).any():
         polarity = 'Positive'
         peak_index = noise_canceled_waveform.argmax()
         peak_voltage = filtered_waveform[peak_index]
-        start_index = (noise_canceled_waveform != 0).argmax()
         decay_voltages = noise_canceled_waveform[peak_index:]
         end_index = decay_voltages.argmin() + peak_index
         rise_time = (peak_index - start_index) / constants.SAMPLE_RATE_HZ
         decay_time = (end_index - peak_index) / constants.SAMPLE_RATE_HZ
-    elif numpy.vectorize(lambda v: v <= 0)(noise_canceled_waveform).all():
+    elif not (context.sign > 0).any():
         polarity = 'Negative'
         peak_index = noise_canceled_waveform.argmin()
         peak_voltage = filtered_waveform[peak_index]
-        start_index = (noise_canceled_waveform != 0).argmax()
         decay_voltages = noise_canceled_waveform[peak_index:]
         end_index = decay_voltages.argmax() + peak_index
         rise_time = (peak_index - start_index) / constants.SAMPLE_RATE_HZ
@@ -214,19 +301,21 @@ def impulsive_classifier(filtered_waveform: numpy.ndarray, configs: dict) -> (bo
                   "End_Index": end_index}
 
 
-def arcing_classifier(filtered_waveform: numpy.ndarray, configs: dict) -> (bool, dict):
+def arcing_classifier(filtered_waveform: numpy.ndarray, configs: dict,
+                      context: typing.Optional[TransientContext] = None) -> (bool, dict):
     """
     Identifies whether the transient is arcing and, if so, calculates additional meta data for the transient, such as
     the number of zero crossings in the transient waveform
     :param filtered_waveform: The transient waveform, that is the sampled waveform without the fundamental frequency
     included
     :param configs: Includes the necessary parameters needed to classify the transient
+    :param context: An optional precomputed transient context of filtered_waveform
     :return: A tuple which has contains a boolean indicator of whether the transient was indeed classified as being
     arcing and then a dictionary of the calculated meta data.
     """
-    noise_canceled_waveform = numpy.vectorize(noise_canceler)(filtered_waveform, configs['noise_floor'])
+    context = transient_context(filtered_waveform, configs, context)
 
-    transient_zero_xings = find_zero_xings(noise_canceled_waveform)
+    transient_zero_xings = context.zero_xings
     num_cycles = transient_zero_xings.sum()
 
     if num_cycles >= 10:
@@ -238,7 +327,7 @@ def arcing_classifier(filtered_waveform: numpy.ndarray, configs: dict) -> (bool,
 
 
 def periodic_notching_classifier(filtered_waveform: numpy.ndarray, fundamental_waveform: numpy.ndarray,
-                                 configs: dict) -> (bool, dict):
+                                 configs: dict, context: typing.Optional[TransientContext] = None) -> (bool, dict):
     """
     Identifies whether the transient is periodic notching and, if so, calculates additional meta data for the transient,
     such as the amplitude, width, period, and time.
@@ -247,26 +336,28 @@ def periodic_notching_classifier(filtered_waveform: numpy.ndarray, fundamental_w
     :param fundamental_waveform: The fundamental waveform of the signal during the transient window, used to determine
     whether the notching is negative power or not.
     :param configs: Includes the necessary parameters needed to classify the transient
+    :param context: An optional precomputed transient context of filtered_waveform
     :return: A tuple which has contains a boolean indicator of whether the transient was indeed classified as being
     periodic notching and then a dictionary of the calculated meta data.
     """
 
     # cancel out measurements of filtered_waveform below noise_floor
-    noise_canceled_waveform = numpy.vectorize(noise_canceler)(filtered_waveform, configs['noise_floor'])
+    context = transient_context(filtered_waveform, configs, context)
 
     # determine whether the notching is negative power or not
-    if 1 in numpy.sign(noise_canceled_waveform) * numpy.sign(fundamental_waveform):
+    if (context.sign * numpy.sign(fundamental_waveform) == 1).any():
+        return False, {}
+
+    if context.first_non_zero_index is None:
         return False, {}
 
     # determine whether the notching is nearly periodic
-    first_non_zero_index = numpy.nonzero(noise_canceled_waveform)[0][0]
-    last_non_zero_index = numpy.nonzero(noise_canceled_waveform)[0][-1]
-    transient = noise_canceled_waveform[first_non_zero_index: last_non_zero_index + 1]
+    transient = context.noise_canceled_waveform[context.first_non_zero_index: context.last_non_zero_index + 1]
 
     # determine whether transient wave is nearly periodic
     transient_abs = numpy.abs(transient)
 
-    auto_corr = numpy.correlate(transient_abs, transient_abs[:int(transient_abs.size / 2)], mode='valid')
+    auto_corr = dsp.sliding_autocorrelation(transient_abs, int(transient_abs.size / 2))
     auto_corr = auto_corr[int(auto_corr.size / 2):]
     auto_corr = auto_corr / numpy.max(auto_corr)
     peaks = signal.find_peaks(auto_corr, height=configs["auto_corr_thresh_periodicity"])
@@ -327,7 +418,8 @@ def transient_incident_classifier(event_id: int, box_id: str, raw_waveform: nump
 
     waveforms = waveform_filter(raw_waveform, configs['filter_order'], configs['filter_cutoff_frequency'])
     candidate_transient_windows = transient_sliding_window(waveforms["filtered_waveform"], configs["noise_floor"],
-                                                           configs["max_lull_ms"])
+                                                           configs["max_lull_ms"],
+                                                           configs.get("sliding_window_chunk_samples"))
 
     if logger is not None:
         logger.debug("Calculating transients with {} segments.".format(len(candidate_transient_windows)))
@@ -339,21 +431,27 @@ def transient_incident_classifier(event_id: int, box_id: str, raw_waveform: nump
         incident_start_ts = int(window[0] / constants.SAMPLES_PER_MILLISECOND + box_event_start_ts)
         incident_end_ts = int(incident_start_ts + (window[1] - window[0]) / constants.SAMPLES_PER_MILLISECOND)
 
-        impulsive = impulsive_classifier(windowed_waveforms["filtered_waveform"], configs)
+        context = TransientContext(windowed_waveforms["filtered_waveform"], configs["noise_floor"])
+
+        impulsive = impulsive_classifier(windowed_waveforms["filtered_waveform"], configs, context)
         if impulsive[0]:
             meta.update(impulsive[1])
             incident_classifications.append("IMPULSIVE_TRANSIENT")
             incident_flag = True
 
         else:
-            arcing = arcing_classifier(windowed_waveforms["filtered_waveform"], configs)
+            arcing = arcing_classifier(windowed_waveforms["filtered_waveform"], configs, context)
             if arcing[0]:
                 meta.update(arcing[1])
                 incident_classifications.append("ARCING_TRANSIENT")
                 incident_flag = True
 
             else:
-                oscillatory = oscillatory_classifier(windowed_waveforms["filtered_waveform"], configs)
+                oscillatory = oscillatory_classifier(windowed_waveforms["filtered_waveform"], configs, context)
+                if logger is not None and context.oscillatory_fit is not None \
+                        and context.oscillatory_fit.method != "matrix_pencil":
+                    logger.debug("Oscillatory fit fell back to %s after %f ms.", context.oscillatory_fit.method,
+                                 context.oscillatory_fit.elapsed_s * 1000.0)
                 if oscillatory[0]:
                     meta.update(oscillatory[1])
                     incident_classifications.append("OSCILLATORY_TRANSIENT")
@@ -362,7 +460,8 @@ def transient_incident_classifier(event_id: int, box_id: str, raw_waveform: nump
                 else:
                     periodic_notching = periodic_notching_classifier(windowed_waveforms["filtered_waveform"],
                                                                      windowed_waveforms["fundamental_waveform"],
-                                                                     configs)
+                                                                     configs,
+                                                                     context)
                     if periodic_notching[0]:
                         meta.update(periodic_notching[1])
                         incident_classifications.append("PERIODIC_NOTCHING_TRANSIENT")
@@ -414,8 +513,14 @@ class TransientPlugin(plugins.base_plugin.MaukaPlugin):
             "oscillatory_low_freq_max": float(self.config.get("plugins.TransientPlugin.oscillatory.low.freq.max.hz")),
             "oscillatory_med_freq_max": float(self.config.get("plugins.TransientPlugin.oscillatory.med.freq.max.hz")),
             "oscillatory_high_freq_max": float(self.config.get("plugins.TransientPlugin.oscillatory.high.freq.max.hz")),
+            "oscillatory_fit_budget_ms": float(self.config.get("plugins.TransientPlugin.oscillatory.fit.budget.ms",
+                                                               float("inf"))),
+            "oscillatory_fit_max_evaluations": int(self.config.get(
+                "plugins.TransientPlugin.oscillatory.fit.max.evaluations", 0)),
             "arc_zero_xing_threshold": int(self.config.get("plugins.TransientPlugin.arcing.zero.crossing.threshold")),
             "max_lull_ms": float(self.config.get("plugins.TransientPlugin.max.lull.ms")),
+            "sliding_window_chunk_samples": int(self.config.get(
+                "plugins.TransientPlugin.sliding.window.chunk.samples", 0)),
             "max_std_periodic_notching": float(self.config.get(
                 "plugins.TransientPlugin.max.periodic.notching.std.dev")),
             "auto_corr_thresh_periodicity": float(
@@ -430,13 +535,15 @@ class TransientPlugin(plugins.base_plugin.MaukaPlugin):
         """
         self.debug("{} on_message".format(topic))
         if protobuf.pb_util.is_payload(mauka_message, protobuf.mauka_pb2.VOLTAGE_RAW):
-            self.debug("on_message {}:{} len:{}".format(mauka_message.payload.event_id,
-                                                        mauka_message.payload.box_id,
-                                                        len(mauka_message.payload.data)))
+            self.debug("on_message {}:{} len:{}".format(
+                mauka_message.payload.event_id,
+                mauka_message.payload.box_id,
+                len(protobuf.pb_util.repeated_as_ndarray(mauka_message.payload))))
 
             incidents = transient_incident_classifier(mauka_message.payload.event_id, mauka_message.payload.box_id,
-                                                      protobuf.pb_util.repeated_as_ndarray(mauka_message.payload.data),
-                                                      mauka_message.payload.start_timestamp_ms, self.configs)
+                                                      protobuf.pb_util.repeated_as_ndarray(mauka_message.payload),
+                                                      mauka_message.payload.start_timestamp_ms, self.configs,
+                                                      self.mongo_client)
 
             for incident in incidents:
                 incident_id = mongo.store_incident(
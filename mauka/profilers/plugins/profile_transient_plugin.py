@@ -0,0 +1,42 @@
+import timeit
+
+import numpy
+
+import constants
+from plugins.transient_plugin import noise_canceler
+from plugins.transient_plugin import find_zero_xings
+from plugins.transient_plugin import TransientContext
+
+
+def simulate_transient_window(num_samples: int = int(2 * constants.SAMPLES_PER_CYCLE), noise_floor: float = 6.0,
+                              rnd_seed=0) -> numpy.ndarray:
+    rand = numpy.random.RandomState(seed=rnd_seed)
+    t = numpy.arange(num_samples) / constants.SAMPLE_RATE_HZ
+    return 4 * noise_floor * numpy.exp(-200.0 * t) * numpy.cos(2 * numpy.pi * 2500.0 * t) + rand.randn(num_samples)
+
+
+def per_classifier_noise_cancellation(filtered_waveform: numpy.ndarray, noise_floor: float):
+    # What impulsive, arcing, oscillatory, and periodic notching classifiers each computed for every window
+    for _ in range(4):
+        noise_canceled_waveform = numpy.vectorize(noise_canceler)(filtered_waveform, noise_floor)
+        find_zero_xings(noise_canceled_waveform)
+    numpy.vectorize(lambda v: v >= 0)(noise_canceled_waveform).all()
+    numpy.vectorize(lambda v: v <= 0)(noise_canceled_waveform).all()
+    numpy.nonzero(noise_canceled_waveform)
+
+
+def profile_transient_context(noise_floor: float = 6.0, number: int = 100):
+    print("samples per window | per classifier (ms) | transient context (ms) | speedup")
+    for num_samples in [200, 1200, 12000]:
+        filtered_waveform = simulate_transient_window(num_samples, noise_floor)
+        per_classifier_s = timeit.timeit(lambda: per_classifier_noise_cancellation(filtered_waveform, noise_floor),
+                                         number=number) / number
+        context_s = timeit.timeit(lambda: TransientContext(filtered_waveform, noise_floor), number=number) / number
+        print("{:>18} | {:>19.3f} | {:>22.3f} | {:>6.1f}x".format(num_samples,
+                                                                   per_classifier_s * 1000,
+                                                                   context_s * 1000,
+                                                                   per_classifier_s / context_s))
+
+
+if __name__ == "__main__":
+    profile_transient_context()
@@ -1,12 +1,10 @@
+# -*- coding: utf-8 -*-
 # Generated by the protocol buffer compiler.  DO NOT EDIT!
 # source: mauka.proto
-
-import sys
-_b=sys.version_info[0]<3 and (lambda x:x) or (lambda x:x.encode('latin1'))
-from google.protobuf.internal import enum_type_wrapper
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
 from google.protobuf import descriptor as _descriptor
-from google.protobuf import message as _message
-from google.protobuf import reflection as _reflection
+from google.protobuf import descriptor_pool as _descriptor_pool
 from google.protobuf import symbol_database as _symbol_database
 # @@protoc_insertion_point(imports)
 
@@ -15,1354 +13,55 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor.FileDescriptor(
-  name='mauka.proto',
-  package='',
-  syntax='proto3',
-  serialized_options=None,
-  serialized_pb=_b('\n\x0bmauka.proto\"\xc5\x05\n\x0cMaukaMessage\x12\x14\n\x0ctimestamp_ms\x18\x01 \x01(\x04\x12\x0e\n\x06source\x18\x02 \x01(\t\x12\x1b\n\x07payload\x18\x03 \x01(\x0b\x32\x08.PayloadH\x00\x12\x1f\n\theartbeat\x18\x04 \x01(\x0b\x32\n.HeartbeatH\x00\x12\"\n\x0bmakai_event\x18\x05 \x01(\x0b\x32\x0b.MakaiEventH\x00\x12#\n\x0bmeasurement\x18\x06 \x01(\x0b\x32\x0c.MeasurementH\x00\x12&\n\rmakai_trigger\x18\x07 \x01(\x0b\x32\r.MakaiTriggerH\x00\x12\x15\n\x04laha\x18\x08 \x01(\x0b\x32\x05.LahaH\x00\x12*\n\x0ftrigger_request\x18\t \x01(\x0b\x32\x0f.TriggerRequestH\x00\x12*\n\x0ftriggered_event\x18\n \x01(\x0b\x32\x0f.TriggeredEventH\x00\x12G\n\x1ethreshold_optimization_request\x18\x0b \x01(\x0b\x32\x1d.ThresholdOptimizationRequestH\x00\x12;\n\x18\x62ox_optimization_request\x18\x0c \x01(\x0b\x32\x17.BoxOptimizationRequestH\x00\x12\x42\n\x1c\x62ox_measurement_rate_request\x18\r \x01(\x0b\x32\x1a.BoxMeasurementRateRequestH\x00\x12\x44\n\x1d\x62ox_measurement_rate_response\x18\x0e \x01(\x0b\x32\x1b.BoxMeasurementRateResponseH\x00\x12)\n\x0fincident_id_req\x18\x0f \x01(\x0b\x32\x0e.IncidentIdReqH\x00\x12+\n\x10incident_id_resp\x18\x10 \x01(\x0b\x32\x0f.IncidentIdRespH\x00\x42\t\n\x07message\"\x93\x01\n\x07Payload\x12\x10\n\x08\x65vent_id\x18\x01 \x01(\r\x12\x0e\n\x06\x62ox_id\x18\x02 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x03 \x03(\x01\x12\"\n\x0cpayload_type\x18\x04 \x01(\x0e\x32\x0c.PayloadType\x12\x1a\n\x12start_timestamp_ms\x18\x05 \x01(\x04\x12\x18\n\x10\x65nd_timestamp_ms\x18\x06 \x01(\x04\"o\n\tHeartbeat\x12\"\n\x1alast_received_timestamp_ms\x18\x01 \x01(\x04\x12\x18\n\x10on_message_count\x18\x02 \x01(\r\x12\x0e\n\x06status\x18\x03 \x01(\t\x12\x14\n\x0cplugin_state\x18\x04 \x01(\t\"\x1e\n\nMakaiEvent\x12\x10\n\x08\x65vent_id\x18\x01 \x01(\r\"y\n\x0eTriggeredEvent\x12\x0c\n\x04\x64\x61ta\x18\x01 \x03(\x05\x12\x13\n\x0bincident_id\x18\x02 \x01(\x05\x12\x0e\n\x06\x62ox_id\x18\x03 \x01(\t\x12\x1a\n\x12start_timestamp_ms\x18\x04 \x01(\x03\x12\x18\n\x10\x65nd_timestamp_ms\x18\x05 \x01(\x03\"h\n\x0bMeasurement\x12\x0e\n\x06\x62ox_id\x18\x01 \x01(\t\x12\x14\n\x0ctimestamp_ms\x18\x02 \x01(\x04\x12\x11\n\tfrequency\x18\x03 \x01(\x01\x12\x13\n\x0bvoltage_rms\x18\x04 \x01(\x01\x12\x0b\n\x03thd\x18\x05 \x01(\x01\"\x87\x01\n\x0cMakaiTrigger\x12 \n\x18\x65vent_start_timestamp_ms\x18\x01 \x01(\x04\x12\x1e\n\x16\x65vent_end_timestamp_ms\x18\x02 \x01(\x04\x12\x12\n\nevent_type\x18\x03 \x01(\t\x12\x11\n\tmax_value\x18\x04 \x01(\x01\x12\x0e\n\x06\x62ox_id\x18\x05 \x01(\t\"\x86\x01\n\x04Laha\x12\x13\n\x03ttl\x18\x01 \x01(\x0b\x32\x04.TtlH\x00\x12 \n\ngc_trigger\x18\x02 \x01(\x0b\x32\n.GcTriggerH\x00\x12\x1e\n\tgc_update\x18\x03 \x01(\x0b\x32\t.GcUpdateH\x00\x12\x1a\n\x07gc_stat\x18\x04 \x01(\x0b\x32\x07.GcStatH\x00\x42\x0b\n\tlaha_type\"(\n\x03Ttl\x12\x12\n\ncollection\x18\x01 \x01(\t\x12\r\n\x05ttl_s\x18\x02 \x01(\r\"*\n\tGcTrigger\x12\x1d\n\ngc_domains\x18\x01 \x03(\x0e\x32\t.GcDomain\"6\n\x08GcUpdate\x12\x1e\n\x0b\x66rom_domain\x18\x01 \x01(\x0e\x32\t.GcDomain\x12\n\n\x02id\x18\x02 \x01(\r\"6\n\x06GcStat\x12\x1c\n\tgc_domain\x18\x01 \x01(\x0e\x32\t.GcDomain\x12\x0e\n\x06gc_cnt\x18\x02 \x01(\x04\"l\n\x0eTriggerRequest\x12\x1a\n\x12start_timestamp_ms\x18\x01 \x01(\x04\x12\x18\n\x10\x65nd_timestamp_ms\x18\x02 \x01(\x04\x12\x0f\n\x07\x62ox_ids\x18\x03 \x03(\t\x12\x13\n\x0bincident_id\x18\x04 \x01(\x04\"\xf6\x03\n\x1cThresholdOptimizationRequest\x12\x15\n\rdefault_ref_f\x18\x01 \x01(\x01\x12\x15\n\rdefault_ref_v\x18\x02 \x01(\x01\x12\'\n\x1f\x64\x65\x66\x61ult_threshold_percent_f_low\x18\x03 \x01(\x01\x12(\n default_threshold_percent_f_high\x18\x04 \x01(\x01\x12\'\n\x1f\x64\x65\x66\x61ult_threshold_percent_v_low\x18\x05 \x01(\x01\x12(\n default_threshold_percent_v_high\x18\x06 \x01(\x01\x12*\n\"default_threshold_percent_thd_high\x18\x07 \x01(\x01\x12\x0e\n\x06\x62ox_id\x18\x08 \x01(\t\x12\r\n\x05ref_f\x18\t \x01(\x01\x12\r\n\x05ref_v\x18\n \x01(\x01\x12\x1f\n\x17threshold_percent_f_low\x18\x0b \x01(\x01\x12 \n\x18threshold_percent_f_high\x18\x0c \x01(\x01\x12\x1f\n\x17threshold_percent_v_low\x18\r \x01(\x01\x12 \n\x18threshold_percent_v_high\x18\x0e \x01(\x01\x12\"\n\x1athreshold_percent_thd_high\x18\x0f \x01(\x01\"L\n\x16\x42oxOptimizationRequest\x12\x0f\n\x07\x62ox_ids\x18\x01 \x03(\t\x12!\n\x19measurement_window_cycles\x18\x02 \x01(\r\",\n\x19\x42oxMeasurementRateRequest\x12\x0f\n\x07\x62ox_ids\x18\x01 \x03(\t\"F\n\x1a\x42oxMeasurementRateResponse\x12\x0e\n\x06\x62ox_id\x18\x01 \x01(\t\x12\x18\n\x10measurement_rate\x18\x02 \x01(\r\"\x1f\n\rIncidentIdReq\x12\x0e\n\x06req_id\x18\x01 \x01(\r\"6\n\x0eIncidentIdResp\x12\x0f\n\x07resp_id\x18\x01 \x01(\r\x12\x13\n\x0bincident_id\x18\x02 \x01(\r*r\n\x0bPayloadType\x12\x0f\n\x0b\x41\x44\x43_SAMPLES\x10\x00\x12\x0f\n\x0bVOLTAGE_RAW\x10\x01\x12\x0f\n\x0bVOLTAGE_RMS\x10\x02\x12\x18\n\x14VOLTAGE_RMS_WINDOWED\x10\x03\x12\x16\n\x12\x46REQUENCY_WINDOWED\x10\x04*_\n\x08GcDomain\x12\x10\n\x0cMEASUREMENTS\x10\x00\x12\n\n\x06TRENDS\x10\x01\x12\n\n\x06\x45VENTS\x10\x02\x12\r\n\tINCIDENTS\x10\x03\x12\r\n\tPHENOMENA\x10\x04\x12\x0b\n\x07SAMPLES\x10\x05\x62\x06proto3')
-)
-
-_PAYLOADTYPE = _descriptor.EnumDescriptor(
-  name='PayloadType',
-  full_name='PayloadType',
-  filename=None,
-  file=DESCRIPTOR,
-  values=[
-    _descriptor.EnumValueDescriptor(
-      name='ADC_SAMPLES', index=0, number=0,
-      serialized_options=None,
-      type=None),
-    _descriptor.EnumValueDescriptor(
-      name='VOLTAGE_RAW', index=1, number=1,
-      serialized_options=None,
-      type=None),
-    _descriptor.EnumValueDescriptor(
-      name='VOLTAGE_RMS', index=2, number=2,
-      serialized_options=None,
-      type=None),
-    _descriptor.EnumValueDescriptor(
-      name='VOLTAGE_RMS_WINDOWED', index=3, number=3,
-      serialized_options=None,
-      type=None),
-    _descriptor.EnumValueDescriptor(
-      name='FREQUENCY_WINDOWED', index=4, number=4,
-      serialized_options=None,
-      type=None),
-  ],
-  containing_type=None,
-  serialized_options=None,
-  serialized_start=2624,
-  serialized_end=2738,
-)
-_sym_db.RegisterEnumDescriptor(_PAYLOADTYPE)
-
-PayloadType = enum_type_wrapper.EnumTypeWrapper(_PAYLOADTYPE)
-_GCDOMAIN = _descriptor.EnumDescriptor(
-  name='GcDomain',
-  full_name='GcDomain',
-  filename=None,
-  file=DESCRIPTOR,
-  values=[
-    _descriptor.EnumValueDescriptor(
-      name='MEASUREMENTS', index=0, number=0,
-      serialized_options=None,
-      type=None),
-    _descriptor.EnumValueDescriptor(
-      name='TRENDS', index=1, number=1,
-      serialized_options=None,
-      type=None),
-    _descriptor.EnumValueDescriptor(
-      name='EVENTS', index=2, number=2,
-      serialized_options=None,
-      type=None),
-    _descriptor.EnumValueDescriptor(
-      name='INCIDENTS', index=3, number=3,
-      serialized_options=None,
-      type=None),
-    _descriptor.EnumValueDescriptor(
-      name='PHENOMENA', index=4, number=4,
-      serialized_options=None,
-      type=None),
-    _descriptor.EnumValueDescriptor(
-      name='SAMPLES', index=5, number=5,
-      serialized_options=None,
-      type=None),
-  ],
-  containing_type=None,
-  serialized_options=None,
-  serialized_start=2740,
-  serialized_end=2835,
-)
-_sym_db.RegisterEnumDescriptor(_GCDOMAIN)
-
-GcDomain = enum_type_wrapper.EnumTypeWrapper(_GCDOMAIN)
-ADC_SAMPLES = 0
-VOLTAGE_RAW = 1
-VOLTAGE_RMS = 2
-VOLTAGE_RMS_WINDOWED = 3
-FREQUENCY_WINDOWED = 4
-MEASUREMENTS = 0
-TRENDS = 1
-EVENTS = 2
-INCIDENTS = 3
-PHENOMENA = 4
-SAMPLES = 5
-
-
-
-_MAUKAMESSAGE = _descriptor.Descriptor(
-  name='MaukaMessage',
-  full_name='MaukaMessage',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='timestamp_ms', full_name='MaukaMessage.timestamp_ms', index=0,
-      number=1, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='source', full_name='MaukaMessage.source', index=1,
-      number=2, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='payload', full_name='MaukaMessage.payload', index=2,
-      number=3, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='heartbeat', full_name='MaukaMessage.heartbeat', index=3,
-      number=4, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='makai_event', full_name='MaukaMessage.makai_event', index=4,
-      number=5, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='measurement', full_name='MaukaMessage.measurement', index=5,
-      number=6, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='makai_trigger', full_name='MaukaMessage.makai_trigger', index=6,
-      number=7, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='laha', full_name='MaukaMessage.laha', index=7,
-      number=8, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='trigger_request', full_name='MaukaMessage.trigger_request', index=8,
-      number=9, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='triggered_event', full_name='MaukaMessage.triggered_event', index=9,
-      number=10, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='threshold_optimization_request', full_name='MaukaMessage.threshold_optimization_request', index=10,
-      number=11, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='box_optimization_request', full_name='MaukaMessage.box_optimization_request', index=11,
-      number=12, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='box_measurement_rate_request', full_name='MaukaMessage.box_measurement_rate_request', index=12,
-      number=13, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='box_measurement_rate_response', full_name='MaukaMessage.box_measurement_rate_response', index=13,
-      number=14, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='incident_id_req', full_name='MaukaMessage.incident_id_req', index=14,
-      number=15, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='incident_id_resp', full_name='MaukaMessage.incident_id_resp', index=15,
-      number=16, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-    _descriptor.OneofDescriptor(
-      name='message', full_name='MaukaMessage.message',
-      index=0, containing_type=None, fields=[]),
-  ],
-  serialized_start=16,
-  serialized_end=725,
-)
-
-
-_PAYLOAD = _descriptor.Descriptor(
-  name='Payload',
-  full_name='Payload',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='event_id', full_name='Payload.event_id', index=0,
-      number=1, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='box_id', full_name='Payload.box_id', index=1,
-      number=2, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='data', full_name='Payload.data', index=2,
-      number=3, type=1, cpp_type=5, label=3,
-      has_default_value=False, default_value=[],
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='payload_type', full_name='Payload.payload_type', index=3,
-      number=4, type=14, cpp_type=8, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='start_timestamp_ms', full_name='Payload.start_timestamp_ms', index=4,
-      number=5, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='end_timestamp_ms', full_name='Payload.end_timestamp_ms', index=5,
-      number=6, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=728,
-  serialized_end=875,
-)
-
-
-_HEARTBEAT = _descriptor.Descriptor(
-  name='Heartbeat',
-  full_name='Heartbeat',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='last_received_timestamp_ms', full_name='Heartbeat.last_received_timestamp_ms', index=0,
-      number=1, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='on_message_count', full_name='Heartbeat.on_message_count', index=1,
-      number=2, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='status', full_name='Heartbeat.status', index=2,
-      number=3, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='plugin_state', full_name='Heartbeat.plugin_state', index=3,
-      number=4, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=877,
-  serialized_end=988,
-)
-
-
-_MAKAIEVENT = _descriptor.Descriptor(
-  name='MakaiEvent',
-  full_name='MakaiEvent',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='event_id', full_name='MakaiEvent.event_id', index=0,
-      number=1, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=990,
-  serialized_end=1020,
-)
-
-
-_TRIGGEREDEVENT = _descriptor.Descriptor(
-  name='TriggeredEvent',
-  full_name='TriggeredEvent',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='data', full_name='TriggeredEvent.data', index=0,
-      number=1, type=5, cpp_type=1, label=3,
-      has_default_value=False, default_value=[],
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='incident_id', full_name='TriggeredEvent.incident_id', index=1,
-      number=2, type=5, cpp_type=1, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='box_id', full_name='TriggeredEvent.box_id', index=2,
-      number=3, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='start_timestamp_ms', full_name='TriggeredEvent.start_timestamp_ms', index=3,
-      number=4, type=3, cpp_type=2, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='end_timestamp_ms', full_name='TriggeredEvent.end_timestamp_ms', index=4,
-      number=5, type=3, cpp_type=2, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=1022,
-  serialized_end=1143,
-)
-
-
-_MEASUREMENT = _descriptor.Descriptor(
-  name='Measurement',
-  full_name='Measurement',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='box_id', full_name='Measurement.box_id', index=0,
-      number=1, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='timestamp_ms', full_name='Measurement.timestamp_ms', index=1,
-      number=2, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='frequency', full_name='Measurement.frequency', index=2,
-      number=3, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='voltage_rms', full_name='Measurement.voltage_rms', index=3,
-      number=4, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='thd', full_name='Measurement.thd', index=4,
-      number=5, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=1145,
-  serialized_end=1249,
-)
-
-
-_MAKAITRIGGER = _descriptor.Descriptor(
-  name='MakaiTrigger',
-  full_name='MakaiTrigger',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='event_start_timestamp_ms', full_name='MakaiTrigger.event_start_timestamp_ms', index=0,
-      number=1, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='event_end_timestamp_ms', full_name='MakaiTrigger.event_end_timestamp_ms', index=1,
-      number=2, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='event_type', full_name='MakaiTrigger.event_type', index=2,
-      number=3, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='max_value', full_name='MakaiTrigger.max_value', index=3,
-      number=4, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='box_id', full_name='MakaiTrigger.box_id', index=4,
-      number=5, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=1252,
-  serialized_end=1387,
-)
-
-
-_LAHA = _descriptor.Descriptor(
-  name='Laha',
-  full_name='Laha',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='ttl', full_name='Laha.ttl', index=0,
-      number=1, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='gc_trigger', full_name='Laha.gc_trigger', index=1,
-      number=2, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='gc_update', full_name='Laha.gc_update', index=2,
-      number=3, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='gc_stat', full_name='Laha.gc_stat', index=3,
-      number=4, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-    _descriptor.OneofDescriptor(
-      name='laha_type', full_name='Laha.laha_type',
-      index=0, containing_type=None, fields=[]),
-  ],
-  serialized_start=1390,
-  serialized_end=1524,
-)
-
-
-_TTL = _descriptor.Descriptor(
-  name='Ttl',
-  full_name='Ttl',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='collection', full_name='Ttl.collection', index=0,
-      number=1, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='ttl_s', full_name='Ttl.ttl_s', index=1,
-      number=2, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=1526,
-  serialized_end=1566,
-)
-
-
-_GCTRIGGER = _descriptor.Descriptor(
-  name='GcTrigger',
-  full_name='GcTrigger',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='gc_domains', full_name='GcTrigger.gc_domains', index=0,
-      number=1, type=14, cpp_type=8, label=3,
-      has_default_value=False, default_value=[],
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=1568,
-  serialized_end=1610,
-)
-
-
-_GCUPDATE = _descriptor.Descriptor(
-  name='GcUpdate',
-  full_name='GcUpdate',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='from_domain', full_name='GcUpdate.from_domain', index=0,
-      number=1, type=14, cpp_type=8, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='id', full_name='GcUpdate.id', index=1,
-      number=2, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=1612,
-  serialized_end=1666,
-)
-
-
-_GCSTAT = _descriptor.Descriptor(
-  name='GcStat',
-  full_name='GcStat',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='gc_domain', full_name='GcStat.gc_domain', index=0,
-      number=1, type=14, cpp_type=8, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='gc_cnt', full_name='GcStat.gc_cnt', index=1,
-      number=2, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=1668,
-  serialized_end=1722,
-)
-
-
-_TRIGGERREQUEST = _descriptor.Descriptor(
-  name='TriggerRequest',
-  full_name='TriggerRequest',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='start_timestamp_ms', full_name='TriggerRequest.start_timestamp_ms', index=0,
-      number=1, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='end_timestamp_ms', full_name='TriggerRequest.end_timestamp_ms', index=1,
-      number=2, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='box_ids', full_name='TriggerRequest.box_ids', index=2,
-      number=3, type=9, cpp_type=9, label=3,
-      has_default_value=False, default_value=[],
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='incident_id', full_name='TriggerRequest.incident_id', index=3,
-      number=4, type=4, cpp_type=4, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=1724,
-  serialized_end=1832,
-)
-
-
-_THRESHOLDOPTIMIZATIONREQUEST = _descriptor.Descriptor(
-  name='ThresholdOptimizationRequest',
-  full_name='ThresholdOptimizationRequest',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='default_ref_f', full_name='ThresholdOptimizationRequest.default_ref_f', index=0,
-      number=1, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='default_ref_v', full_name='ThresholdOptimizationRequest.default_ref_v', index=1,
-      number=2, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='default_threshold_percent_f_low', full_name='ThresholdOptimizationRequest.default_threshold_percent_f_low', index=2,
-      number=3, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='default_threshold_percent_f_high', full_name='ThresholdOptimizationRequest.default_threshold_percent_f_high', index=3,
-      number=4, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='default_threshold_percent_v_low', full_name='ThresholdOptimizationRequest.default_threshold_percent_v_low', index=4,
-      number=5, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='default_threshold_percent_v_high', full_name='ThresholdOptimizationRequest.default_threshold_percent_v_high', index=5,
-      number=6, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='default_threshold_percent_thd_high', full_name='ThresholdOptimizationRequest.default_threshold_percent_thd_high', index=6,
-      number=7, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='box_id', full_name='ThresholdOptimizationRequest.box_id', index=7,
-      number=8, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='ref_f', full_name='ThresholdOptimizationRequest.ref_f', index=8,
-      number=9, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='ref_v', full_name='ThresholdOptimizationRequest.ref_v', index=9,
-      number=10, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='threshold_percent_f_low', full_name='ThresholdOptimizationRequest.threshold_percent_f_low', index=10,
-      number=11, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='threshold_percent_f_high', full_name='ThresholdOptimizationRequest.threshold_percent_f_high', index=11,
-      number=12, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='threshold_percent_v_low', full_name='ThresholdOptimizationRequest.threshold_percent_v_low', index=12,
-      number=13, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='threshold_percent_v_high', full_name='ThresholdOptimizationRequest.threshold_percent_v_high', index=13,
-      number=14, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='threshold_percent_thd_high', full_name='ThresholdOptimizationRequest.threshold_percent_thd_high', index=14,
-      number=15, type=1, cpp_type=5, label=1,
-      has_default_value=False, default_value=float(0),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=1835,
-  serialized_end=2337,
-)
-
-
-_BOXOPTIMIZATIONREQUEST = _descriptor.Descriptor(
-  name='BoxOptimizationRequest',
-  full_name='BoxOptimizationRequest',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='box_ids', full_name='BoxOptimizationRequest.box_ids', index=0,
-      number=1, type=9, cpp_type=9, label=3,
-      has_default_value=False, default_value=[],
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='measurement_window_cycles', full_name='BoxOptimizationRequest.measurement_window_cycles', index=1,
-      number=2, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=2339,
-  serialized_end=2415,
-)
-
-
-_BOXMEASUREMENTRATEREQUEST = _descriptor.Descriptor(
-  name='BoxMeasurementRateRequest',
-  full_name='BoxMeasurementRateRequest',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='box_ids', full_name='BoxMeasurementRateRequest.box_ids', index=0,
-      number=1, type=9, cpp_type=9, label=3,
-      has_default_value=False, default_value=[],
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=2417,
-  serialized_end=2461,
-)
-
-
-_BOXMEASUREMENTRATERESPONSE = _descriptor.Descriptor(
-  name='BoxMeasurementRateResponse',
-  full_name='BoxMeasurementRateResponse',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='box_id', full_name='BoxMeasurementRateResponse.box_id', index=0,
-      number=1, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=_b("").decode('utf-8'),
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='measurement_rate', full_name='BoxMeasurementRateResponse.measurement_rate', index=1,
-      number=2, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=2463,
-  serialized_end=2533,
-)
-
-
-_INCIDENTIDREQ = _descriptor.Descriptor(
-  name='IncidentIdReq',
-  full_name='IncidentIdReq',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='req_id', full_name='IncidentIdReq.req_id', index=0,
-      number=1, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=2535,
-  serialized_end=2566,
-)
-
-
-_INCIDENTIDRESP = _descriptor.Descriptor(
-  name='IncidentIdResp',
-  full_name='IncidentIdResp',
-  filename=None,
-  file=DESCRIPTOR,
-  containing_type=None,
-  fields=[
-    _descriptor.FieldDescriptor(
-      name='resp_id', full_name='IncidentIdResp.resp_id', index=0,
-      number=1, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-    _descriptor.FieldDescriptor(
-      name='incident_id', full_name='IncidentIdResp.incident_id', index=1,
-      number=2, type=13, cpp_type=3, label=1,
-      has_default_value=False, default_value=0,
-      message_type=None, enum_type=None, containing_type=None,
-      is_extension=False, extension_scope=None,
-      serialized_options=None, file=DESCRIPTOR),
-  ],
-  extensions=[
-  ],
-  nested_types=[],
-  enum_types=[
-  ],
-  serialized_options=None,
-  is_extendable=False,
-  syntax='proto3',
-  extension_ranges=[],
-  oneofs=[
-  ],
-  serialized_start=2568,
-  serialized_end=2622,
-)
-
-_MAUKAMESSAGE.fields_by_name['payload'].message_type = _PAYLOAD
-_MAUKAMESSAGE.fields_by_name['heartbeat'].message_type = _HEARTBEAT
-_MAUKAMESSAGE.fields_by_name['makai_event'].message_type = _MAKAIEVENT
-_MAUKAMESSAGE.fields_by_name['measurement'].message_type = _MEASUREMENT
-_MAUKAMESSAGE.fields_by_name['makai_trigger'].message_type = _MAKAITRIGGER
-_MAUKAMESSAGE.fields_by_name['laha'].message_type = _LAHA
-_MAUKAMESSAGE.fields_by_name['trigger_request'].message_type = _TRIGGERREQUEST
-_MAUKAMESSAGE.fields_by_name['triggered_event'].message_type = _TRIGGEREDEVENT
-_MAUKAMESSAGE.fields_by_name['threshold_optimization_request'].message_type = _THRESHOLDOPTIMIZATIONREQUEST
-_MAUKAMESSAGE.fields_by_name['box_optimization_request'].message_type = _BOXOPTIMIZATIONREQUEST
-_MAUKAMESSAGE.fields_by_name['box_measurement_rate_request'].message_type = _BOXMEASUREMENTRATEREQUEST
-_MAUKAMESSAGE.fields_by_name['box_measurement_rate_response'].message_type = _BOXMEASUREMENTRATERESPONSE
-_MAUKAMESSAGE.fields_by_name['incident_id_req'].message_type = _INCIDENTIDREQ
-_MAUKAMESSAGE.fields_by_name['incident_id_resp'].message_type = _INCIDENTIDRESP
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['payload'])
-_MAUKAMESSAGE.fields_by_name['payload'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['heartbeat'])
-_MAUKAMESSAGE.fields_by_name['heartbeat'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['makai_event'])
-_MAUKAMESSAGE.fields_by_name['makai_event'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['measurement'])
-_MAUKAMESSAGE.fields_by_name['measurement'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['makai_trigger'])
-_MAUKAMESSAGE.fields_by_name['makai_trigger'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['laha'])
-_MAUKAMESSAGE.fields_by_name['laha'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['trigger_request'])
-_MAUKAMESSAGE.fields_by_name['trigger_request'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['triggered_event'])
-_MAUKAMESSAGE.fields_by_name['triggered_event'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['threshold_optimization_request'])
-_MAUKAMESSAGE.fields_by_name['threshold_optimization_request'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['box_optimization_request'])
-_MAUKAMESSAGE.fields_by_name['box_optimization_request'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['box_measurement_rate_request'])
-_MAUKAMESSAGE.fields_by_name['box_measurement_rate_request'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['box_measurement_rate_response'])
-_MAUKAMESSAGE.fields_by_name['box_measurement_rate_response'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['incident_id_req'])
-_MAUKAMESSAGE.fields_by_name['incident_id_req'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_MAUKAMESSAGE.oneofs_by_name['message'].fields.append(
-  _MAUKAMESSAGE.fields_by_name['incident_id_resp'])
-_MAUKAMESSAGE.fields_by_name['incident_id_resp'].containing_oneof = _MAUKAMESSAGE.oneofs_by_name['message']
-_PAYLOAD.fields_by_name['payload_type'].enum_type = _PAYLOADTYPE
-_LAHA.fields_by_name['ttl'].message_type = _TTL
-_LAHA.fields_by_name['gc_trigger'].message_type = _GCTRIGGER
-_LAHA.fields_by_name['gc_update'].message_type = _GCUPDATE
-_LAHA.fields_by_name['gc_stat'].message_type = _GCSTAT
-_LAHA.oneofs_by_name['laha_type'].fields.append(
-  _LAHA.fields_by_name['ttl'])
-_LAHA.fields_by_name['ttl'].containing_oneof = _LAHA.oneofs_by_name['laha_type']
-_LAHA.oneofs_by_name['laha_type'].fields.append(
-  _LAHA.fields_by_name['gc_trigger'])
-_LAHA.fields_by_name['gc_trigger'].containing_oneof = _LAHA.oneofs_by_name['laha_type']
-_LAHA.oneofs_by_name['laha_type'].fields.append(
-  _LAHA.fields_by_name['gc_update'])
-_LAHA.fields_by_name['gc_update'].containing_oneof = _LAHA.oneofs_by_name['laha_type']
-_LAHA.oneofs_by_name['laha_type'].fields.append(
-  _LAHA.fields_by_name['gc_stat'])
-_LAHA.fields_by_name['gc_stat'].containing_oneof = _LAHA.oneofs_by_name['laha_type']
-_GCTRIGGER.fields_by_name['gc_domains'].enum_type = _GCDOMAIN
-_GCUPDATE.fields_by_name['from_domain'].enum_type = _GCDOMAIN
-_GCSTAT.fields_by_name['gc_domain'].enum_type = _GCDOMAIN
-DESCRIPTOR.message_types_by_name['MaukaMessage'] = _MAUKAMESSAGE
-DESCRIPTOR.message_types_by_name['Payload'] = _PAYLOAD
-DESCRIPTOR.message_types_by_name['Heartbeat'] = _HEARTBEAT
-DESCRIPTOR.message_types_by_name['MakaiEvent'] = _MAKAIEVENT
-DESCRIPTOR.message_types_by_name['TriggeredEvent'] = _TRIGGEREDEVENT
-DESCRIPTOR.message_types_by_name['Measurement'] = _MEASUREMENT
-DESCRIPTOR.message_types_by_name['MakaiTrigger'] = _MAKAITRIGGER
-DESCRIPTOR.message_types_by_name['Laha'] = _LAHA
-DESCRIPTOR.message_types_by_name['Ttl'] = _TTL
-DESCRIPTOR.message_types_by_name['GcTrigger'] = _GCTRIGGER
-DESCRIPTOR.message_types_by_name['GcUpdate'] = _GCUPDATE
-DESCRIPTOR.message_types_by_name['GcStat'] = _GCSTAT
-DESCRIPTOR.message_types_by_name['TriggerRequest'] = _TRIGGERREQUEST
-DESCRIPTOR.message_types_by_name['ThresholdOptimizationRequest'] = _THRESHOLDOPTIMIZATIONREQUEST
-DESCRIPTOR.message_types_by_name['BoxOptimizationRequest'] = _BOXOPTIMIZATIONREQUEST
-DESCRIPTOR.message_types_by_name['BoxMeasurementRateRequest'] = _BOXMEASUREMENTRATEREQUEST
-DESCRIPTOR.message_types_by_name['BoxMeasurementRateResponse'] = _BOXMEASUREMENTRATERESPONSE
-DESCRIPTOR.message_types_by_name['IncidentIdReq'] = _INCIDENTIDREQ
-DESCRIPTOR.message_types_by_name['IncidentIdResp'] = _INCIDENTIDRESP
-DESCRIPTOR.enum_types_by_name['PayloadType'] = _PAYLOADTYPE
-DESCRIPTOR.enum_types_by_name['GcDomain'] = _GCDOMAIN
-_sym_db.RegisterFileDescriptor(DESCRIPTOR)
-
-MaukaMessage = _reflection.GeneratedProtocolMessageType('MaukaMessage', (_message.Message,), dict(
-  DESCRIPTOR = _MAUKAMESSAGE,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:MaukaMessage)
-  ))
-_sym_db.RegisterMessage(MaukaMessage)
-
-Payload = _reflection.GeneratedProtocolMessageType('Payload', (_message.Message,), dict(
-  DESCRIPTOR = _PAYLOAD,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:Payload)
-  ))
-_sym_db.RegisterMessage(Payload)
-
-Heartbeat = _reflection.GeneratedProtocolMessageType('Heartbeat', (_message.Message,), dict(
-  DESCRIPTOR = _HEARTBEAT,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:Heartbeat)
-  ))
-_sym_db.RegisterMessage(Heartbeat)
-
-MakaiEvent = _reflection.GeneratedProtocolMessageType('MakaiEvent', (_message.Message,), dict(
-  DESCRIPTOR = _MAKAIEVENT,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:MakaiEvent)
-  ))
-_sym_db.RegisterMessage(MakaiEvent)
-
-TriggeredEvent = _reflection.GeneratedProtocolMessageType('TriggeredEvent', (_message.Message,), dict(
-  DESCRIPTOR = _TRIGGEREDEVENT,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:TriggeredEvent)
-  ))
-_sym_db.RegisterMessage(TriggeredEvent)
-
-Measurement = _reflection.GeneratedProtocolMessageType('Measurement', (_message.Message,), dict(
-  DESCRIPTOR = _MEASUREMENT,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:Measurement)
-  ))
-_sym_db.RegisterMessage(Measurement)
-
-MakaiTrigger = _reflection.GeneratedProtocolMessageType('MakaiTrigger', (_message.Message,), dict(
-  DESCRIPTOR = _MAKAITRIGGER,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:MakaiTrigger)
-  ))
-_sym_db.RegisterMessage(MakaiTrigger)
-
-Laha = _reflection.GeneratedProtocolMessageType('Laha', (_message.Message,), dict(
-  DESCRIPTOR = _LAHA,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:Laha)
-  ))
-_sym_db.RegisterMessage(Laha)
-
-Ttl = _reflection.GeneratedProtocolMessageType('Ttl', (_message.Message,), dict(
-  DESCRIPTOR = _TTL,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:Ttl)
-  ))
-_sym_db.RegisterMessage(Ttl)
-
-GcTrigger = _reflection.GeneratedProtocolMessageType('GcTrigger', (_message.Message,), dict(
-  DESCRIPTOR = _GCTRIGGER,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:GcTrigger)
-  ))
-_sym_db.RegisterMessage(GcTrigger)
-
-GcUpdate = _reflection.GeneratedProtocolMessageType('GcUpdate', (_message.Message,), dict(
-  DESCRIPTOR = _GCUPDATE,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:GcUpdate)
-  ))
-_sym_db.RegisterMessage(GcUpdate)
-
-GcStat = _reflection.GeneratedProtocolMessageType('GcStat', (_message.Message,), dict(
-  DESCRIPTOR = _GCSTAT,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:GcStat)
-  ))
-_sym_db.RegisterMessage(GcStat)
-
-TriggerRequest = _reflection.GeneratedProtocolMessageType('TriggerRequest', (_message.Message,), dict(
-  DESCRIPTOR = _TRIGGERREQUEST,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:TriggerRequest)
-  ))
-_sym_db.RegisterMessage(TriggerRequest)
-
-ThresholdOptimizationRequest = _reflection.GeneratedProtocolMessageType('ThresholdOptimizationRequest', (_message.Message,), dict(
-  DESCRIPTOR = _THRESHOLDOPTIMIZATIONREQUEST,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:ThresholdOptimizationRequest)
-  ))
-_sym_db.RegisterMessage(ThresholdOptimizationRequest)
-
-BoxOptimizationRequest = _reflection.GeneratedProtocolMessageType('BoxOptimizationRequest', (_message.Message,), dict(
-  DESCRIPTOR = _BOXOPTIMIZATIONREQUEST,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:BoxOptimizationRequest)
-  ))
-_sym_db.RegisterMessage(BoxOptimizationRequest)
-
-BoxMeasurementRateRequest = _reflection.GeneratedProtocolMessageType('BoxMeasurementRateRequest', (_message.Message,), dict(
-  DESCRIPTOR = _BOXMEASUREMENTRATEREQUEST,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:BoxMeasurementRateRequest)
-  ))
-_sym_db.RegisterMessage(BoxMeasurementRateRequest)
-
-BoxMeasurementRateResponse = _reflection.GeneratedProtocolMessageType('BoxMeasurementRateResponse', (_message.Message,), dict(
-  DESCRIPTOR = _BOXMEASUREMENTRATERESPONSE,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:BoxMeasurementRateResponse)
-  ))
-_sym_db.RegisterMessage(BoxMeasurementRateResponse)
-
-IncidentIdReq = _reflection.GeneratedProtocolMessageType('IncidentIdReq', (_message.Message,), dict(
-  DESCRIPTOR = _INCIDENTIDREQ,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:IncidentIdReq)
-  ))
-_sym_db.RegisterMessage(IncidentIdReq)
-
-IncidentIdResp = _reflection.GeneratedProtocolMessageType('IncidentIdResp', (_message.Message,), dict(
-  DESCRIPTOR = _INCIDENTIDRESP,
-  __module__ = 'mauka_pb2'
-  # @@protoc_insertion_point(class_scope:IncidentIdResp)
-  ))
-_sym_db.RegisterMessage(IncidentIdResp)
-
-
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0bmauka.proto\"\xc5\x05\n\x0cMaukaMessage\x12\x14\n\x0ctimestamp_ms\x18\x01 \x01(\x04\x12\x0e\n\x06source\x18\x02 \x01(\t\x12\x1b\n\x07payload\x18\x03 \x01(\x0b\x32\x08.PayloadH\x00\x12\x1f\n\theartbeat\x18\x04 \x01(\x0b\x32\n.HeartbeatH\x00\x12\"\n\x0bmakai_event\x18\x05 \x01(\x0b\x32\x0b.MakaiEventH\x00\x12#\n\x0bmeasurement\x18\x06 \x01(\x0b\x32\x0c.MeasurementH\x00\x12&\n\rmakai_trigger\x18\x07 \x01(\x0b\x32\r.MakaiTriggerH\x00\x12\x15\n\x04laha\x18\x08 \x01(\x0b\x32\x05.LahaH\x00\x12*\n\x0ftrigger_request\x18\t \x01(\x0b\x32\x0f.TriggerRequestH\x00\x12*\n\x0ftriggered_event\x18\n \x01(\x0b\x32\x0f.TriggeredEventH\x00\x12G\n\x1ethreshold_optimization_request\x18\x0b \x01(\x0b\x32\x1d.ThresholdOptimizationRequestH\x00\x12;\n\x18\x62ox_optimization_request\x18\x0c \x01(\x0b\x32\x17.BoxOptimizationRequestH\x00\x12\x42\n\x1c\x62ox_measurement_rate_request\x18\r \x01(\x0b\x32\x1a.BoxMeasurementRateRequestH\x00\x12\x44\n\x1d\x62ox_measurement_rate_response\x18\x0e \x01(\x0b\x32\x1b.BoxMeasurementRateResponseH\x00\x12)\n\x0fincident_id_req\x18\x0f \x01(\x0b\x32\x0e.IncidentIdReqH\x00\x12+\n\x10incident_id_resp\x18\x10 \x01(\x0b\x32\x0f.IncidentIdRespH\x00\x42\t\n\x07message\"\x81\x02\n\x07Payload\x12\x10\n\x08\x65vent_id\x18\x01 \x01(\r\x12\x0e\n\x06\x62ox_id\x18\x02 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x03 \x03(\x01\x12\"\n\x0cpayload_type\x18\x04 \x01(\x0e\x32\x0c.PayloadType\x12\x1a\n\x12start_timestamp_ms\x18\x05 \x01(\x04\x12\x18\n\x10\x65nd_timestamp_ms\x18\x06 \x01(\x04\x12\x13\n\x0bpacked_data\x18\x07 \x01(\x0c\x12\x14\n\x0cpacked_dtype\x18\x08 \x01(\t\x12\x10\n\x08shm_name\x18\t \x01(\t\x12\x12\n\nshm_nbytes\x18\n \x01(\x04\x12\x1b\n\x08segments\x18\x0b \x01(\x0b\x32\t.Segments\"8\n\x08Segments\x12\x0c\n\x04\x65nds\x18\x01 \x03(\r\x12\x0f\n\x07lengths\x18\x02 \x03(\r\x12\r\n\x05means\x18\x03 \x03(\x01\"\x86\x01\n\tHeartbeat\x12\"\n\x1alast_received_timestamp_ms\x18\x01 \x01(\x04\x12\x18\n\x10on_message_count\x18\x02 \x01(\r\x12\x0e\n\x06status\x18\x03 \x01(\t\x12\x14\n\x0cplugin_state\x18\x04 \x01(\t\x12\x15\n\rworker_states\x18\x05 \x03(\t\"\x1e\n\nMakaiEvent\x12\x10\n\x08\x65vent_id\x18\x01 \x01(\r\"y\n\x0eTriggeredEvent\x12\x0c\n\x04\x64\x61ta\x18\x01 \x03(\x05\x12\x13\n\x0bincident_id\x18\x02 \x01(\x05\x12\x0e\n\x06\x62ox_id\x18\x03 \x01(\t\x12\x1a\n\x12start_timestamp_ms\x18\x04 \x01(\x03\x12\x18\n\x10\x65nd_timestamp_ms\x18\x05 \x01(\x03\"h\n\x0bMeasurement\x12\x0e\n\x06\x62ox_id\x18\x01 \x01(\t\x12\x14\n\x0ctimestamp_ms\x18\x02 \x01(\x04\x12\x11\n\tfrequency\x18\x03 \x01(\x01\x12\x13\n\x0bvoltage_rms\x18\x04 \x01(\x01\x12\x0b\n\x03thd\x18\x05 \x01(\x01\"\x87\x01\n\x0cMakaiTrigger\x12 \n\x18\x65vent_start_timestamp_ms\x18\x01 \x01(\x04\x12\x1e\n\x16\x65vent_end_timestamp_ms\x18\x02 \x01(\x04\x12\x12\n\nevent_type\x18\x03 \x01(\t\x12\x11\n\tmax_value\x18\x04 \x01(\x01\x12\x0e\n\x06\x62ox_id\x18\x05 \x01(\t\"\x86\x01\n\x04Laha\x12\x13\n\x03ttl\x18\x01 \x01(\x0b\x32\x04.TtlH\x00\x12 \n\ngc_trigger\x18\x02 \x01(\x0b\x32\n.GcTriggerH\x00\x12\x1e\n\tgc_update\x18\x03 \x01(\x0b\x32\t.GcUpdateH\x00\x12\x1a\n\x07gc_stat\x18\x04 \x01(\x0b\x32\x07.GcStatH\x00\x42\x0b\n\tlaha_type\"(\n\x03Ttl\x12\x12\n\ncollection\x18\x01 \x01(\t\x12\r\n\x05ttl_s\x18\x02 \x01(\r\"*\n\tGcTrigger\x12\x1d\n\ngc_domains\x18\x01 \x03(\x0e\x32\t.GcDomain\"6\n\x08GcUpdate\x12\x1e\n\x0b\x66rom_domain\x18\x01 \x01(\x0e\x32\t.GcDomain\x12\n\n\x02id\x18\x02 \x01(\r\"t\n\x06GcStat\x12\x1c\n\tgc_domain\x18\x01 \x01(\x0e\x32\t.GcDomain\x12\x0e\n\x06gc_cnt\x18\x02 \x01(\x04\x12\x16\n\x0egc_duration_ms\x18\x03 \x01(\x01\x12\x12\n\ngc_backlog\x18\x04 \x01(\x04\x12\x10\n\x08gc_bytes\x18\x05 \x01(\x04\"l\n\x0eTriggerRequest\x12\x1a\n\x12start_timestamp_ms\x18\x01 \x01(\x04\x12\x18\n\x10\x65nd_timestamp_ms\x18\x02 \x01(\x04\x12\x0f\n\x07\x62ox_ids\x18\x03 \x03(\t\x12\x13\n\x0bincident_id\x18\x04 \x01(\x04\"\xf6\x03\n\x1cThresholdOptimizationRequest\x12\x15\n\rdefault_ref_f\x18\x01 \x01(\x01\x12\x15\n\rdefault_ref_v\x18\x02 \x01(\x01\x12\'\n\x1f\x64\x65\x66\x61ult_threshold_percent_f_low\x18\x03 \x01(\x01\x12(\n default_threshold_percent_f_high\x18\x04 \x01(\x01\x12\'\n\x1f\x64\x65\x66\x61ult_threshold_percent_v_low\x18\x05 \x01(\x01\x12(\n default_threshold_percent_v_high\x18\x06 \x01(\x01\x12*\n\"default_threshold_percent_thd_high\x18\x07 \x01(\x01\x12\x0e\n\x06\x62ox_id\x18\x08 \x01(\t\x12\r\n\x05ref_f\x18\t \x01(\x01\x12\r\n\x05ref_v\x18\n \x01(\x01\x12\x1f\n\x17threshold_percent_f_low\x18\x0b \x01(\x01\x12 \n\x18threshold_percent_f_high\x18\x0c \x01(\x01\x12\x1f\n\x17threshold_percent_v_low\x18\r \x01(\x01\x12 \n\x18threshold_percent_v_high\x18\x0e \x01(\x01\x12\"\n\x1athreshold_percent_thd_high\x18\x0f \x01(\x01\"L\n\x16\x42oxOptimizationRequest\x12\x0f\n\x07\x62ox_ids\x18\x01 \x03(\t\x12!\n\x19measurement_window_cycles\x18\x02 \x01(\r\",\n\x19\x42oxMeasurementRateRequest\x12\x0f\n\x07\x62ox_ids\x18\x01 \x03(\t\"F\n\x1a\x42oxMeasurementRateResponse\x12\x0e\n\x06\x62ox_id\x18\x01 \x01(\t\x12\x18\n\x10measurement_rate\x18\x02 \x01(\r\".\n\rIncidentIdReq\x12\x0e\n\x06req_id\x18\x01 \x01(\r\x12\r\n\x05\x63ount\x18\x02 \x01(\r\"E\n\x0eIncidentIdResp\x12\x0f\n\x07resp_id\x18\x01 \x01(\r\x12\x13\n\x0bincident_id\x18\x02 \x01(\r\x12\r\n\x05\x63ount\x18\x03 \x01(\r*r\n\x0bPayloadType\x12\x0f\n\x0b\x41\x44\x43_SAMPLES\x10\x00\x12\x0f\n\x0bVOLTAGE_RAW\x10\x01\x12\x0f\n\x0bVOLTAGE_RMS\x10\x02\x12\x18\n\x14VOLTAGE_RMS_WINDOWED\x10\x03\x12\x16\n\x12\x46REQUENCY_WINDOWED\x10\x04*_\n\x08GcDomain\x12\x10\n\x0cMEASUREMENTS\x10\x00\x12\n\n\x06TRENDS\x10\x01\x12\n\n\x06\x45VENTS\x10\x02\x12\r\n\tINCIDENTS\x10\x03\x12\r\n\tPHENOMENA\x10\x04\x12\x0b\n\x07SAMPLES\x10\x05\x62\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'mauka_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _PAYLOADTYPE._serialized_start=2908
+  _PAYLOADTYPE._serialized_end=3022
+  _GCDOMAIN._serialized_start=3024
+  _GCDOMAIN._serialized_end=3119
+  _MAUKAMESSAGE._serialized_start=16
+  _MAUKAMESSAGE._serialized_end=725
+  _PAYLOAD._serialized_start=728
+  _PAYLOAD._serialized_end=985
+  _SEGMENTS._serialized_start=987
+  _SEGMENTS._serialized_end=1043
+  _HEARTBEAT._serialized_start=1046
+  _HEARTBEAT._serialized_end=1180
+  _MAKAIEVENT._serialized_start=1182
+  _MAKAIEVENT._serialized_end=1212
+  _TRIGGEREDEVENT._serialized_start=1214
+  _TRIGGEREDEVENT._serialized_end=1335
+  _MEASUREMENT._serialized_start=1337
+  _MEASUREMENT._serialized_end=1441
+  _MAKAITRIGGER._serialized_start=1444
+  _MAKAITRIGGER._serialized_end=1579
+  _LAHA._serialized_start=1582
+  _LAHA._serialized_end=1716
+  _TTL._serialized_start=1718
+  _TTL._serialized_end=1758
+  _GCTRIGGER._serialized_start=1760
+  _GCTRIGGER._serialized_end=1802
+  _GCUPDATE._serialized_start=1804
+  _GCUPDATE._serialized_end=1858
+  _GCSTAT._serialized_start=1860
+  _GCSTAT._serialized_end=1976
+  _TRIGGERREQUEST._serialized_start=1978
+  _TRIGGERREQUEST._serialized_end=2086
+  _THRESHOLDOPTIMIZATIONREQUEST._serialized_start=2089
+  _THRESHOLDOPTIMIZATIONREQUEST._serialized_end=2591
+  _BOXOPTIMIZATIONREQUEST._serialized_start=2593
+  _BOXOPTIMIZATIONREQUEST._serialized_end=2669
+  _BOXMEASUREMENTRATEREQUEST._serialized_start=2671
+  _BOXMEASUREMENTRATEREQUEST._serialized_end=2715
+  _BOXMEASUREMENTRATERESPONSE._serialized_start=2717
+  _BOXMEASUREMENTRATERESPONSE._serialized_end=2787
+  _INCIDENTIDREQ._serialized_start=2789
+  _INCIDENTIDREQ._serialized_end=2835
+  _INCIDENTIDRESP._serialized_start=2837
+  _INCIDENTIDRESP._serialized_end=2906
 # @@protoc_insertion_point(module_scope)
@@ -11,6 +11,7 @@ import numpy
 import log
 import protobuf.mauka_pb2 as mauka_pb2
 import protobuf.opqbox3_pb2 as opqbox3_pb2
+import shared_payloads
 
 LAHA = "laha"
 LAHA_TYPE = "laha_type"
@@ -38,6 +39,9 @@ BOX_MEASUREMENT_RATE_RESPONSE = "box_measurement_rate_response"
 INCIDENT_ID_REQ = "incident_id_req"
 INCIDENT_ID_RESP = "incident_id_resp"
 
+PACKED_DTYPE = numpy.dtype("<f8")
+"""The dtype numpy payloads are packed as"""
+
 # pylint: disable=C0103
 logger = log.get_logger(__name__)
 
@@ -78,7 +82,7 @@ def build_payload(source: str,
     :param event_id: Event_id this payload is associated with
     :param box_id: Box id this payload is associated with
     :param payload_type: The type of payload that this represents (see PayloadType of mauka.proto)
-    :param data: Payload data cast to float64's
+    :param data: Payload data cast to float64's. Numpy arrays are packed as bytes, lists use the repeated data field.
     :param start_timestamp_ms: Start timestamp of this payload
     :param end_timestamp_ms: End timestamp of this payload
     :return: Instance of MaukaMessage Payload
@@ -87,21 +91,58 @@ def build_payload(source: str,
     mauka_message.payload.event_id = event_id
     mauka_message.payload.box_id = box_id
     mauka_message.payload.payload_type = payload_type
-    mauka_message.payload.data.extend(data)
+    if isinstance(data, numpy.ndarray):
+        packed = numpy.ascontiguousarray(data, dtype=PACKED_DTYPE)
+        mauka_message.payload.packed_data = packed.tobytes()
+        mauka_message.payload.packed_dtype = packed.dtype.str
+    else:
+        mauka_message.payload.data.extend(data)
     mauka_message.payload.start_timestamp_ms = start_timestamp_ms
     mauka_message.payload.end_timestamp_ms = end_timestamp_ms
     return mauka_message
 
 
+def add_segments(mauka_message: mauka_pb2.MaukaMessage,
+                 lengths: typing.Union[numpy.ndarray, typing.List[int]],
+                 means: typing.Union[numpy.ndarray, typing.List[float]]) -> mauka_pb2.MaukaMessage:
+    """
+    Attaches the segmentation of a payload's data to the payload.
+    :param mauka_message: A payload message.
+    :param lengths: The number of elements in every segment.
+    :param means: The mean of every segment.
+    :return: The same message.
+    """
+    lengths = numpy.asarray(lengths, dtype=numpy.int64)
+    segments = mauka_message.payload.segments
+    segments.SetInParent()
+    segments.ends.extend(numpy.cumsum(lengths).tolist())
+    segments.lengths.extend(lengths.tolist())
+    segments.means.extend(numpy.asarray(means, dtype=numpy.float64).tolist())
+    return mauka_message
+
+
+def payload_segments(payload: mauka_pb2.Payload) -> typing.Optional[typing.Tuple[numpy.ndarray, numpy.ndarray]]:
+    """
+    Returns the segmentation attached to a payload.
+    :param payload: The payload.
+    :return: A tuple of segment lengths and segment means, or None if the payload was not segmented upstream.
+    """
+    if not payload.HasField("segments"):
+        return None
+    return numpy.array(payload.segments.lengths, dtype=numpy.int64), numpy.array(payload.segments.means)
+
+
 # pylint: disable=E1101
 def build_heartbeat(source: str,
                     last_received_timestamp_ms: int,
                     on_message_count: int,
                     status: str,
-                    plugin_state: str) -> mauka_pb2.MaukaMessage:
+                    plugin_state: str,
+                    worker_states: typing.Optional[typing.List[str]] = None) -> mauka_pb2.MaukaMessage:
     """
     Instance of Heartbeat protobuf message
     :param plugin_state: The state of the plugin either as a string either IDLE or BUSY
+    :param worker_states: The state of each of the plugin's dispatch workers either IDLE or BUSY
     :param source: Where this message is created from (plugin name or service name)
     :param last_received_timestamp_ms: Last time a plugin received a on_message
     :param on_message_count: Number of times a plugin's on_message has been fired
@@ -113,6 +154,8 @@ def build_heartbeat(source: str,
     mauka_message.heartbeat.on_message_count = on_message_count
     mauka_message.heartbeat.status = status
     mauka_message.heartbeat.plugin_state = plugin_state
+    if worker_states:
+        mauka_message.heartbeat.worker_states.extend(worker_states)
 
     return mauka_message
 
@@ -229,17 +272,26 @@ def build_gc_update(source: str,
 
 def build_gc_stat(source: str,
                   gc_domain: mauka_pb2.GcDomain,
-                  gc_cnt: int) -> mauka_pb2.MaukaMessage:
+                  gc_cnt: int,
+                  gc_duration_ms: float = 0.0,
+                  gc_backlog: int = 0,
+                  gc_bytes: int = 0) -> mauka_pb2.MaukaMessage:
     """
     Builds a GcStat message.
     :param source: Where this message was created.
     :param gc_domain: The GC domain items were GC from.
     :param gc_cnt: The count of items GCed.
+    :param gc_duration_ms: The time spent GCing the items in milliseconds.
+    :param gc_backlog: The count of expired items that are left to GC.
+    :param gc_bytes: The number of bytes of gridfs data that were GCed along with the items.
     :return: GcStat message.
     """
     mauka_message = build_mauka_message(source)
     mauka_message.laha.gc_stat.gc_domain = gc_domain
     mauka_message.laha.gc_stat.gc_cnt = gc_cnt
+    mauka_message.laha.gc_stat.gc_duration_ms = gc_duration_ms
+    mauka_message.laha.gc_stat.gc_backlog = gc_backlog
+    mauka_message.laha.gc_stat.gc_bytes = gc_bytes
     return mauka_message
 
 
@@ -464,29 +516,33 @@ def build_box_measurement_rate_response(source: str, box_id: str, measurement_ra
     return mauka_message
 
 
-def build_incident_id_req(source: str, req_id: int) -> mauka_pb2.MaukaMessage:
+def build_incident_id_req(source: str, req_id: int, count: int = 1) -> mauka_pb2.MaukaMessage:
     """
     Builds an incident id request.
     :param source: The source.
     :param req_id: The request id.
+    :param count: The number of consecutive incident ids to lease.
     :return: An incident id request.
     """
     mauka_message = build_mauka_message(source)
     mauka_message.incident_id_req.req_id = req_id
+    mauka_message.incident_id_req.count = count
     return mauka_message
 
 
-def build_incident_id_resp(source: str, resp_id: int, incident_id: int) -> mauka_pb2.MaukaMessage:
+def build_incident_id_resp(source: str, resp_id: int, incident_id: int, count: int = 1) -> mauka_pb2.MaukaMessage:
     """
     Builds an incident id response.
     :param source: The source.
     :param resp_id: The response id.
-    :param incident_id: The incident id.
+    :param incident_id: The first incident id of the leased block.
+    :param count: The number of consecutive incident ids leased.
     :return: An incident id response.
     """
     mauka_message = build_mauka_message(source)
     mauka_message.incident_id_resp.resp_id = resp_id
     mauka_message.incident_id_resp.incident_id = incident_id
+    mauka_message.incident_id_resp.count = count
     return mauka_message
 
 
@@ -755,8 +811,16 @@ def is_incident_id_resp(mauka_message: mauka_pb2.MaukaMessage) -> bool:
 
 def repeated_as_ndarray(repeated) -> numpy.ndarray:
     """
-    Converts a protobuf repeated field to a numpy array.
-    :param repeated: Protobuf repeated field
+    Converts a protobuf repeated field or the data of a Payload to a numpy array. Payloads with packed data, either
+    inline or in shared memory, are read without copying and are read-only.
+    :param repeated: Protobuf repeated field or Payload
     :return: Numpy array
     """
+    if isinstance(repeated, mauka_pb2.Payload):
+        if repeated.shm_name:
+            return shared_payloads.read_payload(repeated)
+        if repeated.packed_dtype:
+            return numpy.frombuffer(repeated.packed_data, dtype=numpy.dtype(repeated.packed_dtype))
+        return numpy.array(repeated.data)
+
     return numpy.array(repeated)
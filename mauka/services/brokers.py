@@ -129,7 +129,9 @@ def start_incident_id_service(mauka_config: config.MaukaConfig):
                                             int(conf.get("mongo.port")),
                                             conf.get("mongo.db"))
         next_available_incident_id = mongo.next_available_incident_id(mongo_client)
-        incident_id_service = services.incident_id_provider.IncidentIdProvider(next_available_incident_id)
+        incident_id_service = services.incident_id_provider.IncidentIdProvider(
+            next_available_incident_id,
+            lambda high_water_mark: mongo.store_incident_id_high_water_mark(high_water_mark, mongo_client))
 
         zmq_context: zmq.Context = zmq.Context()
         zmq_req_socket: zmq.Socket = zmq_context.socket(zmq.REP)
@@ -137,14 +139,26 @@ def start_incident_id_service(mauka_config: config.MaukaConfig):
 
         while True:
             req: bytes = zmq_req_socket.recv()
-            mauka_message: protobuf.pb_util.mauka_pb2.MaukaMessage = protobuf.pb_util.deserialize_mauka_message(req)
-            if protobuf.pb_util.is_incident_id_req(mauka_message):
-                resp = protobuf.pb_util.build_incident_id_resp("incident_id_service",
-                                                               mauka_message.incident_id_req.req_id,
-                                                               incident_id_service.get_and_inc())
-                zmq_req_socket.send(protobuf.pb_util.serialize_message(resp))
-            else:
-                _logger.error("Did not receive valid IncidentIdReq")
+            # A REP socket must reply to every request before it can receive the next one, so requests that can not be
+            # served are answered with a message that is not an incident id response
+            resp = protobuf.pb_util.build_mauka_message("incident_id_service")
+            try:
+                mauka_message: protobuf.pb_util.mauka_pb2.MaukaMessage = protobuf.pb_util.deserialize_mauka_message(
+                    req)
+                if protobuf.pb_util.is_incident_id_req(mauka_message):
+                    # Requests from clients that do not lease blocks leave count unset (0)
+                    count = max(1, mauka_message.incident_id_req.count)
+                    resp = protobuf.pb_util.build_incident_id_resp("incident_id_service",
+                                                                   mauka_message.incident_id_req.req_id,
+                                                                   incident_id_service.get_and_inc(count),
+                                                                   count)
+                else:
+                    _logger.error("Did not receive valid IncidentIdReq")
+            # pylint: disable=W0703
+            except Exception as exception:
+                _logger.error("Error leasing incident ids: %s", str(exception))
+
+            zmq_req_socket.send(protobuf.pb_util.serialize_message(resp))
 
     process = multiprocessing.Process(target=_run, args=(mauka_config,))
     process.start()
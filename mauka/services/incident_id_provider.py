@@ -3,22 +3,37 @@ This module provides a thread-safe incident id provider.
 """
 
 import multiprocessing
+import typing
 
 
 class IncidentIdProvider:
     """
     A thread-safe incident id provider.
+
+    Incident ids can be leased one at a time or in blocks. When a persist function is provided, the high-water mark
+    (the first id that has never been leased) is persisted before a lease is returned so that leased but unused ids
+    are never handed out again after a restart.
     """
-    def __init__(self, next_available_incident_id: int):
+    def __init__(self,
+                 next_available_incident_id: int,
+                 persist_high_water_mark: typing.Optional[typing.Callable[[int], None]] = None):
         self.__next_available_incident_id = next_available_incident_id
+        self.__persist_high_water_mark = persist_high_water_mark
         self.__lock = multiprocessing.RLock()
 
-    def get_and_inc(self) -> int:
+    def get_and_inc(self, count: int = 1) -> int:
         """
-        Atomically gets the next available incident id and then increments it.
-        :return: The next available incident id.
+        Atomically leases a block of consecutive incident ids and then increments past the block.
+        :param count: The number of incident ids to lease.
+        :return: The first incident id of the leased block.
         """
+        if count < 1:
+            raise ValueError("count must be >= 1, got %d" % count)
+
         with self.__lock:
             next_available_incident_id = self.__next_available_incident_id
-            self.__next_available_incident_id += 1
+            high_water_mark = next_available_incident_id + count
+            if self.__persist_high_water_mark is not None:
+                self.__persist_high_water_mark(high_water_mark)
+            self.__next_available_incident_id = high_water_mark
             return next_available_incident_id
@@ -0,0 +1,158 @@
+"""
+This module provides zero-copy handoff of large payloads between Mauka processes on the same host using shared memory.
+
+A producer moves the packed data of a payload into a shared memory segment and publishes only the segment name.
+Subscribers map the segment and read the samples in place. Segments are leased: the producer unlinks a segment once its
+lease expires, while subscribers that still have the segment mapped can continue to read it.
+"""
+
+import collections
+import mmap
+import multiprocessing.shared_memory
+import os
+import threading
+import time
+import typing
+import uuid
+
+import numpy
+
+import log
+import protobuf.mauka_pb2
+
+# pylint: disable=C0103
+logger = log.get_logger(__name__)
+
+SEGMENT_PREFIX = "mauka_payload_"
+SHM_DIR = "/dev/shm"
+
+
+class SharedPayloadWriter:
+    """
+    Creates shared memory segments for payloads and frees them after a lease timeout.
+    """
+
+    def __init__(self, lease_s: float, min_bytes: int = 0):
+        """
+        Initializes a SharedPayloadWriter.
+        :param lease_s: Number of seconds a segment is kept before it is unlinked.
+        :param min_bytes: Payloads with less packed data than this are sent inline.
+        """
+        self.lease_s = lease_s
+        self.min_bytes = min_bytes
+        self.segments: typing.Deque[typing.Tuple[float, multiprocessing.shared_memory.SharedMemory]] = \
+            collections.deque()
+        self.segments_shared = 0
+        self.bytes_shared = 0
+        self.lock = threading.Lock()
+
+    def share(self, data: bytes) -> str:
+        """
+        Copies data into a new shared memory segment.
+        :param data: The data to share.
+        :return: The name of the segment.
+        """
+        self.free_expired()
+        shm = multiprocessing.shared_memory.SharedMemory(name=SEGMENT_PREFIX + uuid.uuid4().hex,
+                                                         create=True,
+                                                         size=max(1, len(data)))
+        shm.buf[:len(data)] = data
+        with self.lock:
+            self.segments.append((time.time() + self.lease_s, shm))
+            self.segments_shared += 1
+            self.bytes_shared += len(data)
+        return shm.name
+
+    def share_payload(self, mauka_message: protobuf.mauka_pb2.MaukaMessage) -> protobuf.mauka_pb2.MaukaMessage:
+        """
+        Moves the packed data of a payload message into shared memory. Payloads that are not packed or are smaller than
+        min_bytes are left unchanged.
+        :param mauka_message: The payload message.
+        :return: The same message.
+        """
+        payload = mauka_message.payload
+        if not payload.packed_dtype or len(payload.packed_data) < self.min_bytes:
+            return mauka_message
+
+        payload.shm_nbytes = len(payload.packed_data)
+        payload.shm_name = self.share(payload.packed_data)
+        payload.ClearField("packed_data")
+        return mauka_message
+
+    def free_expired(self, now: typing.Optional[float] = None):
+        """
+        Unlinks every segment whose lease has expired.
+        :param now: The current time in seconds.
+        """
+        now = time.time() if now is None else now
+        expired = []
+        with self.lock:
+            while self.segments and self.segments[0][0] <= now:
+                expired.append(self.segments.popleft()[1])
+
+        for shm in expired:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """
+        Unlinks all segments regardless of their leases.
+        """
+        self.free_expired(float("inf"))
+
+
+_attached_segments: typing.Dict[str, mmap.mmap] = {}
+_attached_segments_lock = threading.Lock()
+
+
+def _attach_segment(name: str) -> mmap.mmap:
+    """
+    Maps a shared memory segment read-only.
+
+    Segments are mapped directly from the POSIX shared memory directory rather than through SharedMemory so that the
+    subscriber's resource tracker does not take ownership of (and later unlink) a segment owned by the producer.
+    :param name: The name of the segment.
+    :return: A read-only mapping of the segment.
+    """
+    fd = os.open(os.path.join(SHM_DIR, name.lstrip("/")), os.O_RDONLY)
+    try:
+        return mmap.mmap(fd, os.fstat(fd).st_size, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+
+
+def _release_unused_segments():
+    """
+    Unmaps attached segments that are no longer referenced by any array.
+    """
+    for name, segment in list(_attached_segments.items()):
+        try:
+            segment.close()
+        except BufferError:
+            # Still exported to an array that is in use
+            continue
+        del _attached_segments[name]
+
+
+def read_payload(payload: protobuf.mauka_pb2.Payload) -> numpy.ndarray:
+    """
+    Maps the packed data of a payload stored in shared memory without copying it.
+    :param payload: A payload with shm_name set.
+    :return: A read-only view of the payload data, or an empty array if the segment's lease has expired.
+    """
+    dtype = numpy.dtype(payload.packed_dtype)
+    with _attached_segments_lock:
+        _release_unused_segments()
+        segment = _attached_segments.get(payload.shm_name)
+        if segment is None:
+            try:
+                segment = _attach_segment(payload.shm_name)
+            except FileNotFoundError:
+                logger.error("Shared payload segment %s DNE, its lease has likely expired", payload.shm_name)
+                return numpy.zeros(0, dtype=dtype)
+            _attached_segments[payload.shm_name] = segment
+
+        return numpy.frombuffer(segment, dtype=dtype, count=payload.shm_nbytes // dtype.itemsize)
@@ -0,0 +1,246 @@
+import functools
+import multiprocessing
+import queue
+import threading
+import unittest
+
+import zmq
+
+import log
+import protobuf.mauka_pb2
+import protobuf.pb_util
+from plugins.base_plugin import DispatchMode, KeyedDispatcher, MaukaPlugin
+
+
+def measurement(box_id, timestamp_ms):
+    return protobuf.pb_util.build_measurement("test", box_id, timestamp_ms, 60.0, 120.0, 0.0)
+
+
+class FakePlugin:
+    name = "FakePlugin"
+
+    def __init__(self, blocked_box_id=None):
+        self.handled = []
+        self.blocked_box_id = blocked_box_id
+        self.blocking = threading.Event()
+        self.unblock = threading.Event()
+
+    def on_message(self, topic, mauka_message):
+        if mauka_message.measurement.box_id == self.blocked_box_id:
+            self.blocking.set()
+            self.unblock.wait(5.0)
+        self.handled.append((mauka_message.measurement.box_id, mauka_message.measurement.timestamp_ms))
+
+    def on_exit(self):
+        pass
+
+
+INTERPRETER = "fresh"
+
+
+class FakeProcessPlugin:
+    """Hands handled messages to a background thread started in __init__, like the write-behind buffers"""
+    name = "FakeProcessPlugin"
+
+    def __init__(self, results):
+        self.results = results
+        self.handled = queue.Queue()
+        self.flush_thread = threading.Thread(target=self.run_flush_loop, daemon=True)
+        self.flush_thread.start()
+
+    def run_flush_loop(self):
+        while True:
+            item = self.handled.get()
+            self.results.put(item)
+            if item is None:
+                break
+
+    def on_message(self, topic, mauka_message):
+        self.handled.put((multiprocessing.current_process().name,
+                          INTERPRETER,
+                          mauka_message.measurement.box_id,
+                          mauka_message.measurement.timestamp_ms))
+
+    def on_exit(self):
+        self.handled.put(None)
+        self.flush_thread.join()
+
+
+class FailingFactory:
+    def __init__(self, plugin, failures):
+        self.plugin = plugin
+        self.failures = failures
+
+    def __call__(self):
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("could not create plugin")
+        return self.plugin
+
+
+def dispatch(dispatcher, key, mauka_message):
+    dispatcher.dispatch(key, "measurement", protobuf.pb_util.serialize_message(mauka_message), mauka_message)
+
+
+class KeyedDispatcherTests(unittest.TestCase):
+    def test_thread_workers_keep_key_order(self):
+        plugin = FakePlugin()
+        dispatcher = KeyedDispatcher(lambda: plugin, 3)
+        for timestamp_ms in range(20):
+            for box_id in ["1000", "1001", "1002", "1003"]:
+                dispatch(dispatcher, box_id, measurement(box_id, timestamp_ms))
+        dispatcher.close()
+
+        self.assertEqual(len(plugin.handled), 80)
+        for box_id in ["1000", "1001", "1002", "1003"]:
+            self.assertEqual([timestamp_ms for handled_box_id, timestamp_ms in plugin.handled
+                              if handled_box_id == box_id], list(range(20)))
+        self.assertEqual(sum(dispatcher.stats()["dispatched"]), 80)
+
+    def test_thread_workers_run_keys_in_parallel(self):
+        plugin = FakePlugin(blocked_box_id="1000")
+        dispatcher = KeyedDispatcher(lambda: plugin, 2)
+        other_box_id = next(box_id for box_id in ["1001", "1002", "1003", "1004", "1005"]
+                            if dispatcher.worker_index(box_id) != dispatcher.worker_index("1000"))
+
+        dispatch(dispatcher, "1000", measurement("1000", 0))
+        self.assertTrue(plugin.blocking.wait(5.0))
+        dispatch(dispatcher, other_box_id, measurement(other_box_id, 0))
+        for _ in range(100):
+            if plugin.handled:
+                break
+            threading.Event().wait(0.01)
+
+        self.assertEqual(plugin.handled, [(other_box_id, 0)])
+        states = dispatcher.states()
+        self.assertEqual(states[dispatcher.worker_index("1000")], "BUSY")
+        self.assertEqual(states[dispatcher.worker_index(other_box_id)], "IDLE")
+
+        plugin.unblock.set()
+        dispatcher.close()
+        self.assertEqual(plugin.handled, [(other_box_id, 0), ("1000", 0)])
+        self.assertEqual(dispatcher.states(), ["IDLE", "IDLE"])
+
+    def test_process_workers_keep_key_order(self):
+        global INTERPRETER
+        results = multiprocessing.get_context("spawn").Queue()
+        # A forked worker would inherit this, a spawned worker imports the module afresh
+        INTERPRETER = "parent"
+        try:
+            dispatcher = KeyedDispatcher(functools.partial(FakeProcessPlugin, results), 2, DispatchMode.PROCESS)
+            for timestamp_ms in range(10):
+                for box_id in ["1000", "1001", "1002"]:
+                    dispatch(dispatcher, box_id, measurement(box_id, timestamp_ms))
+            dispatcher.close()
+        finally:
+            INTERPRETER = "fresh"
+
+        handled = []
+        exited = 0
+        while exited < 2:
+            result = results.get(timeout=5.0)
+            if result is None:
+                exited += 1
+            else:
+                handled.append(result)
+
+        self.assertEqual(len(handled), 30)
+        self.assertEqual({interpreter for _, interpreter, _, _ in handled}, {"fresh"})
+        for box_id in ["1000", "1001", "1002"]:
+            handled_by_box = [(process_name, timestamp_ms) for process_name, _, handled_box_id, timestamp_ms in handled
+                              if handled_box_id == box_id]
+            self.assertEqual([timestamp_ms for _, timestamp_ms in handled_by_box], list(range(10)))
+            self.assertEqual(len({process_name for process_name, _ in handled_by_box}), 1)
+
+
+    def test_thread_worker_restarted_after_factory_fails(self):
+        plugin = FakePlugin()
+        dispatcher = KeyedDispatcher(FailingFactory(plugin, 1), 1)
+        dispatcher.workers[0].join(5.0)
+        self.assertFalse(dispatcher.workers[0].is_alive())
+
+        dispatch(dispatcher, "1000", measurement("1000", 0))
+        dispatcher.close()
+        self.assertEqual(plugin.handled, [("1000", 0)])
+        self.assertEqual(dispatcher.stats()["restarts"], [1])
+
+    def test_process_worker_restarted_after_dying(self):
+        results = multiprocessing.get_context("spawn").Queue()
+        dispatcher = KeyedDispatcher(functools.partial(FakeProcessPlugin, results), 1, DispatchMode.PROCESS,
+                                     close_timeout_s=30.0)
+        # Killed before it handles a message, so that it can not die holding the lock of the results queue
+        dispatcher.workers[0].kill()
+        dispatcher.workers[0].join(5.0)
+
+        dispatch(dispatcher, "1000", measurement("1000", 0))
+        dispatcher.close()
+        self.assertEqual(results.get(timeout=5.0)[2:], ("1000", 0))
+        self.assertIsNone(results.get(timeout=5.0))
+        self.assertEqual(dispatcher.stats()["restarts"], [1])
+
+    def test_close_times_out_on_stuck_thread_worker(self):
+        plugin = FakePlugin(blocked_box_id="1000")
+        dispatcher = KeyedDispatcher(lambda: plugin, 1, close_timeout_s=0.1)
+        dispatch(dispatcher, "1000", measurement("1000", 0))
+        self.assertTrue(plugin.blocking.wait(5.0))
+        dispatcher.close()
+        self.assertTrue(dispatcher.workers[0].is_alive())
+        plugin.unblock.set()
+        dispatcher.workers[0].join(5.0)
+
+
+class DispatchKeyTests(unittest.TestCase):
+    def test_dispatch_key(self):
+        payload = protobuf.pb_util.build_payload("test", 7, "1000", protobuf.mauka_pb2.VOLTAGE_RAW, [1.0], 0, 1)
+        self.assertEqual(MaukaPlugin.dispatch_key(None, "payload", payload), (7, "1000"))
+        self.assertEqual(MaukaPlugin.dispatch_key(None, "measurement", measurement("1001", 0)), "1001")
+        self.assertIsNone(MaukaPlugin.dispatch_key(None, "heartbeat",
+                                                   protobuf.pb_util.build_heartbeat("test", 0, 0, "", "IDLE")))
+
+
+class FakeLeasePlugin:
+    name = "FakeLeasePlugin"
+    logger = log.get_logger(__name__)
+    connect_incident_id_req_socket = MaukaPlugin.connect_incident_id_req_socket
+    request_incident_id_lease = MaukaPlugin.request_incident_id_lease
+
+    def __init__(self, interface):
+        self.zmq_context = zmq.Context.instance()
+        self.config = {"zmq.incident_id_provider.req.interface": interface}
+        self.incident_id_timeout_ms = 100
+        self.zmq_incident_id_req_socket = self.connect_incident_id_req_socket()
+
+
+class IncidentIdLeaseTests(unittest.TestCase):
+    def test_lease_times_out(self):
+        plugin = FakeLeasePlugin("inproc://test-incident-id-timeout")
+        socket = plugin.zmq_incident_id_req_socket
+        self.assertIsNone(plugin.request_incident_id_lease(4))
+        self.assertTrue(socket.closed)
+        self.assertFalse(plugin.zmq_incident_id_req_socket.closed)
+        plugin.zmq_incident_id_req_socket.close()
+
+    def test_lease_fails_on_error_reply(self):
+        rep_socket = zmq.Context.instance().socket(zmq.REP)
+        rep_socket.bind("inproc://test-incident-id-error")
+        plugin = FakeLeasePlugin("inproc://test-incident-id-error")
+
+        def reply(resp_for):
+            req = protobuf.pb_util.deserialize_mauka_message(rep_socket.recv())
+            rep_socket.send(protobuf.pb_util.serialize_message(resp_for(req)))
+
+        try:
+            replier = threading.Thread(target=reply,
+                                       args=(lambda req: protobuf.pb_util.build_mauka_message("test"),))
+            replier.start()
+            self.assertIsNone(plugin.request_incident_id_lease(4))
+            replier.join()
+
+            replier = threading.Thread(target=reply, args=(lambda req: protobuf.pb_util.build_incident_id_resp(
+                "test", req.incident_id_req.req_id, 5, req.incident_id_req.count),))
+            replier.start()
+            self.assertEqual(plugin.request_incident_id_lease(4), (5, 9))
+            replier.join()
+        finally:
+            plugin.zmq_incident_id_req_socket.close()
+            rep_socket.close()
@@ -1,7 +1,9 @@
 import unittest
 
+import numpy
+
 import analysis
-from plugins.itic_plugin import IticRegion, itic_region
+from plugins.itic_plugin import IticRegion, itic_region, itic_regions
 
 
 def percent_nominal_to_rms(percent_nominal: float) -> float:
@@ -128,3 +130,17 @@ class IticPluginTests(unittest.TestCase):
         self.assertEqual(IticRegion.NO_INTERRUPTION, itic_region(percent_nominal_to_rms(90), 10_000))
         self.assertEqual(IticRegion.NO_INTERRUPTION, itic_region(percent_nominal_to_rms(90), 100_000))
         self.assertEqual(IticRegion.NO_INTERRUPTION, itic_region(percent_nominal_to_rms(90), 1_000_000))
+
+    def test_itic_regions_matches_itic_region(self):
+        percents_nominal = [0, 40, 69, 70, 79, 80, 89.9, 90, 90.01, 100, 109, 109.99, 110, 111, 112, 120, 121, 140, 200,
+                            300, 400, 500, 600, 1000, 4000, 10_000]
+        durations_ms = [0, analysis.c_to_ms(0.01), analysis.c_to_ms(.02), 0.5, .9, 1, 1.1, 2.9, 3, 3.1, 19, 20, 20.1,
+                        21, 499, 500, 500.1, 501, 9999, 10_000, 10_000.1, 15_000, 100_000, 1_000_000, 20_000_000]
+        rms_voltages = numpy.array([percent_nominal_to_rms(percent_nominal)
+                                    for percent_nominal in percents_nominal
+                                    for _ in durations_ms])
+        durations = numpy.array(durations_ms * len(percents_nominal))
+
+        expected = [itic_region(rms_voltage, duration) for rms_voltage, duration in zip(rms_voltages, durations)]
+        self.assertEqual(expected, itic_regions(rms_voltages, durations))
+        self.assertEqual([], itic_regions(numpy.array([]), numpy.array([])))
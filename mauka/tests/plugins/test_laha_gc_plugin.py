@@ -0,0 +1,288 @@
+import unittest
+
+import pymongo
+import pymongo.errors
+
+import mongo
+from plugins.laha_gc_plugin import GcUpdateCoalescer, IncrementalCollector, gc_expired_events_batch, \
+    merge_intervals
+
+
+def matches(document, query):
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$lt" in condition and not value < condition["$lt"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeDeleteResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+
+
+class FakeCursor(list):
+    def limit(self, limit):
+        return FakeCursor(self[:limit])
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.operations = 0
+
+    def find(self, query, projection=None):
+        self.operations += 1
+        return FakeCursor(dict(document) for document in self.documents if matches(document, query))
+
+    def delete_many(self, query):
+        self.operations += 1
+        remaining = [document for document in self.documents if not matches(document, query)]
+        deleted_count = len(self.documents) - len(remaining)
+        self.documents = remaining
+        return FakeDeleteResult(deleted_count)
+
+
+class LahaGcPluginTests(unittest.TestCase):
+    def setUp(self):
+        self.mongo_client = mongo.OpqMongoClient()
+        self.mongo_client.events_collection = FakeCollection(
+            [{"_id": event_id, "event_id": event_id, "expire_at": 10 if event_id < 5 else 100}
+             for event_id in range(8)])
+        self.mongo_client.box_events_collection = FakeCollection(
+            [{"_id": "%d_%s" % (event_id, box_id),
+              "event_id": event_id,
+              "box_id": box_id,
+              "data_fs_filename": "event_%d_%s" % (event_id, box_id)}
+             for event_id in range(8) for box_id in ["1000", "1001"]])
+        self.mongo_client.fs_files_collection = FakeCollection(
+            [{"_id": "file_%d_%s" % (event_id, box_id), "filename": "event_%d_%s" % (event_id, box_id), "length": 1}
+             for event_id in range(8) for box_id in ["1000", "1001"]])
+        self.mongo_client.fs_chunks_collection = FakeCollection(
+            [{"_id": "chunk_%d_%s_%d" % (event_id, box_id, n), "files_id": "file_%d_%s" % (event_id, box_id), "n": n}
+             for event_id in range(8) for box_id in ["1000", "1001"] for n in range(3)])
+
+    def test_gc_expired_events_batch(self):
+        self.assertEqual(gc_expired_events_batch(self.mongo_client, 50, 3), (3, 6, 6, 6))
+        self.assertEqual(gc_expired_events_batch(self.mongo_client, 50, 3), (2, 4, 4, 4))
+        self.assertEqual(gc_expired_events_batch(self.mongo_client, 50, 3), (0, 0, 0, 0))
+
+        self.assertEqual([event["event_id"] for event in self.mongo_client.events_collection.documents], [5, 6, 7])
+        self.assertEqual({box_event["event_id"] for box_event in self.mongo_client.box_events_collection.documents},
+                         {5, 6, 7})
+        self.assertEqual(len(self.mongo_client.fs_files_collection.documents), 6)
+        self.assertEqual(len(self.mongo_client.fs_chunks_collection.documents), 18)
+
+    def test_gc_expired_events_batch_round_trips(self):
+        gc_expired_events_batch(self.mongo_client, 50, 100)
+        self.assertEqual(self.mongo_client.events_collection.operations, 2)
+        self.assertEqual(self.mongo_client.box_events_collection.operations, 2)
+        self.assertEqual(self.mongo_client.fs_files_collection.operations, 2)
+        self.assertEqual(self.mongo_client.fs_chunks_collection.operations, 1)
+
+
+class FakeRangeCursor(list):
+    def sort(self, key, direction):
+        return FakeRangeCursor(sorted(self, key=lambda document: document[key], reverse=direction < 0))
+
+    def limit(self, limit):
+        return FakeRangeCursor(self[:limit])
+
+
+class FakeRangeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.deletes = 0
+        self.counts = 0
+
+    @staticmethod
+    def matches(document, query):
+        for field, condition in query.items():
+            value = document[field]
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$lt" in condition and not value < condition["$lt"]:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        return FakeRangeCursor(dict(document) for document in self.documents if self.matches(document, query))
+
+    def delete_many(self, query):
+        self.deletes += 1
+        remaining = [document for document in self.documents if not self.matches(document, query)]
+        deleted_count = len(self.documents) - len(remaining)
+        self.documents = remaining
+        return FakeDeleteResult(deleted_count)
+
+    def count_documents(self, query):
+        self.counts += 1
+        return len(self.find(query))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class IncrementalCollectorTests(unittest.TestCase):
+    def setUp(self):
+        # Every third document has had its TTL extended
+        self.collection = FakeRangeCollection([{"_id": _id, "expire_at": 100 if _id % 3 == 0 else 10}
+                                               for _id in range(30)])
+        self.clock = FakeClock()
+
+    def test_docs_per_s_budget(self):
+        collector = IncrementalCollector(self.collection, 4, 2.0, 60.0, clock=self.clock)
+        self.clock.now = 3.0
+        self.assertEqual(collector.collect(50), 6)
+        self.assertEqual(collector.batches, 2)
+        self.assertEqual(collector.backlog, 14)
+
+        self.clock.now = 4.0
+        self.assertEqual(collector.collect(50), 2)
+        self.assertEqual(collector.backlog, 12)
+        self.assertEqual(collector.batches, 3)
+
+    def test_sweep(self):
+        collector = IncrementalCollector(self.collection, 8, 0.0, 60.0, clock=self.clock)
+        self.assertEqual(collector.collect(50), 20)
+        self.assertEqual(collector.batches, 3)
+        self.assertEqual(collector.sweeps, 1)
+        self.assertEqual(collector.backlog, 0)
+        self.assertEqual(len(self.collection.documents), 10)
+
+        self.assertEqual(collector.collect(200), 10)
+        self.assertEqual(collector.sweeps, 2)
+        self.assertEqual(self.collection.documents, [])
+        self.assertEqual(self.collection.counts, 0)
+
+    def test_time_budget(self):
+        class TickingClock(FakeClock):
+            def __call__(self):
+                self.now += 1.0
+                return self.now
+
+        collector = IncrementalCollector(self.collection, 3, 0.0, 2.5, clock=TickingClock())
+        self.assertEqual(collector.collect(50), 9)
+        self.assertEqual(collector.batches, 3)
+        self.assertEqual(collector.stats()["backlog"], 11)
+
+    def test_reads_only_expired_documents(self):
+        collection = FakeRangeCollection([{"_id": _id, "expire_at": 10 if _id % 100 == 0 else 100}
+                                          for _id in range(1000)])
+        collector = IncrementalCollector(collection, 20, 0.0, 60.0, clock=self.clock)
+        self.assertEqual(collector.collect(50), 10)
+        self.assertEqual(collector.sweeps, 1)
+        self.assertEqual(collection.deletes, 1)
+
+        self.assertEqual(collector.collect(50), 0)
+        self.assertEqual(collector.sweeps, 2)
+        self.assertEqual(collection.deletes, 1)
+
+    def test_backlog_is_estimated_between_counts(self):
+        collector = IncrementalCollector(self.collection, 2, 1.0, 60.0, backlog_refresh_s=10.0, clock=self.clock)
+        self.clock.now = 2.0
+        self.assertEqual(collector.collect(50), 2)
+        self.assertEqual(collector.backlog, 18)
+
+        self.collection.documents.append({"_id": 30, "expire_at": 10})
+        self.clock.now = 4.0
+        self.assertEqual(collector.collect(50), 2)
+        self.assertEqual(collector.backlog, 16)
+        self.assertEqual(self.collection.counts, 1)
+
+        self.clock.now = 12.0
+        self.assertEqual(collector.collect(50), 8)
+        self.assertEqual(collector.backlog, 9)
+        self.assertEqual(self.collection.counts, 2)
+
+
+class FakeBulkCollection:
+    def __init__(self):
+        self.bulk_writes = []
+        self.fail = False
+
+    def bulk_write(self, requests, ordered=True):
+        if self.fail:
+            raise pymongo.errors.AutoReconnect("connection lost")
+        self.bulk_writes.append(requests)
+
+
+def update(box_ids, start_timestamp_ms, end_timestamp_ms, expire_at):
+    return pymongo.UpdateMany({"timestamp_ms": {"$gte": start_timestamp_ms,
+                                                "$lte": end_timestamp_ms},
+                               "box_id": {"$in": box_ids}},
+                              {"$set": {"expire_at": expire_at}})
+
+
+class GcUpdateCoalescerTests(unittest.TestCase):
+    def setUp(self):
+        self.mongo_client = mongo.OpqMongoClient()
+        self.mongo_client.trends_collection = FakeBulkCollection()
+        self.mongo_client.measurements_collection = FakeBulkCollection()
+
+    def test_merge_intervals(self):
+        self.assertEqual(merge_intervals([(5, 8), (0, 2), (2, 4), (7, 10), (12, 13)]), [(0, 4), (5, 10), (12, 13)])
+        self.assertEqual(merge_intervals([]), [])
+
+    def test_coalesces_incident_and_event_updates(self):
+        coalescer = GcUpdateCoalescer(self.mongo_client, 3600.0)
+        # 3 incidents of one event, each followed by the update of the whole event range
+        for start_timestamp_ms, end_timestamp_ms in [(100, 200), (150, 300), (800, 900)]:
+            coalescer.add(["1000"], start_timestamp_ms, end_timestamp_ms, 50)
+            coalescer.add(["1000", "1001"], 0, 1000, 50)
+        coalescer.add(["1001"], 2000, 3000, 40)
+        self.assertEqual(self.mongo_client.trends_collection.bulk_writes, [])
+
+        coalescer.flush()
+        expected = [update(["1001"], 2000, 3000, 40), update(["1000", "1001"], 0, 1000, 50)]
+        self.assertEqual(self.mongo_client.trends_collection.bulk_writes, [expected])
+        self.assertEqual(self.mongo_client.measurements_collection.bulk_writes, [expected])
+        self.assertEqual(coalescer.stats(), {"updates": 7,
+                                             "intervals": 10,
+                                             "coalesced": 7,
+                                             "update_requests": 2,
+                                             "bulk_writes": 2,
+                                             "failed_flushes": 0})
+
+        coalescer.flush()
+        self.assertEqual(len(self.mongo_client.trends_collection.bulk_writes), 1)
+
+    def test_flushes_when_full_or_unbuffered(self):
+        coalescer = GcUpdateCoalescer(self.mongo_client, 3600.0, max_pending=3)
+        coalescer.add(["1000", "1001"], 0, 10, 50)
+        self.assertEqual(self.mongo_client.trends_collection.bulk_writes, [])
+        coalescer.add(["1002"], 0, 10, 50)
+        self.assertEqual(self.mongo_client.trends_collection.bulk_writes,
+                         [[update(["1000", "1001", "1002"], 0, 10, 50)]])
+
+        unbuffered_coalescer = GcUpdateCoalescer(self.mongo_client, 0.0)
+        unbuffered_coalescer.add(["1000"], 0, 10, 60)
+        self.assertEqual(len(self.mongo_client.trends_collection.bulk_writes), 2)
+
+    def test_failed_write_is_retried(self):
+        coalescer = GcUpdateCoalescer(self.mongo_client, 3600.0, max_pending=2)
+        self.mongo_client.measurements_collection.fail = True
+        coalescer.add(["1000"], 0, 10, 50)
+        with self.assertRaises(pymongo.errors.AutoReconnect):
+            coalescer.flush()
+
+        # A full batch whose write fails does not raise into the caller of add
+        coalescer.add(["1000"], 5, 20, 50)
+        self.assertEqual(coalescer.stats()["failed_flushes"], 2)
+        self.assertEqual(coalescer.pending, {("1000", 50): [(0, 10), (5, 20)]})
+
+        self.mongo_client.measurements_collection.fail = False
+        self.assertTrue(coalescer.stop())
+        self.assertEqual(self.mongo_client.measurements_collection.bulk_writes, [[update(["1000"], 0, 20, 50)]])
+        self.assertEqual(coalescer.pending, {})
+        self.assertEqual(coalescer.stats()["coalesced"], 1)
@@ -1,11 +1,16 @@
 from plugins.makai_event_plugin import frequency_waveform
 from plugins.makai_event_plugin import frequency
+from plugins.makai_event_plugin import extract_features_worker
+import analysis
 import config
+import mongo
+import protobuf.pb_util
 
 import unittest
 import numpy
 import constants
 import csv
+import pickle
 
 
 def simulate_waveform(freq: float=constants.CYCLES_PER_SECOND, vrms: float = 120.0, noise: bool = False,
@@ -120,4 +125,25 @@ class MakaiEventPluginTests(unittest.TestCase):
                                                   down_sample_factor=self.downsample_factor)
         for freq in windowed_frequencies:
             message = "Frequency:{} Hz Expected:{} Hz".format(freq, 59.0)
-            self.assertAlmostEqual(freq, 59.0, msg=message, delta=0.2)
\ No newline at end of file
+            self.assertAlmostEqual(freq, 59.0, msg=message, delta=0.2)
+    def test_extract_features_worker_result_is_picklable(self):
+        box_event = {"box_id": "1000", "event_id": 7, "event_start_timestamp_ms": 0, "event_end_timestamp_ms": 100}
+        waveform = simulate_waveform(num_samples=int(10 * constants.SAMPLES_PER_CYCLE))
+        segmentation_engine = analysis.SegmentationEngine()
+        extracted, segmentation_timing = pickle.loads(pickle.dumps(extract_features_worker(
+            mongo.BoxEventWaveform(box_event, waveform, 1.0), "test", True, segmentation_engine)))
+        self.assertEqual(len(extracted), 4)
+        for payload in map(protobuf.pb_util.deserialize_mauka_message, extracted):
+            self.assertEqual(payload.payload.event_id, 7)
+            self.assertEqual(payload.payload.box_id, "1000")
+
+        # The timing of the worker's copy of the engine is recorded by the plugin's engine
+        self.assertEqual(segmentation_engine.stats()["calls"], 1)
+        parent_engine = analysis.SegmentationEngine()
+        parent_engine.record(segmentation_timing)
+        self.assertEqual(parent_engine.stats()["calls"], 1)
+        self.assertEqual(parent_engine.last_timing["elements"], 10)
+
+        _, segmentation_timing = extract_features_worker(mongo.BoxEventWaveform(box_event, waveform, 1.0), "test",
+                                                         False, segmentation_engine)
+        self.assertIsNone(segmentation_timing)
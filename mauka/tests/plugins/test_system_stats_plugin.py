@@ -0,0 +1,90 @@
+import unittest
+
+import bson.objectid
+
+from plugins.system_stats_plugin import GridFsUsage
+
+
+class FakeMongoClient:
+    def __init__(self):
+        self.files = []
+        self.id_queries = []
+        self.on_aggregate = None
+
+    def add_file(self, timestamp_s, filename, length):
+        _id = bson.objectid.ObjectId(("%08x" % timestamp_s) + "0" * 16)
+        self.files.append((_id, filename, length))
+
+    def gridfs_length_by_prefix(self, prefixes, id_query=None):
+        self.id_queries.append(id_query)
+        if self.on_aggregate is not None:
+            self.on_aggregate()
+        lengths = {prefix: 0 for prefix in prefixes}
+        for _id, filename, length in self.files:
+            if "$gte" in id_query and _id < id_query["$gte"]:
+                continue
+            if _id >= id_query["$lt"]:
+                continue
+            for prefix in prefixes:
+                if filename.startswith(prefix):
+                    lengths[prefix] += length
+                    break
+        return lengths
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class GridFsUsageTests(unittest.TestCase):
+    def setUp(self):
+        self.mongo_client = FakeMongoClient()
+        self.clock = FakeClock()
+        self.gridfs_usage = GridFsUsage(self.mongo_client, ["event", "incident"], 3600.0, 60.0, self.clock)
+
+    def test_incremental_refresh(self):
+        self.mongo_client.add_file(100, "event_1_1000", 10)
+        self.mongo_client.add_file(200, "incident_1", 20)
+        self.mongo_client.add_file(300, "other", 40)
+        self.gridfs_usage.refresh()
+        self.assertEqual((self.gridfs_usage.length("event"), self.gridfs_usage.length("incident")), (10, 20))
+
+        # Files younger than the lag are counted by a later refresh
+        self.mongo_client.add_file(950, "event_2_1000", 5)
+        self.clock.now = 1005.0
+        self.gridfs_usage.refresh()
+        self.assertEqual(self.gridfs_usage.length("event"), 10)
+        self.clock.now = 1060.0
+        self.gridfs_usage.refresh()
+        self.assertEqual(self.gridfs_usage.length("event"), 15)
+        self.assertEqual((self.gridfs_usage.full_refreshes, self.gridfs_usage.incremental_refreshes), (1, 2))
+        self.assertEqual(self.mongo_client.id_queries[2]["$gte"], self.mongo_client.id_queries[1]["$lt"])
+
+    def test_remove_and_full_refresh(self):
+        self.mongo_client.add_file(100, "event_1_1000", 10)
+        self.mongo_client.add_file(200, "event_2_1000", 10)
+        self.gridfs_usage.refresh()
+        self.gridfs_usage.remove("event", 10)
+        self.assertEqual(self.gridfs_usage.length("event"), 10)
+        self.gridfs_usage.remove("event", 30)
+        self.assertEqual(self.gridfs_usage.length("event"), 0)
+
+        self.clock.now += 3600.0
+        self.gridfs_usage.refresh()
+        self.assertEqual(self.gridfs_usage.length("event"), 20)
+        self.assertEqual(self.gridfs_usage.full_refreshes, 2)
+
+    def test_remove_during_full_refresh(self):
+        self.mongo_client.add_file(100, "event_1_1000", 10)
+        self.mongo_client.add_file(200, "event_2_1000", 10)
+        self.mongo_client.on_aggregate = lambda: self.gridfs_usage.remove("event", 10)
+        self.gridfs_usage.refresh()
+        self.assertEqual(self.gridfs_usage.length("event"), 10)
+
+        self.mongo_client.on_aggregate = None
+        self.gridfs_usage.remove("event", 5)
+        self.assertEqual(self.gridfs_usage.length("event"), 5)
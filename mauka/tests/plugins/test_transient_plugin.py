@@ -7,6 +7,8 @@ from plugins.transient_plugin import oscillatory_classifier
 from plugins.transient_plugin import find_zero_xings
 from plugins.transient_plugin import periodic_notching_classifier
 from plugins.transient_plugin import waveform_filter
+from plugins.transient_plugin import noise_canceler
+from plugins.transient_plugin import TransientContext
 import config
 
 import copy
@@ -28,6 +30,34 @@ def periodic_notching_transient_wave_filter(voltage, noise_floor):
             return voltage - noise_floor
 
 
+def reference_sliding_window(filtered_waveform, noise_floor, max_lull_ms):
+    voltage_above_noise_floor = abs(filtered_waveform) >= noise_floor
+    transient_windows = []
+    max_samples = int(constants.SAMPLES_PER_MILLISECOND * max_lull_ms)
+    lull_counter = 0
+    new_pass = True
+    start = 0
+
+    for i in range(len(filtered_waveform)):
+        if voltage_above_noise_floor[i]:
+            lull_counter = 0
+            if new_pass:
+                start = i
+                new_pass = False
+        elif not new_pass:
+            lull_counter += 1
+
+        if lull_counter > max_samples:
+            transient_windows.append((start, i - max_samples))
+            lull_counter = 0
+            new_pass = True
+
+    if not new_pass:
+        transient_windows.append((start, len(filtered_waveform)))
+
+    return transient_windows
+
+
 def simulate_waveform(freq: float=constants.CYCLES_PER_SECOND, vrms: float = 120.0, noise: bool = False,
                       noise_variance: float = 1.0, num_samples: int = int(6 * constants.SAMPLES_PER_CYCLE),
                       sample_rate=constants.SAMPLE_RATE_HZ, rnd_seed=0) -> numpy.ndarray:
@@ -559,3 +589,47 @@ class TransientPluginTests(unittest.TestCase):
         self.assertTrue("IMPULSIVE_TRANSIENT" not in incidents[0]['incident_classifications'])
         self.assertTrue("OSCILLATORY_TRANSIENT" not in incidents[0]['incident_classifications'])
         self.assertTrue("MULTIPLE_ZERO_CROSSING_TRANSIENT" in incidents[0]['incident_classifications'])
+
+    def test_transient_context(self):
+        filtered_waveform = simulate_waveform(noise=True, noise_variance=100.0) / 10.0
+        filtered_waveform[:10] = 0.0
+        filtered_waveform[10] = -self.noise_floor
+        context = TransientContext(filtered_waveform, self.noise_floor)
+        noise_canceled_waveform = numpy.vectorize(noise_canceler)(filtered_waveform, self.noise_floor)
+
+        self.assertTrue(numpy.array_equal(context.noise_canceled_waveform, noise_canceled_waveform))
+        self.assertTrue(numpy.array_equal(context.sign, numpy.sign(noise_canceled_waveform)))
+        self.assertTrue(numpy.array_equal(context.zero_xings, find_zero_xings(noise_canceled_waveform)))
+        self.assertEqual(context.first_non_zero_index, numpy.nonzero(noise_canceled_waveform)[0][0])
+        self.assertEqual(context.last_non_zero_index, numpy.nonzero(noise_canceled_waveform)[0][-1])
+
+        empty_context = TransientContext(numpy.zeros(10), self.noise_floor)
+        self.assertIsNone(empty_context.first_non_zero_index)
+        self.assertFalse(periodic_notching_classifier(numpy.zeros(10), numpy.zeros(10), self.configs,
+                                                      empty_context)[0])
+
+    def test_sliding_window_matches_reference(self):
+        rand = numpy.random.RandomState(seed=0)
+        max_lull_ms = 0.1
+        max_samples = int(constants.SAMPLES_PER_MILLISECOND * max_lull_ms)
+        for trial in range(50):
+            num_samples = rand.randint(0, 400)
+            filtered_waveform = numpy.zeros(num_samples)
+            # Sparse bursts with lulls on either side of max_samples
+            for _ in range(rand.randint(0, 8)):
+                start = rand.randint(0, max(1, num_samples))
+                length = len(filtered_waveform[start: start + rand.randint(1, 2 * max_samples + 3)])
+                filtered_waveform[start: start + length] = rand.choice([-1.0, 1.0], length) * rand.uniform(0, 12,
+                                                                                                           length)
+            expected = reference_sliding_window(filtered_waveform, self.noise_floor, max_lull_ms)
+            self.assertEqual(transient_sliding_window(filtered_waveform, self.noise_floor, max_lull_ms), expected,
+                             "trial %d" % trial)
+            for chunk_samples in [1, 3, max_samples, max_samples + 1, 64]:
+                self.assertEqual(transient_sliding_window(filtered_waveform, self.noise_floor, max_lull_ms,
+                                                          chunk_samples), expected,
+                                 "trial %d chunk_samples %d" % (trial, chunk_samples))
+
+    def test_sliding_window_edges(self):
+        for filtered_waveform in [numpy.zeros(0), numpy.zeros(10), numpy.full(10, 10.0)]:
+            self.assertEqual(transient_sliding_window(filtered_waveform, self.noise_floor, 0.0),
+                             reference_sliding_window(filtered_waveform, self.noise_floor, 0.0))
@@ -0,0 +1,29 @@
+import unittest
+
+import services.incident_id_provider
+
+
+class IncidentIdProviderTests(unittest.TestCase):
+    def test_single_ids(self):
+        provider = services.incident_id_provider.IncidentIdProvider(10)
+        self.assertEqual(provider.get_and_inc(), 10)
+        self.assertEqual(provider.get_and_inc(), 11)
+
+    def test_blocks(self):
+        provider = services.incident_id_provider.IncidentIdProvider(10)
+        self.assertEqual(provider.get_and_inc(16), 10)
+        self.assertEqual(provider.get_and_inc(), 26)
+        self.assertEqual(provider.get_and_inc(4), 27)
+        with self.assertRaises(ValueError):
+            provider.get_and_inc(0)
+
+    def test_high_water_mark_persisted_before_lease(self):
+        high_water_marks = []
+        provider = services.incident_id_provider.IncidentIdProvider(1, high_water_marks.append)
+        provider.get_and_inc(8)
+        provider.get_and_inc()
+        self.assertEqual(high_water_marks, [9, 10])
+
+        # A restarted provider continues from the high-water mark, skipping leased but unused ids
+        restarted = services.incident_id_provider.IncidentIdProvider(high_water_marks[-1])
+        self.assertEqual(restarted.get_and_inc(), 10)
@@ -0,0 +1,131 @@
+import unittest
+
+import numpy
+
+import analysis
+import config
+import constants
+
+
+def simulate_waveform(freq: float = constants.CYCLES_PER_SECOND, vrms: float = 120.0, num_cycles: int = 30,
+                      phase: float = 0.3, noise_variance: float = 0.0, rnd_seed=0) -> numpy.ndarray:
+    rand = numpy.random.RandomState(seed=rnd_seed)
+    idx = numpy.arange(int(num_cycles * constants.SAMPLES_PER_CYCLE))
+    waveform = numpy.sqrt(2) * vrms * numpy.sin(constants.TWO_PI * freq * idx / constants.SAMPLE_RATE_HZ + phase)
+    return waveform + numpy.sqrt(noise_variance) * rand.randn(len(idx))
+
+
+class AnalysisTests(unittest.TestCase):
+    def test_frequency_per_cycle_short(self):
+        self.assertEqual([], analysis.frequency_per_cycle(numpy.zeros(10)))
+        self.assertEqual(1, len(analysis.frequency_per_cycle(simulate_waveform(num_cycles=1))))
+
+    def test_frequency_per_cycle_len(self):
+        waveform = simulate_waveform(num_cycles=10)
+        self.assertEqual(10, len(analysis.frequency_per_cycle(waveform)))
+        self.assertEqual(10, len(analysis.frequency_per_cycle(numpy.append(waveform, numpy.zeros(50)))))
+
+    def test_frequency_per_cycle_phase(self):
+        for freq in [58.0, 59.5, 60.0, 60.25, 62.0]:
+            frequencies = analysis.frequency_per_cycle(simulate_waveform(freq=freq))
+            for frequency in frequencies:
+                self.assertAlmostEqual(freq, frequency, delta=0.01)
+
+    def test_frequency_per_cycle_phase_matches_fit(self):
+        for freq in [59.0, 60.0, 61.0]:
+            waveform = simulate_waveform(freq=freq, noise_variance=1.0)
+            phase = analysis.frequency_per_cycle(waveform, analysis.FREQUENCY_METHOD_PHASE)
+            fit = analysis.frequency_per_cycle(waveform, analysis.FREQUENCY_METHOD_FIT)
+            self.assertEqual(len(fit), len(phase))
+            for fit_freq, phase_freq in zip(fit, phase):
+                self.assertAlmostEqual(fit_freq, phase_freq, delta=0.2)
+
+    def test_frequency_per_cycle_unknown_method(self):
+        with self.assertRaises(ValueError):
+            analysis.frequency_per_cycle(simulate_waveform(), "unknown")
+
+    def test_vrms_windowed(self):
+        waveform = simulate_waveform(num_cycles=10)
+        rms_voltages = analysis.vrms_windowed(waveform)
+        self.assertEqual(numpy.float64, rms_voltages.dtype)
+        self.assertEqual(10, len(rms_voltages))
+        for rms_voltage in rms_voltages:
+            self.assertAlmostEqual(120.0, rms_voltage, delta=0.001)
+
+    def test_vrms_windowed_tail(self):
+        waveform = numpy.append(numpy.ones(400), numpy.full(50, 2.0))
+        self.assertTrue(numpy.allclose([1.0, 1.0, 2.0], analysis.vrms_windowed(waveform)))
+        self.assertTrue(numpy.allclose([2.0], analysis.vrms_windowed(numpy.full(50, -2.0))))
+        self.assertEqual(0, len(analysis.vrms_windowed(numpy.array([]))))
+
+    def test_vrms_windowed_int16(self):
+        waveform = numpy.full(250, 30000, dtype=numpy.int16)
+        self.assertTrue(numpy.allclose([30000.0, 30000.0], analysis.vrms_windowed(waveform)))
+
+    def test_vrms_windowed_overlapping(self):
+        waveform = numpy.arange(10, dtype=numpy.int64)
+        expected = [numpy.sqrt(numpy.mean(numpy.square(waveform[i:i + 4]))) for i in [0, 2, 4, 6]]
+        self.assertTrue(numpy.allclose(expected, analysis.vrms_windowed(waveform, 4, 2)))
+
+        waveform = numpy.ones(450)
+        half_cycle = int(constants.SAMPLES_PER_CYCLE / 2)
+        self.assertEqual(4, len(analysis.vrms_windowed(waveform, step=half_cycle)))
+
+    def test_segment_summary(self):
+        data = numpy.concatenate([numpy.full(20, 120.0), numpy.full(5, 60.0), numpy.full(30, 120.0)])
+        segments = analysis.segment_array(data)
+        lengths, means = analysis.segment_summary(data)
+        self.assertEqual(lengths.tolist(), [len(segment) for segment in segments])
+        self.assertTrue(numpy.allclose(means, [segment.mean() for segment in segments]))
+        self.assertEqual(lengths.tolist(), [20, 5, 30])
+
+    def test_segment_summary_empty(self):
+        lengths, means = analysis.segment_summary(numpy.array([]))
+        self.assertEqual(len(lengths), 0)
+        self.assertEqual(len(means), 0)
+
+    def test_segmentation_engine_default_matches_pelt(self):
+        rand = numpy.random.RandomState(seed=0)
+        data = 120.0 + rand.randn(200) * 0.5
+        data[60:90] -= 30.0
+        expected = analysis.rpt.Pelt().fit(data).predict(pen=1)
+        self.assertEqual(analysis.SegmentationEngine().segment_ends(data).tolist(), expected)
+
+    def test_segmentation_engine_stable_first_pass(self):
+        rand = numpy.random.RandomState(seed=0)
+        data = 120.0 + rand.randn(300) * 0.1
+        data[100:150] = 80.0 + rand.randn(50) * 0.1
+        engine = analysis.SegmentationEngine(stable_delta=1.0)
+        self.assertEqual(engine.segment_ends(data).tolist(), [100, 150, 300])
+        self.assertEqual(engine.last_timing["pelt_elements"], 0)
+
+    def test_segmentation_engine_stable_first_pass_ramped_sag(self):
+        data = numpy.concatenate([numpy.full(225, 120.0),
+                                  numpy.linspace(120.0, 84.0, 60, endpoint=False),
+                                  numpy.full(30, 84.0),
+                                  numpy.linspace(84.0, 120.0, 60, endpoint=False),
+                                  numpy.full(225, 120.0)])
+        engine = analysis.SegmentationEngine(stable_delta=1.0, max_cycles=1200)
+        lengths, means = analysis.segment_summary(data, engine)
+        self.assertGreater(len(lengths), 3)
+        sag = int(numpy.argmin(means))
+        self.assertAlmostEqual(means[sag], 84.0, delta=0.5)
+        self.assertTrue(30 <= lengths[sag] <= 34)
+        for run_start, run_end in engine.stable_runs(data):
+            self.assertLess(data[run_start:run_end].max() - data[run_start:run_end].min(), 1.0)
+
+    def test_segmentation_engine_shipped_config_keeps_short_sag(self):
+        data = numpy.concatenate([numpy.full(20, 120.0), numpy.full(5, 60.0), numpy.full(30, 120.0)])
+        engine = analysis.SegmentationEngine.from_config(config.from_env(constants.CONFIG_ENV))
+        lengths, means = analysis.segment_summary(data, engine)
+        self.assertEqual(lengths.tolist(), [20, 5, 30])
+        self.assertTrue(numpy.allclose(means, [120.0, 60.0, 120.0]))
+
+    def test_segmentation_engine_max_cycles(self):
+        data = numpy.full(1000, 120.0)
+        data[400:600] = 80.0
+        engine = analysis.SegmentationEngine(max_cycles=100)
+        self.assertEqual(engine.segment_ends(data).tolist(), [400, 600, 1000])
+        self.assertEqual(engine.last_timing["block_size"], 10)
+        self.assertEqual(engine.stats()["capped_calls"], 1)
+        self.assertEqual(engine.stats()["calls"], 1)
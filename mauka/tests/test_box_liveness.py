@@ -0,0 +1,89 @@
+import unittest
+
+import box_liveness
+
+
+class FakeMeasurementsCollection:
+    def __init__(self):
+        self.measurements = []
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        since_ms = pipeline[0]["$match"]["timestamp_ms"]["$gte"]
+        groups = {}
+        for box_id, timestamp_ms in self.measurements:
+            if timestamp_ms < since_ms:
+                continue
+            group = groups.setdefault(box_id, {"_id": box_id,
+                                               "first_seen_ms": timestamp_ms,
+                                               "last_seen_ms": timestamp_ms})
+            group["first_seen_ms"] = min(group["first_seen_ms"], timestamp_ms)
+            group["last_seen_ms"] = max(group["last_seen_ms"], timestamp_ms)
+        return iter(groups.values())
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100_000
+
+    def __call__(self):
+        return self.now
+
+
+class BoxLivenessTrackerTests(unittest.TestCase):
+    def setUp(self):
+        self.collection = FakeMeasurementsCollection()
+        self.clock = FakeClock()
+        self.tracker = box_liveness.BoxLivenessTracker(self.collection, gap_ms=60_000, lookback_ms=60_000,
+                                                       min_update_interval_ms=1_000, clock=self.clock)
+
+    def add_measurements(self, box_id, start_ms, end_ms):
+        self.collection.measurements.extend((box_id, timestamp_ms) for timestamp_ms in range(start_ms, end_ms, 1_000))
+
+    def test_active_boxes(self):
+        self.add_measurements("1000", 30_000, 101_000)
+        self.add_measurements("1001", 30_000, 90_000)
+        self.add_measurements("1002", 0, 20_000)
+        self.tracker.update()
+
+        self.assertEqual(self.tracker.active_boxes(60_000), {"1000", "1001"})
+        self.assertEqual(self.tracker.active_boxes(5_000), {"1000"})
+        self.assertTrue(self.tracker.is_active("1001"))
+        self.assertFalse(self.tracker.is_active("1002"))
+        self.assertEqual(self.tracker.first_seen("1000"), 40_000)
+        self.assertEqual(self.tracker.last_seen("1000"), 100_000)
+
+    def test_updates_are_incremental(self):
+        self.add_measurements("1000", 40_000, 101_000)
+        self.tracker.update()
+        self.clock.now = 100_500
+        self.tracker.update()
+        self.assertEqual(len(self.collection.pipelines), 1)
+
+        self.clock.now = 160_000
+        self.add_measurements("1000", 101_000, 161_000)
+        self.tracker.update()
+        self.assertEqual(self.collection.pipelines[1][0], {"$match": {"timestamp_ms": {"$gte": 100_000}}})
+        self.assertEqual(self.tracker.last_seen("1000"), 160_000)
+        self.assertEqual(self.tracker.first_seen("1000"), 40_000)
+        self.assertEqual(self.tracker.stats()["updates"], 2)
+
+    def test_gaps(self):
+        self.add_measurements("1000", 40_000, 101_000)
+        self.add_measurements("1001", 40_000, 101_000)
+        self.tracker.update()
+
+        # 1001 goes silent and then resumes
+        self.clock.now = 200_000
+        self.add_measurements("1000", 101_000, 201_000)
+        self.tracker.update()
+        self.assertEqual(self.tracker.gaps(), {"1001": 100_000})
+        self.assertEqual(self.tracker.last_seen_by_box(), {"1000": 200_000, "1001": 100_000})
+
+        self.clock.now = 230_000
+        self.add_measurements("1001", 210_000, 231_000)
+        self.tracker.update()
+        self.assertEqual(self.tracker.gaps(), {})
+        self.assertEqual(self.tracker.first_seen("1001"), 210_000)
+        self.assertEqual(self.tracker.first_seen("1000"), 40_000)
@@ -0,0 +1,82 @@
+import unittest
+
+import numpy
+from scipy import signal
+
+import constants
+import dsp
+
+
+class DspTests(unittest.TestCase):
+    def setUp(self):
+        rand = numpy.random.RandomState(seed=0)
+        t = numpy.arange(int(10 * constants.SAMPLES_PER_CYCLE)) / constants.SAMPLE_RATE_HZ
+        self.waveform = 170.0 * numpy.sin(2 * numpy.pi * constants.CYCLES_PER_SECOND * t) + rand.randn(len(t))
+
+    def test_filters_are_designed_once(self):
+        sos = dsp.butter_sos(4, 500.0)
+        self.assertIs(dsp.butter_sos(4, 500.0), sos)
+        self.assertIsNot(dsp.butter_sos(4, 400.0), sos)
+
+    def test_zero_phase_lowpass_matches_ba_form(self):
+        numerator, denominator = signal.butter(4, 500.0 * 2 / constants.SAMPLE_RATE_HZ, output='ba')
+        expected = signal.filtfilt(numerator, denominator, self.waveform)
+        self.assertTrue(numpy.allclose(dsp.zero_phase_lowpass(self.waveform, 4, 500.0), expected, atol=1e-6))
+
+    def test_zero_phase_highpass(self):
+        lowpassed_waveform = dsp.zero_phase_lowpass(self.waveform, 4, 500.0)
+        out = numpy.empty_like(self.waveform)
+        highpassed_waveform = dsp.zero_phase_highpass(self.waveform, 4, 500.0, lowpassed_waveform=lowpassed_waveform,
+                                                      out=out)
+        self.assertIs(highpassed_waveform, out)
+        self.assertTrue(numpy.allclose(highpassed_waveform + lowpassed_waveform, self.waveform))
+
+    def test_lowpass_decimate_matches_decimate(self):
+        numerator, denominator = signal.butter(2, 500.0 * 2 / constants.SAMPLE_RATE_HZ, output='ba')
+        expected = signal.decimate(self.waveform, 4, ftype=signal.dlti(numerator, denominator))
+        decimated_waveform = dsp.lowpass_decimate(self.waveform, 4, 2, 500.0)
+        self.assertEqual(len(decimated_waveform), len(expected))
+        self.assertTrue(numpy.allclose(decimated_waveform, expected, atol=1e-6))
+
+    def test_matrix_pencil_damped_sinusoid(self):
+        t = numpy.arange(200) / constants.SAMPLE_RATE_HZ
+        waveform = 40.0 * numpy.exp(-300.0 * t) * numpy.cos(2 * numpy.pi * 960.0 * t + 0.5) + 2.0
+        fit = dsp.matrix_pencil_damped_sinusoid(waveform)
+        self.assertEqual(fit.method, "matrix_pencil")
+        self.assertAlmostEqual(fit.frequency, 960.0, places=4)
+        self.assertAlmostEqual(fit.decay, 300.0, places=4)
+        self.assertAlmostEqual(fit.amplitude, 40.0, places=4)
+        self.assertAlmostEqual(fit.phase, 0.5, places=4)
+        self.assertAlmostEqual(fit.mean, 2.0, places=4)
+        self.assertAlmostEqual(fit.rss, 0.0, places=4)
+
+    def test_matrix_pencil_without_oscillation(self):
+        t = numpy.arange(200) / constants.SAMPLE_RATE_HZ
+        self.assertIsNone(dsp.matrix_pencil_damped_sinusoid(40.0 * numpy.exp(-300.0 * t)))
+        self.assertIsNone(dsp.matrix_pencil_damped_sinusoid(numpy.zeros(200)))
+        self.assertIsNone(dsp.matrix_pencil_damped_sinusoid(numpy.ones(5)))
+
+    def test_leastsq_damped_sinusoid(self):
+        rand = numpy.random.RandomState(seed=0)
+        t = numpy.arange(200) / constants.SAMPLE_RATE_HZ
+        waveform = 160.0 * numpy.exp(-200.0 * t) * numpy.cos(2 * numpy.pi * 2400.0 * t) + rand.randn(len(t))
+        fit = dsp.leastsq_damped_sinusoid(waveform)
+        self.assertEqual(fit.method, "leastsq")
+        self.assertAlmostEqual(fit.frequency, 2400.0, delta=5.0)
+        self.assertLess(fit.rss, 2.0 * len(t))
+
+    def test_leastsq_damped_sinusoid_budget(self):
+        t = numpy.arange(200) / constants.SAMPLE_RATE_HZ
+        waveform = 160.0 * numpy.exp(-200.0 * t) * numpy.cos(2 * numpy.pi * 2400.0 * t)
+        self.assertIsNone(dsp.leastsq_damped_sinusoid(waveform, budget_s=0.0))
+        self.assertEqual(dsp.leastsq_damped_sinusoid(waveform, budget_s=10.0).method, "leastsq")
+
+    def test_sliding_autocorrelation(self):
+        rand = numpy.random.RandomState(seed=0)
+        workspace = dsp.CorrelationWorkspace()
+        for num_samples in [2, 3, 100, 1999, 2048, 5000]:
+            waveform = numpy.abs(rand.randn(num_samples))
+            expected = numpy.correlate(waveform, waveform[:num_samples // 2], mode='valid')
+            self.assertTrue(numpy.allclose(dsp.sliding_autocorrelation(waveform, num_samples // 2, workspace),
+                                           expected))
+        self.assertEqual(len(workspace.buffer), 8192)
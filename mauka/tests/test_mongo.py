@@ -0,0 +1,339 @@
+import tempfile
+import unittest
+
+import numpy
+import pymongo.errors
+
+import mongo
+import waveform_cache
+
+
+class FakeOpqBoxesCollection:
+    def __init__(self, opq_boxes):
+        self.opq_boxes = opq_boxes
+        self.queries = 0
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        box_ids = query["box_id"]["$in"]
+        return [dict(opq_box) for opq_box in self.opq_boxes if opq_box["box_id"] in box_ids]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BoxMetadataCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.collection = FakeOpqBoxesCollection([{"box_id": "1000", "location": "POST", "calibration_constant": 2.0},
+                                                  {"box_id": "1001"}])
+        self.clock = FakeClock()
+        self.cache = mongo.BoxMetadataCache(self.collection, ttl_s=10.0, clock=self.clock)
+
+    def test_lookups(self):
+        self.assertEqual(self.cache.location("1000"), "POST")
+        self.assertEqual(self.cache.calibration_constant("1000"), 2.0)
+        self.assertEqual(self.cache.location("1001"), "UNKNOWN")
+        self.assertEqual(self.cache.calibration_constant("1001"), 1.0)
+        self.assertEqual(self.cache.location("9999"), "UNKNOWN")
+        self.assertEqual(self.cache.calibration_constant("9999"), 1.0)
+
+    def test_hits_and_misses(self):
+        self.cache.location("1000")
+        self.cache.calibration_constant("1000")
+        self.cache.location("9999")
+        self.cache.location("9999")
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 2, "size": 2})
+        self.assertEqual(self.collection.queries, 2)
+
+    def test_batched_load(self):
+        self.assertEqual(self.cache.calibration_constants(["1000", "1001", "9999"]),
+                         {"1000": 2.0, "1001": 1.0, "9999": 1.0})
+        self.assertEqual(self.collection.queries, 1)
+
+    def test_ttl_expiry(self):
+        self.assertEqual(self.cache.location("1000"), "POST")
+        self.collection.opq_boxes[0]["location"] = "KELLER"
+        self.clock.now = 9.0
+        self.assertEqual(self.cache.location("1000"), "POST")
+        self.clock.now = 10.0
+        self.assertEqual(self.cache.location("1000"), "KELLER")
+
+    def test_invalidate(self):
+        self.cache.calibration_constants(["1000", "1001"])
+        self.collection.opq_boxes[0]["calibration_constant"] = 3.0
+        self.collection.opq_boxes[1]["calibration_constant"] = 4.0
+        self.cache.invalidate("1000")
+        self.assertEqual(self.cache.calibration_constant("1000"), 3.0)
+        self.assertEqual(self.cache.calibration_constant("1001"), 1.0)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.calibration_constant("1001"), 4.0)
+        self.assertEqual(self.cache.stats()["size"], 1)
+
+
+class FakeIncidentsCollection:
+    def __init__(self):
+        self.batches = []
+        self.fail_after = None
+        self.rejected_codes = {}
+
+    def insert_many(self, documents):
+        documents = list(documents)
+        if self.fail_after is not None:
+            self.batches.append(documents[:self.fail_after])
+            raise pymongo.errors.BulkWriteError({"nInserted": self.fail_after, "writeErrors": []})
+        for index, document in enumerate(documents):
+            if document["incident_id"] in self.rejected_codes:
+                self.batches.append(documents[:index])
+                raise pymongo.errors.BulkWriteError({
+                    "nInserted": index,
+                    "writeErrors": [{"index": index,
+                                     "code": self.rejected_codes[document["incident_id"]],
+                                     "errmsg": "rejected"}]})
+        self.batches.append(documents)
+
+
+class IncidentWriterTests(unittest.TestCase):
+    def setUp(self):
+        self.mongo_client = mongo.OpqMongoClient()
+        self.mongo_client.incidents_collection = FakeIncidentsCollection()
+        self.incident_writer = mongo.IncidentWriter(self.mongo_client, window_s=60.0, max_batch=3)
+
+    def incident(self, incident_id):
+        return {"incident_id": incident_id, "event_id": -1, "box_id": "1000"}
+
+    def test_batches_until_flush(self):
+        self.incident_writer.add(self.incident(1), False)
+        self.incident_writer.add(self.incident(2), False)
+        self.assertEqual(self.mongo_client.incidents_collection.batches, [])
+        self.incident_writer.flush()
+        self.assertEqual(len(self.mongo_client.incidents_collection.batches), 1)
+        self.assertEqual([incident["incident_id"] for incident in self.mongo_client.incidents_collection.batches[0]],
+                         [1, 2])
+        self.assertEqual(self.incident_writer.incidents_written, 2)
+
+    def test_flush_when_batch_full(self):
+        for incident_id in range(1, 4):
+            self.incident_writer.add(self.incident(incident_id), False)
+        self.assertEqual(len(self.mongo_client.incidents_collection.batches), 1)
+        self.assertEqual(self.incident_writer.batches_written, 1)
+
+    def test_run_when_written(self):
+        ran = []
+        self.incident_writer.add(self.incident(1), False)
+        self.incident_writer.run_when_written(1, lambda: ran.append(1))
+        self.incident_writer.run_when_written(2, lambda: ran.append(2))
+        self.assertEqual(ran, [2])
+        self.incident_writer.flush()
+        self.assertEqual(ran, [2, 1])
+
+    def test_failed_write_is_retried(self):
+        ran = []
+        incidents_collection = self.mongo_client.incidents_collection
+        incidents_collection.fail_after = 1
+        self.incident_writer.add(self.incident(1), False)
+        self.incident_writer.add(self.incident(2), False)
+        self.incident_writer.run_when_written(1, lambda: ran.append(1))
+        self.incident_writer.run_when_written(2, lambda: ran.append(2))
+        with self.assertRaises(pymongo.errors.BulkWriteError):
+            self.incident_writer.flush()
+        self.assertEqual(ran, [1])
+        self.assertEqual(self.incident_writer.failed_flushes, 1)
+
+        # A full batch whose write fails does not raise into the caller of add
+        incidents_collection.fail_after = 0
+        self.incident_writer.add(self.incident(3), False)
+        self.incident_writer.add(self.incident(4), False)
+        self.assertEqual(ran, [1])
+        self.assertEqual(self.incident_writer.failed_flushes, 2)
+
+        incidents_collection.fail_after = None
+        self.assertTrue(self.incident_writer.stop())
+        self.assertEqual(ran, [1, 2])
+        self.assertEqual([[incident["incident_id"] for incident in batch] for batch in incidents_collection.batches],
+                         [[1], [], [2, 3, 4]])
+        self.assertEqual(self.incident_writer.incidents_written, 4)
+        self.assertTrue(self.incident_writer.stop_event.is_set())
+
+    def test_rejected_incidents_are_not_retried(self):
+        ran = []
+        incidents_collection = self.mongo_client.incidents_collection
+        incidents_collection.rejected_codes = {2: mongo.DUPLICATE_KEY_ERROR, 3: 121}
+        self.incident_writer.max_batch = 4
+        for incident_id in range(1, 5):
+            self.incident_writer.add(self.incident(incident_id), False)
+            self.incident_writer.run_when_written(incident_id, lambda incident_id=incident_id: ran.append(incident_id))
+
+        self.assertEqual([[incident["incident_id"] for incident in batch] for batch in incidents_collection.batches],
+                         [[1], [], [4]])
+        self.assertEqual(ran, [1, 2, 4])
+        self.assertEqual(self.incident_writer.incidents_written, 3)
+        self.assertEqual(self.incident_writer.incidents_dropped, 1)
+        self.assertEqual(self.incident_writer.failed_flushes, 0)
+        self.assertEqual(self.incident_writer.pending, [])
+        self.assertEqual(self.incident_writer.pending_callbacks, {})
+
+
+class FakeIndexedCollection:
+    def __init__(self, index_information):
+        self.indexes = index_information
+        self.created = []
+
+    def index_information(self):
+        return self.indexes
+
+    def create_index(self, keys, **options):
+        self.created.append((keys, options))
+
+
+class FakeCursor:
+    def __init__(self, winning_plan):
+        self.winning_plan = winning_plan
+
+    def sort(self, sort):
+        return self
+
+    def limit(self, limit):
+        return self
+
+    def explain(self):
+        return {"queryPlanner": {"winningPlan": self.winning_plan}}
+
+
+class FakeExplainedCollection:
+    def __init__(self, winning_plan):
+        self.winning_plan = winning_plan
+
+    def find(self, query):
+        return FakeCursor(self.winning_plan)
+
+
+class FakeDatabaseClient:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def get_collection(self, collection):
+        return self.collections[collection]
+
+
+class IndexCatalogTests(unittest.TestCase):
+    def test_ensure_indexes_creates_missing(self):
+        measurements = FakeIndexedCollection({"_id_": {"key": [("_id", 1)]},
+                                              "expire_at_1": {"key": [("expire_at", 1.0)]},
+                                              "by_hand": {"key": [("box_id", 1), ("timestamp_ms", 1)],
+                                                          "unique": True}})
+        opq_boxes = FakeIndexedCollection({"_id_": {"key": [("_id", 1)]},
+                                           "coordinates_2d": {"key": [("coordinates", "2d")]}})
+        index_catalog = [mongo.IndexSpec(mongo.Collection.MEASUREMENTS, [("expire_at", 1)]),
+                         mongo.IndexSpec(mongo.Collection.MEASUREMENTS, [("box_id", 1), ("timestamp_ms", 1)]),
+                         mongo.IndexSpec(mongo.Collection.MEASUREMENTS, [("timestamp_ms", 1)]),
+                         mongo.IndexSpec(mongo.Collection.OPQ_BOXES, [("box_id", 1)], unique=True)]
+        mongo_client = FakeDatabaseClient({"measurements": measurements, "opq_boxes": opq_boxes})
+
+        created = mongo.ensure_indexes(mongo_client, index_catalog)
+        self.assertEqual([index_spec.name for index_spec in created], ["timestamp_ms_1", "box_id_1"])
+        self.assertEqual(measurements.created, [([("timestamp_ms", 1)], {})])
+        self.assertEqual(opq_boxes.created, [([("box_id", 1)], {"unique": True})])
+
+    def test_catalog_covers_hot_queries(self):
+        declared = {(index_spec.collection, index_spec.keys[0][0]) for index_spec in mongo.INDEX_CATALOG}
+        for query_shape in mongo.HOT_QUERY_SHAPES:
+            fields = list(query_shape.query.keys()) or [field for field, _ in query_shape.sort]
+            self.assertIn((query_shape.collection, fields[0]), declared, query_shape)
+
+    def test_query_plan_stages(self):
+        plan = {"queryPlan": {"stage": "FETCH",
+                              "inputStage": {"stage": "OR",
+                                             "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}},
+                "slotBasedPlan": {"slots": "", "stages": ""}}
+        self.assertEqual(mongo.query_plan_stages(plan), ["FETCH", "OR", "IXSCAN", "COLLSCAN"])
+
+    def test_verify_query_plans(self):
+        query_shapes = [mongo.QueryShape(mongo.Collection.INCIDENTS, {"incident_id": 1}),
+                        mongo.QueryShape(mongo.Collection.TRENDS, {"box_id": "1000"},
+                                         sort=[("timestamp_ms", 1)], limit=1)]
+        mongo_client = FakeDatabaseClient({
+            "incidents": FakeExplainedCollection({"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}),
+            "trends": FakeExplainedCollection({"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}})})
+        self.assertEqual(mongo.verify_query_plans(mongo_client, query_shapes), [query_shapes[1]])
+
+
+class FakeFsFilesCollection:
+    def __init__(self, groups):
+        self.groups = groups
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return self.groups
+
+
+class GridFsLengthByPrefixTests(unittest.TestCase):
+    def test_gridfs_length_by_prefix(self):
+        mongo_client = mongo.OpqMongoClient()
+        mongo_client.fs_files_collection = FakeFsFilesCollection([{"_id": "event", "length": 30}])
+        self.assertEqual(mongo_client.gridfs_length_by_prefix(["event", "incident"], {"$gte": 1}),
+                         {"event": 30, "incident": 0})
+
+        pipeline = mongo_client.fs_files_collection.pipelines[0]
+        self.assertEqual(pipeline[0], {"$match": {"_id": {"$gte": 1}}})
+        self.assertEqual([branch["then"] for branch in pipeline[1]["$project"]["prefix"]["$switch"]["branches"]],
+                         ["event", "incident"])
+        self.assertEqual(pipeline[-1], {"$group": {"_id": "$prefix", "length": {"$sum": "$length"}}})
+
+
+
+class FakeGridFsCollections:
+    def __init__(self):
+        self.fs_files = []
+        self.fs_chunks = []
+        self.chunk_queries = 0
+
+    def put(self, file_id, filename, data):
+        self.fs_files.append({"_id": file_id, "filename": filename})
+        self.fs_chunks.append({"files_id": file_id, "n": 0, "data": data})
+
+    def find(self, query, projection=None):
+        if "filename" in query:
+            return FakeSortableResults([fs_file for fs_file in self.fs_files
+                                        if fs_file["filename"] in query["filename"]["$in"]])
+        self.chunk_queries += 1
+        return [fs_chunk for fs_chunk in self.fs_chunks if fs_chunk["files_id"] in query["files_id"]["$in"]]
+
+
+class FakeSortableResults(list):
+    def sort(self, key, direction):
+        # Files are inserted in upload order
+        return self
+
+
+class ReadWaveformsTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.gridfs_collections = FakeGridFsCollections()
+        self.mongo_client = mongo.OpqMongoClient()
+        self.mongo_client.fs_files_collection = self.gridfs_collections
+        self.mongo_client.fs_chunks_collection = self.gridfs_collections
+        self.mongo_client.waveform_cache = waveform_cache.WaveformCache(self.tmp_dir.name, max_bytes=1000)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cached_waveforms_are_keyed_by_file_id(self):
+        self.gridfs_collections.put(1, "event_1_1000", numpy.arange(4, dtype=numpy.int16).tobytes())
+        waveforms = self.mongo_client.read_waveforms(["event_1_1000"])
+        numpy.testing.assert_array_equal(waveforms["event_1_1000"], numpy.arange(4))
+        waveforms = self.mongo_client.read_waveforms(["event_1_1000", "event_2_1000"])
+        numpy.testing.assert_array_equal(waveforms["event_1_1000"], numpy.arange(4))
+        self.assertEqual(list(waveforms.keys()), ["event_1_1000"])
+        self.assertEqual(self.gridfs_collections.chunk_queries, 1)
+
+        # A rewritten file is not served from the cache
+        self.gridfs_collections.put(2, "event_1_1000", numpy.full(4, 7, dtype=numpy.int16).tobytes())
+        waveforms = self.mongo_client.read_waveforms(["event_1_1000"])
+        numpy.testing.assert_array_equal(waveforms["event_1_1000"], numpy.full(4, 7))
+        self.assertEqual(self.gridfs_collections.chunk_queries, 2)
@@ -45,7 +45,35 @@ class PbUtilsTests(unittest.TestCase):
                                               10)
         self.assertTrue(isinstance(mauka_message, pb_util.mauka_pb2.MaukaMessage))
         self.assertTrue(pb_util.is_payload(mauka_message, pb_util.mauka_pb2.MEASUREMENTS))
-        self.assertTrue(np.array_equal(mauka_message.payload.data, np.array([1, 2, 3])))
+        self.assertEqual(len(mauka_message.payload.data), 0)
+        self.assertEqual(mauka_message.payload.packed_dtype, "<f8")
+        self.assertTrue(np.array_equal(pb_util.repeated_as_ndarray(mauka_message.payload), np.array([1, 2, 3])))
+
+    def test_build_payload_np_round_trip(self):
+        data = np.random.uniform(-170, 170, 1000)
+        mauka_message = pb_util.build_payload("test", 1, "2", pb_util.mauka_pb2.VOLTAGE_RAW, data, 5, 10)
+        deserialized = pb_util.deserialize_mauka_message(pb_util.serialize_message(mauka_message))
+        decoded = pb_util.repeated_as_ndarray(deserialized.payload)
+        self.assertEqual(decoded.dtype, np.float64)
+        self.assertTrue(np.array_equal(decoded, data))
+
+    def test_add_segments(self):
+        mauka_message = pb_util.build_payload("test", 1, "2", pb_util.mauka_pb2.VOLTAGE_RMS_WINDOWED,
+                                              np.array([120.0, 120.0, 60.0]), 5, 10)
+        self.assertIsNone(pb_util.payload_segments(mauka_message.payload))
+        pb_util.add_segments(mauka_message, np.array([2, 1]), np.array([120.0, 60.0]))
+        deserialized = pb_util.deserialize_mauka_message(pb_util.serialize_message(mauka_message))
+        self.assertEqual(list(deserialized.payload.segments.ends), [2, 3])
+        lengths, means = pb_util.payload_segments(deserialized.payload)
+        self.assertEqual(lengths.tolist(), [2, 1])
+        self.assertEqual(means.tolist(), [120.0, 60.0])
+
+    def test_add_segments_empty(self):
+        mauka_message = pb_util.build_payload("test", 1, "2", pb_util.mauka_pb2.VOLTAGE_RMS_WINDOWED, [], 5, 10)
+        pb_util.add_segments(mauka_message, [], [])
+        deserialized = pb_util.deserialize_mauka_message(pb_util.serialize_message(mauka_message))
+        lengths, means = pb_util.payload_segments(deserialized.payload)
+        self.assertEqual(len(lengths), 0)
 
     def test_build_heartbeat(self):
         mauka_message = pb_util.build_heartbeat("test",
@@ -60,6 +88,10 @@ class PbUtilsTests(unittest.TestCase):
         self.assertEqual(mauka_message.heartbeat.on_message_count, 2)
         self.assertEqual(mauka_message.heartbeat.status, "status")
         self.assertEqual(mauka_message.heartbeat.plugin_state, "state")
+        self.assertEqual(list(mauka_message.heartbeat.worker_states), [])
+
+        mauka_message = pb_util.build_heartbeat("test", 1, 2, "status", "BUSY", ["IDLE", "BUSY"])
+        self.assertEqual(list(mauka_message.heartbeat.worker_states), ["IDLE", "BUSY"])
 
     def test_build_makai_event(self):
         mauka_message = pb_util.build_makai_event("test", 1)
@@ -141,12 +173,18 @@ class PbUtilsTests(unittest.TestCase):
     def test_build_gc_stat(self):
         mauka_message = pb_util.build_gc_stat("test",
                                               pb_util.mauka_pb2.TRENDS,
-                                              1)
+                                              1,
+                                              2.5,
+                                              3,
+                                              4)
         self.assertTrue(isinstance(mauka_message, pb_util.mauka_pb2.MaukaMessage))
         self.assertTrue(pb_util.is_gc_stat(mauka_message))
         self.assertEqual(mauka_message.source, "test")
         self.assertEqual(mauka_message.laha.gc_stat.gc_domain, pb_util.mauka_pb2.TRENDS)
         self.assertEqual(mauka_message.laha.gc_stat.gc_cnt, 1)
+        self.assertEqual(mauka_message.laha.gc_stat.gc_duration_ms, 2.5)
+        self.assertEqual(mauka_message.laha.gc_stat.gc_backlog, 3)
+        self.assertEqual(mauka_message.laha.gc_stat.gc_bytes, 4)
 
     def test_build_trigger_request(self):
         mauka_message = pb_util.build_trigger_request("test",
@@ -178,6 +216,20 @@ class PbUtilsTests(unittest.TestCase):
         self.assertEqual(mauka_message.triggered_event.start_timestamp_ms, 3)
         self.assertEqual(mauka_message.triggered_event.end_timestamp_ms, 4)
 
+    def test_build_incident_id_req(self):
+        mauka_message = pb_util.build_incident_id_req("test", 1, 16)
+        self.assertTrue(pb_util.is_incident_id_req(mauka_message))
+        self.assertEqual(mauka_message.incident_id_req.req_id, 1)
+        self.assertEqual(mauka_message.incident_id_req.count, 16)
+        self.assertEqual(pb_util.build_incident_id_req("test", 1).incident_id_req.count, 1)
+
+    def test_build_incident_id_resp(self):
+        mauka_message = pb_util.build_incident_id_resp("test", 1, 100, 16)
+        self.assertTrue(pb_util.is_incident_id_resp(mauka_message))
+        self.assertEqual(mauka_message.incident_id_resp.resp_id, 1)
+        self.assertEqual(mauka_message.incident_id_resp.incident_id, 100)
+        self.assertEqual(mauka_message.incident_id_resp.count, 16)
+
     def test_format_makai_triggering_identity(self):
         identity = pb_util.format_makai_triggering_identity("token", "uuid")
         self.assertEqual(identity, "mauka_token_uuid")
@@ -575,3 +627,7 @@ class PbUtilsTests(unittest.TestCase):
         cycle.datapoints[:] = [1, 2, 3]
 
         self.assertTrue(np.array_equal(cycle.datapoints, np.array([1, 2, 3])))
+
+    def test_repeated_as_ndarray_legacy_payload(self):
+        mauka_message = pb_util.build_payload("test", 1, "2", pb_util.mauka_pb2.VOLTAGE_RAW, [1, 2, 3], 5, 10)
+        self.assertTrue(np.array_equal(pb_util.repeated_as_ndarray(mauka_message.payload), np.array([1, 2, 3])))
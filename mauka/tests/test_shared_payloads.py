@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+import unittest
+
+import numpy
+
+import protobuf.mauka_pb2
+import protobuf.pb_util
+import shared_payloads
+
+
+def _sum_payload(serialized_mauka_message, result_queue):
+    mauka_message = protobuf.pb_util.deserialize_mauka_message(serialized_mauka_message)
+    result_queue.put(float(protobuf.pb_util.repeated_as_ndarray(mauka_message.payload).sum()))
+
+
+class SharedPayloadsTests(unittest.TestCase):
+    def setUp(self):
+        self.writer = shared_payloads.SharedPayloadWriter(lease_s=60.0, min_bytes=16)
+
+    def tearDown(self):
+        self.writer.close()
+
+    def build_payload(self, data):
+        return protobuf.pb_util.build_payload("test", 1, "1000", protobuf.mauka_pb2.VOLTAGE_RAW, data, 5, 10)
+
+    def test_round_trip(self):
+        data = numpy.random.uniform(-170, 170, 1000)
+        mauka_message = self.writer.share_payload(self.build_payload(data))
+        self.assertTrue(mauka_message.payload.shm_name)
+        self.assertEqual(len(mauka_message.payload.packed_data), 0)
+        self.assertEqual(mauka_message.payload.shm_nbytes, data.nbytes)
+        decoded = protobuf.pb_util.repeated_as_ndarray(mauka_message.payload)
+        self.assertTrue(numpy.array_equal(decoded, data))
+        self.assertFalse(decoded.flags.writeable)
+        self.assertEqual(self.writer.segments_shared, 1)
+
+    def test_small_payloads_stay_inline(self):
+        mauka_message = self.writer.share_payload(self.build_payload(numpy.array([1.0])))
+        self.assertFalse(mauka_message.payload.shm_name)
+        self.assertTrue(numpy.array_equal(protobuf.pb_util.repeated_as_ndarray(mauka_message.payload), [1.0]))
+
+    def test_read_from_another_process(self):
+        data = numpy.arange(1000, dtype=numpy.float64)
+        mauka_message = self.writer.share_payload(self.build_payload(data))
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_sum_payload,
+                                          args=(protobuf.pb_util.serialize_message(mauka_message), result_queue))
+        process.start()
+        process.join(10)
+        self.assertEqual(result_queue.get(timeout=1), data.sum())
+
+    def test_expired_lease(self):
+        mauka_message = self.writer.share_payload(self.build_payload(numpy.arange(100, dtype=numpy.float64)))
+        self.writer.free_expired(float("inf"))
+        self.assertEqual(len(protobuf.pb_util.repeated_as_ndarray(mauka_message.payload)), 0)
+
+    def test_close_unlinks_segments(self):
+        mauka_message = self.writer.share_payload(self.build_payload(numpy.arange(100, dtype=numpy.float64)))
+        path = os.path.join(shared_payloads.SHM_DIR, mauka_message.payload.shm_name.lstrip("/"))
+        self.assertTrue(os.path.exists(path))
+        self.writer.close()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(len(self.writer.segments), 0)
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+import numpy
+
+import waveform_cache
+
+
+class WaveformCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = waveform_cache.WaveformCache(self.tmp_dir.name, max_bytes=100)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_put_get(self):
+        waveform = numpy.arange(10, dtype=numpy.int16)
+        self.cache.put("event_1_1000", waveform.tobytes())
+        numpy.testing.assert_array_equal(self.cache.get("event_1_1000"), waveform)
+        self.assertIsNone(self.cache.get("event_2_1000"))
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "evictions": 0})
+
+    def test_filenames_are_escaped(self):
+        self.cache.put("../event/1", numpy.arange(2, dtype=numpy.int16).tobytes())
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["..%2Fevent%2F1.s16"])
+
+    def test_lru_eviction(self):
+        data = numpy.zeros(20, dtype=numpy.int16).tobytes()
+        self.cache.put("a", data)
+        self.cache.put("b", data)
+        old = time.time() - 10
+        os.utime(self.cache.path("a"), (old, old))
+        os.utime(self.cache.path("b"), (old + 1, old + 1))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.cache.put("c", data)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNotNone(self.cache.get("c"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_directory_is_only_listed_when_over_budget(self):
+        data = numpy.zeros(20, dtype=numpy.int16).tobytes()
+        with unittest.mock.patch.object(self.cache, "evict", wraps=self.cache.evict) as evict:
+            self.cache.put("a", data)
+            self.cache.put("b", data)
+            self.assertEqual(evict.call_count, 0)
+            self.cache.put("c", data)
+            self.assertEqual(evict.call_count, 1)
+        # Evicts down to the low watermark
+        self.assertEqual(self.cache.total_bytes, 80)
+        self.assertEqual(len(os.listdir(self.tmp_dir.name)), 2)
+
+    def test_size_of_existing_waveforms_is_counted(self):
+        self.cache.put("a", numpy.zeros(20, dtype=numpy.int16).tobytes())
+        self.assertEqual(waveform_cache.WaveformCache(self.tmp_dir.name, max_bytes=100).total_bytes, 40)
+
+    def test_failed_writes_are_cleaned_up(self):
+        with unittest.mock.patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.cache.put("a", numpy.zeros(2, dtype=numpy.int16).tobytes())
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+        self.assertEqual(self.cache.total_bytes, 0)
+
+    def test_oversized_waveforms_are_not_cached(self):
+        self.cache.put("a", numpy.zeros(51, dtype=numpy.int16).tobytes())
+        self.assertIsNone(self.cache.get("a"))
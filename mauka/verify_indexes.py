@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+"""
+Verifies that every hot query shape in Mauka is served by an index.
+
+Each query shape in mongo.HOT_QUERY_SHAPES is explained against the provided mongod and this script exits with a
+non-zero status if any of them falls back to a COLLSCAN.
+"""
+
+import argparse
+import sys
+
+import mongo
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=27017)
+    parser.add_argument("--db", default="opq")
+    parser.add_argument("--ensure",
+                        action="store_true",
+                        help="Create any missing index from mongo.INDEX_CATALOG before verifying")
+    args = parser.parse_args()
+
+    mongo_client = mongo.OpqMongoClient(args.host, args.port, args.db)
+    if args.ensure:
+        mongo.ensure_indexes(mongo_client)
+
+    collscans = mongo.verify_query_plans(mongo_client)
+    for query_shape in collscans:
+        print("COLLSCAN: %s" % query_shape)
+    print("%d of %d query shapes are served by an index" % (len(mongo.HOT_QUERY_SHAPES) - len(collscans),
+                                                            len(mongo.HOT_QUERY_SHAPES)))
+    sys.exit(1 if collscans else 0)
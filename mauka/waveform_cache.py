@@ -0,0 +1,151 @@
+"""
+This module provides a node-local cache of raw event waveforms that is shared between Mauka plugin processes.
+"""
+
+import os
+import threading
+import typing
+import urllib.parse
+
+import numpy
+
+
+class WaveformCache:
+    """
+    A byte bounded, least recently used cache of raw 16 bit waveforms keyed by gridfs file _id.
+
+    Waveforms are stored as raw files within a spool directory so that every plugin process on a node shares the same
+    cache. Since a gridfs file is never modified in place, keying by _id means a file that is rewritten under the same
+    filename is never served stale. Reads are memory-mapped so slicing a waveform only touches the pages that are
+    needed. Recency is tracked by file modification time. Each process tracks the size of the spool directory from its
+    own writes and only lists the directory, evicting the least recently used files down to low_watermark of
+    max_bytes, once that size grows larger than max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, low_watermark: float = 0.9):
+        """
+        Initializes a WaveformCache.
+        :param directory: The spool directory to store waveforms in.
+        :param max_bytes: The maximum number of bytes stored in the spool directory.
+        :param low_watermark: The fraction of max_bytes that eviction shrinks the spool directory to.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.total_bytes = sum(size for _, size, _ in self.entries())
+
+    def path(self, file_id: str) -> str:
+        """
+        Returns the path of a cached waveform.
+        :param file_id: The gridfs file _id of the waveform.
+        :return: The path of the cached waveform.
+        """
+        return os.path.join(self.directory, urllib.parse.quote(file_id, safe="") + ".s16")
+
+    def get(self, file_id: str) -> typing.Optional[numpy.ndarray]:
+        """
+        Returns a read-only, memory-mapped view of a cached waveform.
+        :param file_id: The gridfs file _id of the waveform.
+        :return: The cached waveform or None if it is not cached.
+        """
+        path = self.path(file_id)
+        try:
+            if os.path.getsize(path) == 0:
+                waveform = numpy.zeros(0, dtype=numpy.int16)
+            else:
+                waveform = numpy.memmap(path, dtype=numpy.int16, mode="r")
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return waveform
+
+    def put(self, file_id: str, data: bytes):
+        """
+        Stores a raw waveform and evicts the least recently used waveforms if the cache is over budget.
+        :param file_id: The gridfs file _id of the waveform.
+        :param data: The raw waveform bytes (16 bit samples).
+        """
+        if len(data) > self.max_bytes:
+            return
+
+        path = self.path(file_id)
+        tmp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+        try:
+            with open(tmp_path, "wb") as fout:
+                fout.write(data)
+            # Readers either see the complete waveform or no waveform
+            os.replace(tmp_path, path)
+        finally:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+
+        with self.lock:
+            self.total_bytes += len(data)
+            over_budget = self.total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def entries(self) -> typing.List[typing.Tuple[float, int, str]]:
+        """
+        Lists the cached waveforms of the spool directory.
+        :return: The modification time, size, and path of each cached waveform.
+        """
+        entries = []
+        with os.scandir(self.directory) as dir_entries:
+            for dir_entry in dir_entries:
+                if not dir_entry.name.endswith(".s16"):
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+        return entries
+
+    def evict(self):
+        """
+        Evicts the least recently used waveforms until the cache is within the low watermark of its byte budget.
+        """
+        entries = self.entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        target_bytes = self.max_bytes * self.low_watermark
+
+        entries.sort()
+        evictions = 0
+        for _, size, path in entries:
+            if total_bytes <= target_bytes:
+                break
+            try:
+                # Memory-mapped readers keep their mapping valid after the file is removed
+                os.remove(path)
+                evictions += 1
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+
+        with self.lock:
+            # Also picks up the writes of other processes since the last eviction
+            self.total_bytes = total_bytes
+            self.evictions += evictions
+
+    def stats(self) -> typing.Dict[str, int]:
+        """
+        Returns the hit, miss, and eviction counters of this process.
+        :return: The hit, miss, and eviction counters of this process.
+        """
+        with self.lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions}
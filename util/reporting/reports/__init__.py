@@ -113,26 +113,45 @@ def vrms(samples: np.ndarray) -> float:
     return math.sqrt(summed_sqs / len(samples))
 
 
-def vrms_waveform(waveform: np.ndarray, window_size: int = 200) -> np.ndarray:
+def vrms_waveform(waveform: np.ndarray, window_size: int = 200, step: Optional[int] = None) -> np.ndarray:
     """
     Calculated Vrms of a waveform using a given window size. In most cases, our window size should be the
     number of samples in a cycle.
+
+    Full windows are read through a strided view of the waveform and a trailing partial window is included. This
+    is a mirror of analysis.vrms_windowed in Mauka, which the reports cannot import; keep the two in sync.
     :param waveform: The waveform to find Vrms values for.
     :param window_size: The size of the window used to compute Vrms over the waveform.
+    :param step: Optional number of samples between window starts for overlapping windows.
     :return: An array of vrms values calculated for a given waveform.
     """
-    rms_voltages = []
+    waveform = np.asarray(waveform)
     window_size = int(window_size)
-    while len(waveform) >= window_size:
-        samples = waveform[:window_size]
-        waveform = waveform[window_size:]
-        rms_voltages.append(vrms(samples))
+    step = window_size if step is None else int(step)
+    waveform_len = len(waveform)
+
+    if window_size <= 0 or step <= 0:
+        raise ValueError("window_size and step must be positive")
+
+    num_full = (waveform_len - window_size) // step + 1 if waveform_len >= window_size else 0
+    full_end = (num_full - 1) * step + window_size if num_full > 0 else 0
+    has_tail = full_end < waveform_len
+    rms_voltages = np.empty(num_full + int(has_tail), dtype=np.float64)
+
+    if num_full > 0:
+        if step == window_size:
+            windows = waveform[:num_full * window_size].reshape(num_full, window_size)
+        else:
+            windows = np.lib.stride_tricks.sliding_window_view(waveform, window_size)[::step]
+        np.einsum("ij,ij->i", windows, windows, out=rms_voltages[:num_full], dtype=np.float64, casting="safe")
+        rms_voltages[:num_full] /= window_size
 
-    # pylint: disable=len-as-condition
-    if len(waveform) > 0:
-        rms_voltages.append(vrms(waveform))
+    if has_tail:
+        # Squares of raw int16 samples overflow in the input dtype
+        tail = waveform[num_full * step:].astype(np.float64)
+        rms_voltages[num_full] = np.dot(tail, tail) / len(tail)
 
-    return np.array(rms_voltages)
+    return np.sqrt(rms_voltages, out=rms_voltages)
 
 def percent_nominal(nominal: float, actual: float) -> float:
     return actual / nominal * 100.0